@@ -10,11 +10,15 @@ a2a-sdk의 ClientFactory를 사용하여 A2A 서버와 통신합니다.
 """
 
 import asyncio
-from typing import Dict, Any
+import random
+import time
+from typing import Dict, Any, AsyncIterator, Iterable, Optional, Tuple
+from uuid import uuid4
 
 try:
-    from a2a.client import ClientFactory
-    from a2a.types import Message, TextPart
+    import httpx
+    from a2a.client import A2AClientHTTPError, A2AClientTimeoutError, ClientConfig, ClientFactory
+    from a2a.types import AgentCard, DataPart, Message, TextPart
 except ImportError:
     print("❌ a2a-sdk가 설치되지 않았습니다.")
     print("설치: pip install a2a-sdk")
@@ -79,44 +83,7 @@ class TickerScoreClient:
             점수 계산 결과
         """
         try:
-            # A2A 메시지 생성
-            message = Message(
-                kind="message",
-                message_id=f"msg-{ticker}",
-                role="user",
-                parts=[
-                    TextPart(
-                        kind="text",
-                        text=f"Calculate the score for {ticker}"
-                    )
-                ]
-            )
-
-            # 메시지 전송 및 응답 수집
-            result = None
-            async for item in self.client.send_message(message):
-                # Task와 업데이트 이벤트 처리
-                if isinstance(item, tuple):
-                    task, update = item
-                    # 완료된 태스크에서 결과 추출
-                    if task.status.state == "completed" and task.history:
-                        # history에서 function_response 찾기
-                        for msg in task.history:
-                            if msg.role == "agent" and msg.parts:
-                                for part in msg.parts:
-                                    if part.kind == "data" and hasattr(part, 'data'):
-                                        data = part.data
-                                        if hasattr(data, 'response') and isinstance(data.response, dict):
-                                            if "ticker" in data.response:
-                                                result = data.response
-                                                break
-                # Message 응답 처리
-                elif hasattr(item, 'parts'):
-                    for part in item.parts:
-                        if part.kind == "text":
-                            result = {"raw_response": part.text}
-
-            return result if result else {}
+            return await self._score_once(ticker)
 
         except Exception as e:
             print(f"❌ 티커 점수 계산 실패: {e}")
@@ -124,6 +91,42 @@ class TickerScoreClient:
             traceback.print_exc()
             return {}
 
+    def _build_score_message(self, ticker: str) -> Message:
+        """점수 계산 요청 메시지 생성"""
+        return Message(
+            kind="message",
+            message_id=f"msg-{ticker}-{uuid4().hex[:8]}",
+            role="user",
+            # DataPart + skill 메타데이터 → 서버 fast path (래퍼 LLM 호출 없음)
+            metadata={"skill": "calculate_ticker_score"},
+            parts=[
+                TextPart(
+                    kind="text",
+                    text=f"Calculate the score for {ticker}"
+                ),
+                DataPart(kind="data", data={"ticker": ticker}),
+            ]
+        )
+
+    async def _score_once(self, ticker: str) -> Dict[str, Any]:
+        """메시지 1회 전송 (예외는 호출자에게 전달)"""
+        result = None
+        async for item in self.client.send_message(self._build_score_message(ticker)):
+            # Task와 업데이트 이벤트 처리
+            if isinstance(item, tuple):
+                task, update = item
+                # 완료된 태스크에서 결과 추출
+                if task.status.state == "completed":
+                    result = _extract_score_result(task) or result
+            # Message 응답 처리
+            elif hasattr(item, 'parts'):
+                for part in item.parts:
+                    part = getattr(part, "root", part)
+                    if part.kind == "text":
+                        result = {"raw_response": part.text}
+
+        return result if result else {}
+
     async def get_agent_info(self) -> Dict[str, Any]:
         """
         에이전트 정보를 조회합니다.
@@ -165,6 +168,171 @@ class TickerScoreClient:
             return {}
 
 
+def _iter_data_parts(parts):
+    """Part(root=DataPart) / DataPart 양쪽 형태에서 dict 데이터만 꺼낸다"""
+    for part in parts or []:
+        part = getattr(part, "root", part)
+        if getattr(part, "kind", None) == "data" and isinstance(getattr(part, "data", None), dict):
+            yield part.data
+
+
+def _extract_score_result(task) -> Optional[Dict[str, Any]]:
+    """완료된 Task 의 artifacts → history(function_response) 순으로 점수 결과 탐색"""
+    for artifact in task.artifacts or []:
+        for data in _iter_data_parts(artifact.parts):
+            if "ticker" in data:
+                return data
+    for msg in task.history or []:
+        if msg.role == "agent":
+            for data in _iter_data_parts(msg.parts):
+                response = data.get("response")
+                if isinstance(response, dict) and "ticker" in response:
+                    return response
+    return None
+
+
+class AgentCardCache:
+    """
+    Agent Card 캐시.
+    - TTL 안에서는 네트워크 요청 없이 캐시된 카드를 반환
+    - TTL 이 지나면 ETag / Last-Modified 로 조건부 요청 (304 이면 본문 재다운로드 없음)
+    """
+
+    def __init__(self, http: httpx.AsyncClient, server_url: str, ttl: float = 300.0,
+                 card_path: str = "/.well-known/agent-card.json"):
+        self.http = http
+        self.url = server_url.rstrip("/") + card_path
+        self.ttl = ttl
+        self.card: Optional[AgentCard] = None
+        self._validators: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> AgentCard:
+        async with self._lock:
+            if self.card is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return self.card
+            headers = {}
+            if self.card is not None:
+                if "etag" in self._validators:
+                    headers["If-None-Match"] = self._validators["etag"]
+                if "last-modified" in self._validators:
+                    headers["If-Modified-Since"] = self._validators["last-modified"]
+            resp = await self.http.get(self.url, headers=headers)
+            if resp.status_code != 304:
+                resp.raise_for_status()
+                self.card = AgentCard.model_validate(resp.json())
+                self._validators = {k: resp.headers[k] for k in ("etag", "last-modified")
+                                    if k in resp.headers}
+            self._fetched_at = time.monotonic()
+            return self.card
+
+
+class PooledTickerScoreClient(TickerScoreClient):
+    """
+    스크립트/배치용 비동기 클라이언트.
+
+    - httpx keep-alive 커넥션 풀을 모든 요청이 공유 (요청마다 TCP 연결/카드 조회 없음)
+    - Agent Card 캐시 + 조건부 재검증
+    - 일시적 오류(연결 실패, 타임아웃, 5xx)는 지수 백오프 + 지터로 재시도
+    - score_many / iter_scores 로 여러 티커를 제한된 동시성으로 병렬 처리
+
+    사용 예:
+        async with PooledTickerScoreClient(max_concurrency=8) as client:
+            async for ticker, result in client.iter_scores(["AAPL", "MSFT", "NVDA"]):
+                print(ticker, result.get("score"))
+    """
+
+    def __init__(self, server_url: str = SERVER_URL, *, max_concurrency: int = 8,
+                 max_connections: int = 20, timeout: float = 120.0,
+                 retries: int = 3, backoff: float = 0.5, card_ttl: float = 300.0):
+        super().__init__(server_url)
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+        self.cards = AgentCardCache(self.http, server_url, ttl=card_ttl)
+        self._factory = ClientFactory(ClientConfig(httpx_client=self.http))
+
+    async def connect(self):
+        """카드 캐시를 거쳐 풀링된 httpx 클라이언트로 A2A 클라이언트 생성"""
+        try:
+            self.card = await self.cards.get()
+            self.client = self._factory.create(self.card)
+            return True
+        except Exception as e:
+            print(f"❌ A2A 에이전트 연결 실패: {e}")
+            print(f"서버가 {self.server_url}에서 실행 중인지 확인하세요.")
+            return False
+
+    async def close(self):
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        if not await self.connect():
+            await self.close()
+            raise ConnectionError(f"A2A 에이전트에 연결할 수 없습니다: {self.server_url}")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def get_agent_card(self) -> AgentCard:
+        self.card = await self.cards.get()
+        return self.card
+
+    @staticmethod
+    def _is_retryable(e: Exception) -> bool:
+        # a2a-sdk 는 httpx 타임아웃을 A2AClientTimeoutError(asyncio.TimeoutError 아님)로 바꿔 올림
+        if isinstance(e, (httpx.TransportError, asyncio.TimeoutError, A2AClientTimeoutError)):
+            return True
+        if isinstance(e, A2AClientHTTPError):
+            return e.status_code >= 500 or e.status_code == 429
+        return False
+
+    async def calculate_ticker_score(self, ticker: str) -> Dict[str, Any]:
+        """재시도(지수 백오프 + 지터) 포함 단건 점수 계산. 최종 실패 시 {"ticker", "error"}"""
+        for attempt in range(self.retries + 1):
+            try:
+                result = await self._score_once(ticker)
+                return result or {"ticker": ticker, "error": "empty response"}
+            except Exception as e:
+                if attempt >= self.retries or not self._is_retryable(e):
+                    return {"ticker": ticker, "error": f"{type(e).__name__}: {e}"}
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                await asyncio.sleep(delay)
+        return {"ticker": ticker, "error": "unreachable"}
+
+    async def iter_scores(self, tickers: Iterable[str],
+                          max_concurrency: Optional[int] = None
+                          ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """완료되는 순서대로 (ticker, result) 를 내보낸다"""
+        sem = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def one(t: str) -> Tuple[str, Dict[str, Any]]:
+            async with sem:
+                return t, await self.calculate_ticker_score(t)
+
+        tasks = [asyncio.create_task(one(t)) for t in dict.fromkeys(tickers)]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    async def score_many(self, tickers: Iterable[str],
+                         max_concurrency: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """여러 티커를 병렬로 계산해 {ticker: result} 로 반환 (입력 순서 유지)"""
+        tickers = list(dict.fromkeys(tickers))
+        results = {t: r async for t, r in self.iter_scores(tickers, max_concurrency)}
+        return {t: results[t] for t in tickers}
+
+
 def print_ticker_result(ticker: str, result: Dict[str, Any]):
     """티커 점수 결과를 출력합니다."""
     print(f"\n{'='*60}")
@@ -176,7 +344,8 @@ def print_ticker_result(ticker: str, result: Dict[str, Any]):
         return
 
     print(f"✅ 티커: {result.get('ticker')}")
-    print(f"📈 점수: {result.get('score')}/100")
+    score = result.get('score')  # no_data 등이면 null
+    print(f"📈 점수: {score}/100" if score is not None else "📈 점수: n/a")
     print(f"💡 근거: {result.get('rationale')}")
 
     # 주가 정보
@@ -259,6 +428,11 @@ async def main():
     result = await client.calculate_ticker_score("AAPL")
     print_ticker_result("AAPL", result)
 
+    # 예시 2: 포트폴리오 병렬 분석 (커넥션 풀 + 동시성 제한)
+    # async with PooledTickerScoreClient(max_concurrency=8) as pooled:
+    #     async for ticker, r in pooled.iter_scores(["AAPL", "MSFT", "NVDA"]):
+    #         print(f"  {ticker:8s} → {r.get('score')}/100")
+
     print("✨ 완료!")
 
 
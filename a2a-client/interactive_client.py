@@ -15,6 +15,9 @@ Interactive A2A Client - 대화형 클라이언트
 """
 
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
 import json
 from typing import Dict, Any
@@ -23,6 +26,9 @@ from typing import Dict, Any
 # A2A 서버 URL
 SERVER_URL = "http://localhost:8083"
 
+# 여러 티커 비교 시 동시 요청 수
+MAX_PARALLEL = 4
+
 
 class InteractiveClient:
     """대화형 A2A 클라이언트"""
@@ -30,10 +36,12 @@ class InteractiveClient:
     def __init__(self, server_url: str = SERVER_URL):
         """클라이언트 초기화"""
         self.server_url = server_url
+        # keep-alive 커넥션 재사용. requests.Session 은 스레드 안전하지 않으므로 스레드마다 하나씩
+        self._local = threading.local()
 
         try:
             # Agent Card 확인
-            response = requests.get(f"{server_url}/.well-known/agent-card.json", timeout=5)
+            response = self.session.get(f"{server_url}/.well-known/agent-card.json", timeout=5)
             response.raise_for_status()
             print(f"✅ 연결됨: {server_url}\n")
         except Exception as e:
@@ -41,24 +49,35 @@ class InteractiveClient:
             print(f"서버가 {server_url}에서 실행 중인지 확인하세요.")
             raise
 
-    def _call_a2a(self, prompt: str) -> Dict[str, Any]:
-        """A2A 프로토콜로 메시지 전송"""
+    @property
+    def session(self) -> requests.Session:
+        """현재 스레드의 세션 (여러 티커 비교 시 ThreadPoolExecutor 워커마다 따로 생성)"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _call_a2a(self, prompt: str, skill: str = None, data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """A2A 프로토콜로 메시지 전송 (skill/data 를 주면 서버 fast path 사용)"""
+        message = {
+            "kind": "message",
+            "message_id": "msg-1",
+            "role": "user",
+            "parts": [{"kind": "text", "text": prompt}]
+        }
+        if skill:
+            message["metadata"] = {"skill": skill}
+        if data is not None:
+            message["parts"].append({"kind": "data", "data": data})
         payload = {
             "jsonrpc": "2.0",
             "id": "1",
             "method": "message/send",
-            "params": {
-                "message": {
-                    "kind": "message",
-                    "message_id": "msg-1",
-                    "role": "user",
-                    "parts": [{"kind": "text", "text": prompt}]
-                }
-            }
+            "params": {"message": message}
         }
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.server_url}/",
                 json=payload,
                 headers={"Content-Type": "application/json"},
@@ -70,8 +89,12 @@ class InteractiveClient:
             if "error" in result:
                 return None
 
-            # A2A 응답에서 데이터 추출
+            # A2A 응답에서 데이터 추출 (artifacts → history 순)
             response_data = result.get("result", {})
+            for artifact in response_data.get("artifacts", []):
+                for part in artifact.get("parts", []):
+                    if part.get("kind") == "data" and isinstance(part.get("data"), dict):
+                        return part["data"]
             if "history" in response_data:
                 for msg in response_data["history"]:
                     if msg.get("role") == "agent" and "parts" in msg:
@@ -88,11 +111,16 @@ class InteractiveClient:
             print(f"❌ 에러: {e}")
             return None
 
+    def _score(self, ticker: str) -> Dict[str, Any]:
+        ticker = ticker.upper()
+        return self._call_a2a(f"Calculate the score for {ticker}",
+                              skill="calculate_ticker_score", data={"ticker": ticker})
+
     def calculate_ticker_score(self, ticker: str):
         """티커 점수 조회"""
         print(f"\n⏳ {ticker} 분석 중...\n")
 
-        result = self._call_a2a(f"Calculate the score for {ticker.upper()}")
+        result = self._score(ticker)
 
         if result:
             self._print_ticker_result(result)
@@ -103,7 +131,7 @@ class InteractiveClient:
         """에이전트 정보 조회"""
         print("\n⏳ 정보 조회 중...\n")
 
-        result = self._call_a2a("Get agent info")
+        result = self._call_a2a("Get agent info", skill="get_ticker_info")
 
         if result:
             self._print_agent_info(result)
@@ -115,12 +143,14 @@ class InteractiveClient:
         print("─" * 60)
         print(f"📊 {result.get('ticker')}")
         print("─" * 60)
-        print(f"점수: {result.get('score')}/100")
+        # 데이터 없음(no_data) 등으로 점수가 null 일 수 있음
+        score = result.get('score')
+        print(f"점수: {score}/100" if score is not None else "점수: n/a")
         print(f"근거: {result.get('rationale')}")
 
         if result.get('price'):
             price = result['price']
-            change_symbol = "↑" if price.get('chg', 0) >= 0 else "↓"
+            change_symbol = "↑" if (price.get('chg') or 0) >= 0 else "↓"
             print(f"\n💰 주가: ${price.get('last')} {change_symbol} {price.get('chg')} ({price.get('pct')}%)")
 
         if result.get('news'):
@@ -195,11 +225,21 @@ class InteractiveClient:
                         print(f"\n📊 {len(tickers)}개 티커 비교 분석\n")
                         results = {}
 
-                        for ticker in tickers:
-                            result = self._call_a2a(f"Calculate the score for {ticker}")
-                            if result:
-                                results[ticker] = result.get('score', 0)
-                                print(f"  {ticker:8s} → {result.get('score', 0):3d}/100")
+                        # 티커별 요청을 동시에 보내고 완료 순서대로 출력
+                        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(tickers))) as pool:
+                            futures = {
+                                pool.submit(self._score, t): t
+                                for t in tickers
+                            }
+                            for future in as_completed(futures):
+                                ticker, result = futures[future], future.result()
+                                score = result.get('score') if result else None
+                                if score is None:
+                                    # 점수 없는 응답(no_data 등)은 평균에서 제외
+                                    print(f"  {ticker:8s} → n/a")
+                                    continue
+                                results[ticker] = score
+                                print(f"  {ticker:8s} → {score:3d}/100")
 
                         if results:
                             avg = sum(results.values()) / len(results)
@@ -17,6 +17,9 @@ from typing import Dict, Any
 # A2A 서버 URL
 SERVER_URL = "http://localhost:8083"
 
+# keep-alive 커넥션 재사용 (호출마다 TCP 연결을 새로 맺지 않음)
+_session = requests.Session()
+
 
 def call_a2a_skill(skill: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -43,10 +46,16 @@ def call_a2a_skill(skill: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
                 "kind": "message",
                 "message_id": "msg-1",
                 "role": "user",
+                # skill 메타데이터 + DataPart → 서버가 LLM 없이 워크플로우를 직접 실행 (fast path)
+                "metadata": {"skill": skill},
                 "parts": [
                     {
                         "kind": "text",
                         "text": prompt
+                    },
+                    {
+                        "kind": "data",
+                        "data": input_data
                     }
                 ]
             }
@@ -57,7 +66,7 @@ def call_a2a_skill(skill: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
     url = f"{SERVER_URL}/"
 
     try:
-        response = requests.post(
+        response = _session.post(
             url,
             json=payload,
             headers={"Content-Type": "application/json"},
@@ -76,7 +85,13 @@ def call_a2a_skill(skill: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
         # A2A 응답에서 데이터 추출
         response_data = result.get("result", {})
 
-        # history에서 function_response 찾기
+        # fast path: artifacts 의 DataPart 에 결과가 바로 담겨 옴
+        for artifact in response_data.get("artifacts", []):
+            for part in artifact.get("parts", []):
+                if part.get("kind") == "data" and isinstance(part.get("data"), dict):
+                    return part["data"]
+
+        # history에서 function_response 찾기 (LLM 경유 응답)
         if "history" in response_data:
             for msg in response_data["history"]:
                 if msg.get("role") == "agent" and "parts" in msg:
@@ -123,7 +138,7 @@ def get_agent_card() -> Dict[str, Any]:
     url = f"{SERVER_URL}/.well-known/agent-card.json"
 
     try:
-        response = requests.get(url, timeout=10)
+        response = _session.get(url, timeout=10)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -144,7 +159,9 @@ def calculate_ticker_score(ticker: str):
 
     if result:
         print(f"✅ 티커: {result.get('ticker')}")
-        print(f"📈 점수: {result.get('score')}/100")
+        # 데이터 없음(no_data) 등으로 점수가 null 일 수 있음
+        score = result.get('score')
+        print(f"📈 점수: {score}/100" if score is not None else "📈 점수: n/a")
         print(f"💡 근거: {result.get('rationale')}")
 
         # 추가 정보
@@ -217,7 +234,7 @@ def main():
     # 예시 2: MSFT (주석 해제하여 사용)
     # calculate_ticker_score("MSFT")
 
-    # 예시 3: 여러 티커 비교
+    # 예시 3: 여러 티커 비교 (대량/병렬 처리는 adk_client.PooledTickerScoreClient.score_many 권장)
     # tickers = ["AAPL", "MSFT", "NVDA"]
     # print(f"\n📊 포트폴리오 분석: {', '.join(tickers)}")
     # results = []
@@ -227,8 +244,9 @@ def main():
     #         results.append(result)
     #
     # # 평균 점수 계산
-    # if results:
-    #     avg_score = sum(r.get('score', 0) for r in results) / len(results)
+    # scores = [r['score'] for r in results if r.get('score') is not None]
+    # if scores:
+    #     avg_score = sum(scores) / len(scores)
     #     print(f"\n평균 점수: {avg_score:.1f}/100")
 
     print("✨ 완료!")
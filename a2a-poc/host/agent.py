@@ -2,8 +2,13 @@
 Host Agent with Ticker Score Agent integration
 기존 agent1, agent2와 함께 ticker_score_agent를 서브 에이전트로 포함
 """
+import asyncio
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
+from uuid import uuid4
+
+import httpx
 
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.tools import MCPToolset
@@ -14,67 +19,259 @@ try:
     from google.adk.agents import Agent, LlmAgent
     from google.adk.tools.function_tool import FunctionTool
     from google.adk.agents.remote_a2a_agent import RemoteA2aAgent, AGENT_CARD_WELL_KNOWN_PATH
+    from google.adk.agents.callback_context import CallbackContext
+    from google.genai import types as genai_types
+    from a2a.client import ClientConfig, ClientFactory
+    from a2a.types import DataPart, Message, Part, TextPart
 except ImportError as e:
     raise RuntimeError("google-adk가 설치되지 않았거나 import 경로가 잘못됨") from e
 
+from .registry import AgentCardRegistry, AgentUnavailableError
+
 # --- OpenAI (플래너) ----------------------------------------------------------
 from openai import OpenAI
 _oai = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
 # --- A2A 원격 에이전트 등록 ---------------------------------------------------
+AGENT_CARD_URLS = {
+    "agent1_remote": f"http://127.0.0.1:8001{AGENT_CARD_WELL_KNOWN_PATH}",
+    "agent2_remote": f"http://127.0.0.1:8002{AGENT_CARD_WELL_KNOWN_PATH}",
+    "agent3_remote": f"http://127.0.0.1:8003{AGENT_CARD_WELL_KNOWN_PATH}",
+    "agent4_remote": f"http://127.0.0.1:8004{AGENT_CARD_WELL_KNOWN_PATH}",
+    "ticker_score_agent": f"http://127.0.0.1:8083{AGENT_CARD_WELL_KNOWN_PATH}",
+}
+
+# 카드는 시작 시 조회하지 않고 첫 사용 시 지연 해석 + TTL 캐시, 백그라운드 헬스 체크
+registry = AgentCardRegistry(AGENT_CARD_URLS, ttl=300.0, probe_interval=15.0)
+
+
+async def _skip_if_unhealthy(callback_context: CallbackContext) -> Optional[genai_types.Content]:
+    """헬스 체크에서 내려간 원격 에이전트로의 transfer 는 즉시 응답하고 건너뛴다 (첫 transfer 때 헬스 체크 시작)"""
+    name = callback_context.agent_name
+    if await registry.check(name):
+        return None
+    return genai_types.Content(role="model", parts=[genai_types.Part(
+        text=f"{name} 에이전트가 현재 응답하지 않습니다: {registry.status()[name]['last_error']}"
+    )])
+
+
+class RegistryRemoteA2aAgent(RemoteA2aAgent):
+    """
+    transfer 경로도 레지스트리 카드(TTL 캐시 + ETag 재검증)를 사용하는 RemoteA2aAgent.
+    ADK 기본 구현은 URL 에서 카드를 직접 한 번 받아 계속 쓰므로, 호출마다 레지스트리 카드를 확인하고
+    카드가 갱신되면 A2A 클라이언트를 다시 만든다
+    """
+
+    async def _ensure_resolved(self) -> None:
+        card = await registry.get_card(self.name)
+        if card is not self._agent_card:
+            self._agent_card, self._a2a_client, self._is_resolved = card, None, False
+        await super()._ensure_resolved()
+
+
 # Agent 1 & 2 (기존)
-agent1_remote = RemoteA2aAgent(
+agent1_remote = RegistryRemoteA2aAgent(
     name="agent1_remote",
     description="자기소개를 반환하는 Agent1",
-    agent_card=f"http://127.0.0.1:8001{AGENT_CARD_WELL_KNOWN_PATH}",
+    agent_card=AGENT_CARD_URLS["agent1_remote"],
+    before_agent_callback=_skip_if_unhealthy,
 )
-agent2_remote = RemoteA2aAgent(
+agent2_remote = RegistryRemoteA2aAgent(
     name="agent2_remote",
     description="자기소개를 반환하는 Agent2",
-    agent_card=f"http://127.0.0.1:8002{AGENT_CARD_WELL_KNOWN_PATH}",
+    agent_card=AGENT_CARD_URLS["agent2_remote"],
+    before_agent_callback=_skip_if_unhealthy,
 )
-agent3_remote = RemoteA2aAgent(
+agent3_remote = RegistryRemoteA2aAgent(
     name="agent3_remote",
     description="A2A remote Agent3",
-    agent_card=f"http://127.0.0.1:8003{AGENT_CARD_WELL_KNOWN_PATH}",
+    agent_card=AGENT_CARD_URLS["agent3_remote"],
+    before_agent_callback=_skip_if_unhealthy,
 )
-agent4_remote = RemoteA2aAgent(
+agent4_remote = RegistryRemoteA2aAgent(
     name="agent4_remote",
     description="A2A remote Agent4",
-    agent_card=f"http://127.0.0.1:8004{AGENT_CARD_WELL_KNOWN_PATH}",
+    agent_card=AGENT_CARD_URLS["agent4_remote"],
+    before_agent_callback=_skip_if_unhealthy,
 )
 
 # Ticker Score Agent (신규 추가)
-ticker_agent_remote = RemoteA2aAgent(
+ticker_agent_remote = RegistryRemoteA2aAgent(
     name="ticker_score_agent",
     description="주식 티커의 투자 점수를 분석하는 금융 에이전트",
-    agent_card=f"http://127.0.0.1:8083{AGENT_CARD_WELL_KNOWN_PATH}",
+    agent_card=AGENT_CARD_URLS["ticker_score_agent"],
+    before_agent_callback=_skip_if_unhealthy,
 )
 
 
-def analyze_portfolio(
+# --- 병렬 디스패치 -------------------------------------------------------------
+# LLM transfer 로 티커마다 한 번씩 순차 호출하는 대신, 호스트가 직접 A2A 요청을 동시에 보낸다.
+MAX_PARALLEL = 8
+DEFAULT_TIMEOUT_S = 30.0
+AGENT_TIMEOUTS_S = {"ticker_score_agent": 90.0}
+
+_http: Optional[httpx.AsyncClient] = None
+_factory: Optional[ClientFactory] = None
+_clients: Dict[str, Any] = {}  # name → (card, client)
+
+
+async def _get_client(agent_name: str):
+    """에이전트별 A2A 클라이언트 (httpx 커넥션 풀 공유, 카드는 레지스트리 캐시 사용)"""
+    global _http, _factory
+    if _factory is None:
+        _http = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5.0),
+                                  limits=httpx.Limits(max_connections=MAX_PARALLEL * 2))
+        _factory = ClientFactory(ClientConfig(httpx_client=_http))
+    card = await registry.get_card(agent_name)
+    cached = _clients.get(agent_name)
+    if cached is None or cached[0] is not card:  # 카드가 갱신되면 클라이언트 재생성
+        cached = (card, _factory.create(card))
+        _clients[agent_name] = cached
+    return cached[1]
+
+
+def _task_result(task) -> Optional[Dict[str, Any]]:
+    """Task 의 artifact DataPart(구조화 결과) → history function_response 순으로 결과 추출"""
+    for artifact in task.artifacts or []:
+        for part in artifact.parts or []:
+            part = getattr(part, "root", part)
+            if getattr(part, "kind", None) == "data" and isinstance(part.data, dict):
+                return part.data
+    for msg in task.history or []:
+        for part in msg.parts or []:
+            part = getattr(part, "root", part)
+            if getattr(part, "kind", None) == "data" and isinstance(part.data, dict):
+                response = part.data.get("response")
+                if isinstance(response, dict):
+                    return response
+    return None
+
+
+async def _call_agent(agent_name: str, data: Dict[str, Any], skill: Optional[str] = None) -> Dict[str, Any]:
+    """원격 에이전트 1회 호출 (DataPart + skill 메타데이터 → 서버 fast path)"""
+    client = await _get_client(agent_name)
+    message = Message(
+        kind="message",
+        message_id=f"host-{uuid4().hex[:12]}",
+        role="user",
+        metadata={"skill": skill} if skill else None,
+        parts=[Part(root=DataPart(data=data))],
+    )
+    result = None
+    async for item in client.send_message(message):
+        if isinstance(item, tuple):
+            task, _ = item
+            result = _task_result(task) or result
+        elif hasattr(item, "parts"):
+            for part in item.parts:
+                part = getattr(part, "root", part)
+                if isinstance(part, DataPart):
+                    result = part.data
+                elif isinstance(part, TextPart):
+                    result = result or {"text": part.text}
+    return result or {}
+
+
+async def dispatch_parallel(calls: List[Dict[str, Any]],
+                            max_parallel: int = MAX_PARALLEL) -> List[Dict[str, Any]]:
+    """
+    [{"agent": "ticker_score_agent", "data": {...}, "skill": "..."}] 를 동시에 실행.
+    동시성은 max_parallel 로 제한, 에이전트별 타임아웃 적용. 입력 순서대로 결과 반환.
+    """
+    sem = asyncio.Semaphore(max_parallel)
+
+    async def one(call: Dict[str, Any]) -> Dict[str, Any]:
+        agent = call["agent"]
+        timeout = AGENT_TIMEOUTS_S.get(agent, DEFAULT_TIMEOUT_S)
+        t0 = time.perf_counter()
+        if not await registry.check(agent):
+            return {"agent": agent, "ok": False, "error": "agent unhealthy (excluded from routing)",
+                    "elapsed_ms": 0}
+        async with sem:
+            try:
+                result = await asyncio.wait_for(
+                    _call_agent(agent, call.get("data") or {}, call.get("skill")), timeout)
+                ok = bool(result) and not result.get("error")
+                out = {"ok": ok, "result": result}
+            except asyncio.TimeoutError:
+                out = {"ok": False, "error": f"timeout after {timeout:.0f}s"}
+            except AgentUnavailableError as e:
+                out = {"ok": False, "error": str(e)}
+            except Exception as e:
+                _clients.pop(agent, None)  # 다음 호출에서 재연결
+                if isinstance(e, httpx.TransportError) or isinstance(e.__cause__, httpx.TransportError):
+                    registry.mark_failure(agent, f"{type(e).__name__}: {e}")
+                out = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {"agent": agent, **out, "elapsed_ms": int((time.perf_counter() - t0) * 1000)}
+
+    return await asyncio.gather(*(one(c) for c in calls))
+
+
+async def analyze_portfolio(
     input: Optional[Dict[str, Any]] = None,
     *,
     context: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
-    포트폴리오 분석을 위한 가이드 함수.
-    실제로는 LLM이 ticker_score_agent로 transfer 하도록 유도합니다.
+    여러 티커를 ticker_score_agent 에 동시에 보내 점수를 받고 하나의 포트폴리오 결과로 합칩니다.
+    종목 분석 요청은 티커가 하나든 여러 개든 이 툴을 한 번만 호출하세요.
 
     Args:
         input: {"tickers": ["AAPL", "MSFT", "NVDA"]}
 
     Returns:
-        분석 가이드
+        {"tickers", "results": [{"ticker", "score", "rationale", "price"}], "failed": [...], "summary": {...}}
     """
-    tickers = (input or {}).get("tickers", [])
+    tickers = list(dict.fromkeys(t.upper().strip() for t in (input or {}).get("tickers", []) if t))
+    if not tickers:
+        return {"ok": False, "error": "tickers parameter is required", "example": {"tickers": ["AAPL"]}}
+
+    t0 = time.perf_counter()
+    replies = await dispatch_parallel([
+        {"agent": "ticker_score_agent", "skill": "calculate_ticker_score", "data": {"ticker": t}}
+        for t in tickers
+    ])
+
+    results, failed = [], []
+    for ticker, reply in zip(tickers, replies):
+        r = reply.get("result") or {}
+        if reply["ok"] and r.get("score") is not None:
+            results.append({k: r.get(k) for k in ("ticker", "score", "rationale", "price")})
+        else:
+            failed.append({"ticker": ticker, "error": reply.get("error") or r.get("error") or "no score"})
+
+    scores = [r["score"] for r in results]
+    summary = {
+        "count": len(results),
+        "failed": len(failed),
+        "avg_score": round(sum(scores) / len(scores), 1) if scores else None,
+        "best": max(results, key=lambda r: r["score"])["ticker"] if results else None,
+        "worst": min(results, key=lambda r: r["score"])["ticker"] if results else None,
+    }
     return {
-        "ok": True,
-        "message": f"각 티커 {tickers}에 대해 ticker_score_agent로 transfer하여 점수를 받아오세요.",
-        "note": "LLM이 각 티커마다 ticker_score_agent의 calculate_ticker_score 툴을 호출해야 합니다."
+        "ok": bool(results),
+        "tickers": tickers,
+        "results": sorted(results, key=lambda r: r["score"], reverse=True),
+        "failed": failed,
+        "summary": summary,
+        "elapsed_ms": int((time.perf_counter() - t0) * 1000),
     }
 
 
+def list_available_agents(
+    input: Optional[Dict[str, Any]] = None,
+    *,
+    context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    원격 에이전트별 헬스 상태를 반환합니다. healthy=false 인 에이전트로는 transfer 하지 마세요.
+
+    Returns:
+        {"agents": {"ticker_score_agent": {"healthy": true, "card_cached": true, ...}, ...}}
+    """
+    return {"agents": registry.status()}
+
+
 # Host Agent 정의
 root_agent = LlmAgent(
     name="financial_orchestrator",
@@ -84,21 +281,23 @@ root_agent = LlmAgent(
         "당신은 여러 에이전트를 조율하는 금융 분석 코디네이터입니다.\n\n"
 
         "**주식 분석 요청 시:**\n"
-        "1. 사용자가 특정 주식 티커(예: AAPL, MSFT)의 분석을 요청하면\n"
-        "2. ticker_score_agent로 transfer하여 'calculate_ticker_score' 툴 호출\n"
-        "3. 결과에는 점수, 근거, 주가, 뉴스 정보가 포함됩니다\n"
-        "4. 여러 종목이면 각각 transfer하여 결과를 수집하세요\n\n"
+        "1. 사용자가 주식 티커(예: AAPL, MSFT)의 분석을 요청하면 종목 수와 관계없이\n"
+        "2. analyze_portfolio 툴을 {\"tickers\": [...]} 로 한 번만 호출하세요 (내부에서 병렬 처리)\n"
+        "3. 결과에는 종목별 점수, 근거, 주가와 전체 요약(summary), 실패 목록(failed)이 포함됩니다\n"
+        "4. ticker_score_agent 로 티커마다 transfer 하지 마세요\n\n"
 
         "**에이전트 소개 요청 시:**\n"
         "1. agent1_remote와 agent2_remote로 각각 transfer\n"
         "2. 'introduce' 툴을 호출하여 소개를 받으세요\n\n"
 
         "**포트폴리오 분석 요청 시:**\n"
-        "1. 제공된 티커 목록의 각 종목을 ticker_score_agent로 분석\n"
-        "2. 모든 결과를 종합하여 포트폴리오 전체 평가를 제공하세요\n\n"
+        "1. 티커 목록 전체를 analyze_portfolio 에 한 번에 전달\n"
+        "2. 반환된 results/summary 를 바탕으로 한 번의 응답으로 포트폴리오 전체 평가를 제공하세요\n\n"
 
+        "원격 에이전트가 응답하지 않으면 list_available_agents 로 상태를 확인하고, "
+        "healthy=false 인 에이전트는 건너뛰고 나머지 결과로 응답하세요.\n\n"
         "항상 명확하고 구조화된 JSON 형식으로 응답하세요."
     ),
-    tools=[analyze_portfolio],
+    tools=[analyze_portfolio, list_available_agents],
     sub_agents=[agent1_remote, agent2_remote, ticker_agent_remote],
 )
@@ -0,0 +1,174 @@
+"""
+원격 A2A 에이전트 Agent Card 레지스트리
+
+- 지연 해석: 임포트/시작 시점에는 네트워크 요청을 하지 않음 (호스트 즉시 기동)
+- TTL 캐시: ttl 안에서는 캐시된 카드를 그대로 사용
+- 조건부 갱신: ttl 경과 후 ETag / Last-Modified 로 재검증 (304 이면 본문 재다운로드 없음)
+- 백그라운드 헬스 체크: 첫 사용(카드 조회 또는 라우팅 전 check()) 때 시작해 probe_interval 마다 카드 엔드포인트 확인,
+  fail_threshold 번 연속 실패한 에이전트는 라우팅에서 제외
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+from a2a.types import AgentCard
+
+logger = logging.getLogger("host-registry")
+
+
+class AgentUnavailableError(RuntimeError):
+    """헬스 체크에서 내려간 것으로 판정된 에이전트"""
+
+
+@dataclass
+class _Entry:
+    url: str
+    card: Optional[AgentCard] = None
+    validators: Dict[str, str] = field(default_factory=dict)
+    fetched_at: float = 0.0
+    healthy: Optional[bool] = None  # None: 아직 확인 전
+    failures: int = 0
+    last_error: Optional[str] = None
+    checked_at: float = 0.0
+
+
+class AgentCardRegistry:
+    def __init__(self, card_urls: Dict[str, str], *, ttl: float = 300.0,
+                 probe_interval: float = 15.0, probe_timeout: float = 2.0,
+                 fail_threshold: int = 2):
+        self._entries = {name: _Entry(url) for name, url in card_urls.items()}
+        self.ttl = ttl
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.fail_threshold = fail_threshold
+        self.http: Optional[httpx.AsyncClient] = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._probe_task: Optional[asyncio.Task] = None
+
+    # ── 조회 ────────────────────────────────────────────────────────────────
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def is_healthy(self, name: str) -> bool:
+        """확인 전(None)은 사용 가능으로 취급"""
+        entry = self._entries.get(name)
+        return entry is not None and entry.healthy is not False
+
+    async def check(self, name: str) -> bool:
+        """
+        라우팅 전 확인 (transfer 콜백, 병렬 디스패치). 헬스 체크를 시작하고,
+        아직 한 번도 확인하지 않은 에이전트면 지금 카드 엔드포인트를 확인함.
+        판정은 항상 fail_threshold 기준 (첫 확인 1번 실패만으로는 제외하지 않음)
+        """
+        self._ensure_started()
+        entry = self._entries.get(name)
+        if entry is None:
+            return False
+        if entry.healthy is None:
+            await self._refresh(name, timeout=self.probe_timeout)
+        return entry.healthy is not False
+
+    def status(self) -> Dict[str, Dict[str, object]]:
+        now = time.monotonic()
+        return {
+            name: {
+                "healthy": e.healthy,
+                "card_cached": e.card is not None,
+                "card_age_s": round(now - e.fetched_at, 1) if e.card is not None else None,
+                "last_error": e.last_error,
+            }
+            for name, e in self._entries.items()
+        }
+
+    async def get_card(self, name: str) -> AgentCard:
+        """캐시된 카드 반환, TTL 이 지났으면 조건부 갱신. 내려간 에이전트는 즉시 예외"""
+        self._ensure_started()
+        entry = self._entries[name]
+        if entry.healthy is False and entry.card is None:
+            raise AgentUnavailableError(f"{name} is unhealthy: {entry.last_error}")
+        if entry.card is not None and time.monotonic() - entry.fetched_at < self.ttl:
+            return entry.card
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if entry.card is None or time.monotonic() - entry.fetched_at >= self.ttl:
+                ok = await self._refresh(name, timeout=None)
+                if not ok and entry.card is None:
+                    raise AgentUnavailableError(f"{name} agent card unavailable: {entry.last_error}")
+        return entry.card
+
+    def mark_failure(self, name: str, error: str) -> None:
+        """호출 중 연결 오류가 나면 다음 헬스 체크 전까지 라우팅에서 제외"""
+        entry = self._entries.get(name)
+        if entry is not None:
+            self._record(entry, ok=False, error=error)
+
+    # ── 갱신 / 헬스 체크 ────────────────────────────────────────────────────
+    def _client(self) -> httpx.AsyncClient:
+        if self.http is None:
+            self.http = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=self.probe_timeout))
+        return self.http
+
+    def _record(self, entry: _Entry, ok: bool, error: Optional[str] = None) -> None:
+        was = entry.healthy
+        entry.checked_at = time.monotonic()
+        if ok:
+            entry.failures, entry.last_error, entry.healthy = 0, None, True
+        else:
+            entry.failures += 1
+            entry.last_error = error
+            if entry.failures >= self.fail_threshold:
+                entry.healthy = False
+        if was is not entry.healthy:
+            logger.info("[registry] %s healthy=%s %s", entry.url, entry.healthy, error or "")
+
+    async def _refresh(self, name: str, timeout: Optional[float]) -> bool:
+        entry = self._entries[name]
+        headers = {}
+        if entry.card is not None:
+            if "etag" in entry.validators:
+                headers["If-None-Match"] = entry.validators["etag"]
+            if "last-modified" in entry.validators:
+                headers["If-Modified-Since"] = entry.validators["last-modified"]
+        try:
+            kwargs = {"timeout": timeout} if timeout is not None else {}
+            resp = await self._client().get(entry.url, headers=headers, **kwargs)
+            if resp.status_code != 304:
+                resp.raise_for_status()
+                entry.card = AgentCard.model_validate(resp.json())
+                entry.validators = {k: resp.headers[k] for k in ("etag", "last-modified")
+                                    if k in resp.headers}
+            entry.fetched_at = time.monotonic()
+            self._record(entry, ok=True)
+            return True
+        except Exception as e:
+            self._record(entry, ok=False, error=f"{type(e).__name__}: {e}")
+            return False
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._refresh(n, timeout=self.probe_timeout) for n in self._entries))
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.probe_interval)
+
+    def _ensure_started(self) -> None:
+        # 첫 사용 시점(실행 중인 이벤트 루프 안)에 백그라운드 헬스 체크 시작
+        if self._probe_task is None or self._probe_task.done():
+            try:
+                self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+            except RuntimeError:
+                pass
+
+    async def close(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
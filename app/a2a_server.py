@@ -1,10 +1,28 @@
 """
 A2A Server for Ticker Score Agent
-Google ADK의 to_a2a()를 사용하여 Agent를 A2A 프로토콜 서버로 변환
+Google ADK Agent를 A2A 프로토콜 서버로 변환 (to_a2a() 와 같은 구성 + 구조화 요청 fast path)
+
+구조화된 요청은 래퍼 LLM(root_agent)을 거치지 않고 LangGraph 워크플로우를 직접 실행합니다.
+- DataPart {"ticker": "AAPL"} 가 포함된 메시지
+- message.metadata {"skill": "calculate_ticker_score"} (+ 텍스트에 티커)
+결과는 task artifact(DataPart)로 반환되므로 history 를 뒤질 필요가 없습니다.
+- skill "submit_ticker_score_job": 작업 큐(/jobs 와 같은 큐)에 등록하고 작업 상태로 A2A 태스크를 진행
+  (submitted → working → completed | failed | canceled). 태스크 id 가 곧 job_id 이므로
+  configuration.blocking=false 로 보내면 바로 돌아오고 tasks/get 으로 폴링할 수 있습니다.
+그 외 자연어 요청은 기존처럼 ADK A2aAgentExecutor → root_agent 로 처리됩니다.
 """
+import asyncio
+import hashlib
+import inspect
 import logging
+import re
+from typing import Any, Dict, Optional
 
-from app.workflow.a2a_agent import root_agent
+from app.jobs import CANCELED, COMPLETED, FAILED, WORKING, job_queue
+from app.workflow.a2a_agent import root_agent, calculate_ticker_score, get_ticker_info, rank_tickers
+from app.workflow.nodes import TICKER_PATTERN
+from app.workflow.deadline import record_cancel
+from app.tenants import QuotaExceeded, Unauthorized, current_tenant, tenants
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,20 +31,298 @@ logging.basicConfig(
 logger = logging.getLogger("ticker-a2a-server")
 
 try:
-    from google.adk.a2a.utils.agent_to_a2a import to_a2a
+    from a2a.server.agent_execution import AgentExecutor, RequestContext
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.events import EventQueue
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore, TaskUpdater
+    from a2a.types import AgentSkill, DataPart, Part
+    from a2a.utils import new_agent_text_message
+    from google.adk.a2a.executor.a2a_agent_executor import A2aAgentExecutor
+    from google.adk.a2a.utils.agent_card_builder import AgentCardBuilder
+    from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
+    from google.adk.auth.credential_service.in_memory_credential_service import InMemoryCredentialService
+    from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+    from google.adk.runners import Runner
+    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+    from starlette.applications import Starlette
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import JSONResponse, Response
 except ImportError as e:
     logger.error("google-adk not installed. Install with: pip install google-adk")
     raise RuntimeError("google-adk is required for A2A server") from e
 
+PORT = 8083
+
+# fast path 로 처리하는 스킬 (id → 핸들러)
+FAST_SKILLS = {
+    "calculate_ticker_score": calculate_ticker_score,
+    "get_ticker_info": get_ticker_info,
+    "rank_tickers": rank_tickers,
+}
+# 작업 큐로 처리하는 스킬: A2A 태스크 상태를 작업 상태가 이끈다
+JOB_SKILL = "submit_ticker_score_job"
+
+
+def _parse_fast_request(context: RequestContext) -> Optional[tuple[str, Dict[str, Any]]]:
+    """구조화 요청이면 (skill, input) 반환, 자연어 요청이면 None"""
+    message = context.message
+    if message is None:
+        return None
+    meta = {**(context.metadata or {}), **(message.metadata or {})}
+    skill = meta.get("skill") or meta.get("skill_id")
+
+    for part in message.parts or []:
+        part = getattr(part, "root", part)
+        if isinstance(part, DataPart) and isinstance(part.data, dict):
+            data = part.data
+            data_skill = data.get("skill") or skill
+            if data.get("ticker"):
+                return data_skill or "calculate_ticker_score", {
+                    k: data[k] for k in ("ticker", "enrich", "profile", "timeout_ms", "class",
+                                         "priority", "callback_url") if data.get(k) not in (None, "")}
+            if data_skill in FAST_SKILLS or data_skill == JOB_SKILL:
+                return data_skill, data.get("input") or {}
+
+    if skill == "get_ticker_info":
+        return skill, {}
+    if skill in ("calculate_ticker_score", JOB_SKILL):
+        m = re.search(TICKER_PATTERN, context.get_user_input())
+        if m:
+            return skill, {"ticker": m.group(1)}
+    return None
+
+
+class FastPathAgentExecutor(AgentExecutor):
+    """
+    구조화 요청은 워크플로우를 직접 실행하고, 나머지는 ADK executor 에 위임.
+    tasks/cancel: 실행 중인 fast path 태스크를 취소 → run_once 의 MCP/LLM 호출까지 중단하고 canceled 상태로 종료
+    (작업 큐 태스크는 작업도 함께 취소)
+    """
+
+    def __init__(self, fallback: AgentExecutor):
+        self.fallback = fallback
+        self._running: Dict[str, asyncio.Task] = {}   # task_id → execute() 를 돌리는 태스크
+
+    async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        parsed = _parse_fast_request(context)
+        if parsed is not None and parsed[0] == JOB_SKILL:
+            return await self._execute_job(context, event_queue, parsed[1])
+        if parsed is None or parsed[0] not in FAST_SKILLS:
+            return await self.fallback.execute(context, event_queue)
+
+        skill, skill_input = parsed
+        updater = TaskUpdater(event_queue, context.task_id, context.context_id)
+        if context.current_task is None:
+            await updater.submit()
+        await updater.start_work()
+        logger.info("[A2A] fast path skill=%s input=%s", skill, skill_input)
+
+        self._running[context.task_id] = asyncio.current_task()
+        try:
+            handler = FAST_SKILLS[skill]
+            result = handler(skill_input)
+            if inspect.isawaitable(result):
+                result = await result
+        except asyncio.CancelledError:
+            # canceled 상태는 cancel() 이 발행함
+            logger.info("[A2A] fast path task %s cancelled", context.task_id)
+            raise
+        finally:
+            self._running.pop(context.task_id, None)
+
+        await updater.add_artifact([Part(root=DataPart(data=result))], name=skill)
+        if result.get("error"):
+            await updater.failed(new_agent_text_message(
+                str(result["error"]), context.context_id, context.task_id))
+        else:
+            await updater.complete()
+
+    async def _execute_job(self, context: RequestContext, event_queue: EventQueue,
+                           skill_input: Dict[str, Any]) -> None:
+        """작업 큐에 등록하고 작업 상태 변화를 A2A 태스크 상태로 발행 (작업이 다른 프로세스에서 돌아도 저장소로 추적)"""
+        updater = TaskUpdater(event_queue, context.task_id, context.context_id)
+        ticker = skill_input.get("ticker")
+        if not ticker:
+            await updater.failed(new_agent_text_message(
+                "ticker parameter is required", context.context_id, context.task_id))
+            return
+        tenant = current_tenant.get() or tenants.system
+        job = await job_queue.submit(ticker, priority=int(skill_input.get("priority", 5)),
+                                     callback_url=skill_input.get("callback_url"), tenant=tenant.name,
+                                     job_id=context.task_id)
+        logger.info("[A2A] job task=%s ticker=%s", job.id, job.ticker)
+        if context.current_task is None:
+            await updater.submit(new_agent_text_message(
+                f"job {job.id} submitted", context.context_id, context.task_id))
+
+        self._running[context.task_id] = asyncio.current_task()
+        try:
+            async for job in job_queue.watch(job.id):
+                if job.state == WORKING:
+                    await updater.start_work()
+        except asyncio.CancelledError:
+            logger.info("[A2A] job task %s cancelled", context.task_id)
+            raise
+        finally:
+            self._running.pop(context.task_id, None)
+
+        if job.state == COMPLETED:
+            await updater.add_artifact([Part(root=DataPart(data=job.result or {}))], name=JOB_SKILL)
+            await updater.complete()
+        elif job.state == FAILED:
+            await updater.failed(new_agent_text_message(
+                job.error or "job failed", context.context_id, context.task_id))
+        elif job.state == CANCELED:
+            await updater.cancel(new_agent_text_message("job cancelled", context.context_id, context.task_id))
+
+    async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
+        task = self._running.pop(context.task_id, None)
+        if task is not None:
+            task.cancel()
+        job_queue.cancel(context.task_id)  # 작업 큐 태스크면 작업도 취소 (아니면 무시)
+        # ADK 경로는 요청 핸들러가 실행 태스크를 취소하므로 상태만 발행
+        record_cancel("a2a")
+        updater = TaskUpdater(event_queue, context.task_id, context.context_id)
+        await updater.cancel(new_agent_text_message("cancelled by client", context.context_id, context.task_id))
+
+
+def _fast_path_skills() -> list:
+    return [
+        AgentSkill(
+            id="calculate_ticker_score",
+            name="calculate_ticker_score",
+            description="구조화 요청 {\"ticker\": \"AAPL\"} 으로 LLM 래퍼 없이 점수를 계산하고 DataPart artifact 로 반환 "
+                        "(선택: \"profile\": fast|standard|deep, \"enrich\": 보강 데이터셋, \"timeout_ms\": 마감, "
+                        "\"class\": batch). "
+                        "tasks/cancel 로 실행 중인 MCP/LLM 호출까지 취소 가능",
+            tags=["tools", "structured"],
+            examples=['{"ticker": "AAPL"}', '{"ticker": "AAPL", "profile": "fast"}'],
+            input_modes=["application/json"],
+            output_modes=["application/json"],
+        ),
+        AgentSkill(
+            id=JOB_SKILL,
+            name=JOB_SKILL,
+            description="오래 걸리는 점수 계산을 작업 큐에 등록. 태스크가 작업 상태(submitted → working → completed)를 "
+                        "따라가며 결과는 DataPart artifact 로 반환. configuration.blocking=false 로 보내고 "
+                        "tasks/get 으로 폴링 (선택: \"priority\": 0이 가장 높음, \"callback_url\"). tasks/cancel 로 작업 취소",
+            tags=["tools", "structured", "async"],
+            examples=['{"skill": "submit_ticker_score_job", "ticker": "AAPL"}'],
+            input_modes=["application/json"],
+            output_modes=["application/json"],
+        ),
+        AgentSkill(
+            id="rank_tickers",
+            name="rank_tickers",
+            description="점수화된 종목 테이블에서 점수순 top-k / 백분위를 바로 조회 "
+                        "(선택: \"k\", \"sector\", \"min_score\", \"max_age_s\", \"tickers\", \"order\")",
+            tags=["tools", "structured"],
+            examples=['{"skill": "rank_tickers", "input": {"k": 20, "sector": "Technology"}}'],
+            input_modes=["application/json"],
+            output_modes=["application/json"],
+        ),
+    ]
+
+
+class AgentCardETagMiddleware(BaseHTTPMiddleware):
+    """Agent Card 응답에 ETag 를 붙이고 If-None-Match 가 같으면 304 (클라이언트 조건부 갱신용)"""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if request.method != "GET" or not request.url.path.startswith("/.well-known/") \
+                or response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        return Response(content=body, status_code=200, headers={**headers, "ETag": etag},
+                        media_type=response.media_type)
+
+
+# JSON-RPC 서버 정의 오류 코드 (A2A 가 -32001~-32006 을 사용)
+RPC_UNAUTHORIZED, RPC_QUOTA_EXCEEDED = -32040, -32029
+# 요청 쿼터를 차감하는 메서드 (tasks/get 폴링 등은 차감하지 않음)
+METERED_METHODS = ("message/send", "message/stream")
+
+
+class TenantMiddleware(BaseHTTPMiddleware):
+    """
+    X-API-Key → 테넌트 (current_tenant 로 실행 태스크에 전파 → 스케줄러 클래스·LLM 토큰 쿼터).
+    message/send·message/stream 은 요청 쿼터 1건을 차감하고, 초과면 HTTP 429 + Retry-After
+    """
+
+    async def dispatch(self, request, call_next):
+        if request.url.path.startswith("/.well-known/"):
+            return await call_next(request)
+        rpc_id = None
+        try:
+            tenant = tenants.authenticate(request.headers.get("x-api-key"))
+            if request.method == "POST":
+                try:
+                    body = await request.json()
+                except ValueError:
+                    body = None  # 파싱 오류 응답은 JSON-RPC 핸들러가 만듦
+                if isinstance(body, dict):
+                    rpc_id = body.get("id")
+                    if body.get("method") in METERED_METHODS:
+                        tenants.admit(tenant)
+        except Unauthorized as e:
+            return JSONResponse({"jsonrpc": "2.0", "id": rpc_id,
+                                 "error": {"code": RPC_UNAUTHORIZED, "message": str(e)}}, status_code=401)
+        except QuotaExceeded as e:
+            return JSONResponse({"jsonrpc": "2.0", "id": rpc_id,
+                                 "error": {"code": RPC_QUOTA_EXCEEDED, "message": e.detail,
+                                           "data": {"retry_after_s": e.retry_after_s}}},
+                                status_code=429, headers={"Retry-After": str(e.retry_after_s)})
+        token = current_tenant.set(tenant)
+        try:
+            return await call_next(request)
+        finally:
+            current_tenant.reset(token)
+
+
+def build_a2a_app(agent=root_agent, host: str = "localhost", port: int = PORT) -> Starlette:
+    """google.adk to_a2a() 와 같은 구성이되 executor 를 FastPathAgentExecutor 로 감싼다"""
+
+    async def create_runner() -> Runner:
+        return Runner(
+            app_name=agent.name or "adk_agent",
+            agent=agent,
+            artifact_service=InMemoryArtifactService(),
+            session_service=InMemorySessionService(),
+            memory_service=InMemoryMemoryService(),
+            credential_service=InMemoryCredentialService(),
+        )
+
+    executor = FastPathAgentExecutor(A2aAgentExecutor(runner=create_runner))
+    request_handler = DefaultRequestHandler(agent_executor=executor, task_store=InMemoryTaskStore())
+    card_builder = AgentCardBuilder(agent=agent, rpc_url=f"http://{host}:{port}/")
+
+    app = Starlette()
+    app.add_middleware(AgentCardETagMiddleware)
+    app.add_middleware(TenantMiddleware)
+
+    async def setup_a2a():
+        card = await card_builder.build()
+        card.skills = [*_fast_path_skills(), *(card.skills or [])]
+        card.default_input_modes = [*card.default_input_modes, "application/json"]
+        A2AStarletteApplication(agent_card=card, http_handler=request_handler).add_routes_to_app(app)
+
+    app.add_event_handler("startup", setup_a2a)
+    return app
+
 
 # A2A FastAPI 앱 생성
 # - /.well-known/agent-card.json: 에이전트 능력 정보
 # - /: A2A 프로토콜 JSON-RPC 엔드포인트 (method: message/send)
-a2a_app = to_a2a(root_agent, port=8083)
+a2a_app = build_a2a_app(root_agent, port=PORT)
 
-logger.info("Ticker Score Agent A2A server initialized on port 8083")
-logger.info("Agent Card: http://localhost:8083/.well-known/agent-card.json")
-logger.info("JSON-RPC endpoint: http://localhost:8083/ (method: message/send)")
+logger.info("Ticker Score Agent A2A server initialized on port %d", PORT)
+logger.info("Agent Card: http://localhost:%d/.well-known/agent-card.json", PORT)
+logger.info("JSON-RPC endpoint: http://localhost:%d/ (method: message/send)", PORT)
 
 # 실행 방법:
 # uvicorn app.a2a_server:a2a_app --port 8083 --reload
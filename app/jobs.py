@@ -0,0 +1,399 @@
+"""
+비동기 점수 계산 작업 큐
+
+POST /jobs 로 작업을 등록하면 즉시 job_id 를 돌려주고, 워커 태스크가 우선순위 순서로
+run_once() 를 실행합니다. 상태 값은 A2A TaskState 어휘(submitted/working/completed/failed/canceled)를
+그대로 사용하므로 REST 응답과 A2A 태스크 상태가 1:1 로 대응합니다.
+
+저장소는 교체 가능:
+- InMemoryJobStore: 기본값, 프로세스 재시작 시 소실. 워커 프로세스 간 공유되지 않으므로 단일 워커 전용
+- SqliteJobStore: settings.job_store_path 지정 시. 여러 워커 프로세스(app.serve)가 같은 파일을 공유
+
+실행 전 claim() 으로 작업을 원자적으로 가져가며(submitted → working, 소유자 + 임대 만료 시각),
+실행 중에는 임대를 주기적으로 연장합니다. 다른 프로세스는 임대가 만료된 작업(소유 프로세스가 죽음)과
+오래 아무도 가져가지 않은 submitted 작업만 복구하므로, 살아 있는 워커가 실행 중인 작업을 다시 돌리지 않습니다.
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+from uuid import uuid4
+
+from app.settings import settings
+from app.workflow.graph import run_once
+from app.tenants import scheduled, tenants
+
+LOGGER = logging.getLogger("ticker-graph")
+
+# A2A TaskState 값과 동일
+SUBMITTED, WORKING, COMPLETED, FAILED, CANCELED = "submitted", "working", "completed", "failed", "canceled"
+TERMINAL_STATES = (COMPLETED, FAILED, CANCELED)
+
+# 이 프로세스의 작업 소유자 id (claim 시 기록)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+@dataclass
+class Job:
+    ticker: str
+    priority: int = 5  # 작을수록 먼저
+    callback_url: Optional[str] = None
+    tenant: Optional[str] = None  # 등록한 테넌트 (LLM 토큰 쿼터 차감 대상)
+    id: str = field(default_factory=lambda: uuid4().hex)
+    state: str = SUBMITTED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    owner: Optional[str] = None          # 실행 중인 프로세스 (WORKER_ID)
+    lease_until: Optional[float] = None  # 이 시각까지 갱신이 없으면 다른 프로세스가 복구
+
+    def claimable(self, now: float, orphan_s: float) -> bool:
+        """복구 대상: 임대가 만료된 working / orphan_s 넘게 아무도 가져가지 않은 submitted"""
+        if self.state == WORKING:
+            return (self.lease_until or 0.0) < now
+        return self.state == SUBMITTED and self.created_at < now - orphan_s
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore(Protocol):
+    def save(self, job: Job) -> None: ...
+    def get(self, job_id: str) -> Optional[Job]: ...
+    def pending(self) -> List[Job]: ...
+    def claim(self, job_id: str, owner: str, lease_s: float) -> Optional[Job]: ...
+    def renew(self, job: Job, lease_s: float) -> bool: ...
+    def finish(self, job: Job, state: str) -> bool: ...
+
+
+def _claimed(job: Job, owner: str, lease_s: float, now: float) -> Job:
+    job.state, job.owner, job.lease_until = WORKING, owner, now + lease_s
+    job.started_at = now
+    return job
+
+
+class InMemoryJobStore:
+    def __init__(self, retention_s: float):
+        self.retention_s = retention_s
+        self._jobs: Dict[str, Job] = {}
+
+    def save(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        if job.state in TERMINAL_STATES:
+            self._prune()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def pending(self) -> List[Job]:
+        return [j for j in self._jobs.values() if j.state not in TERMINAL_STATES]
+
+    def claim(self, job_id: str, owner: str, lease_s: float) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        now = time.time()
+        if job is None or not (job.state == SUBMITTED or job.claimable(now, lease_s)):
+            return None
+        return _claimed(job, owner, lease_s, now)
+
+    def renew(self, job: Job, lease_s: float) -> bool:
+        if job.state != WORKING:
+            return False
+        job.lease_until = time.time() + lease_s
+        return True
+
+    def finish(self, job: Job, state: str) -> bool:
+        """아직 이 소유자가 실행 중(working)일 때만 끝난 상태로 기록"""
+        current = self._jobs.get(job.id)
+        if current is None or current.state != WORKING or current.owner != job.owner:
+            return False
+        job.state, job.finished_at, job.lease_until = state, time.time(), None
+        self.save(job)
+        return True
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_s
+        for jid in [j.id for j in self._jobs.values()
+                    if j.finished_at is not None and j.finished_at < cutoff]:
+            self._jobs.pop(jid, None)
+
+
+class SqliteJobStore:
+    """재시작에도 남고 같은 호스트의 워커 프로세스들이 공유하는 작업 저장소"""
+
+    def __init__(self, path: str, retention_s: float):
+        self.path = path
+        self.retention_s = retention_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, state TEXT NOT NULL, finished_at REAL, body TEXT NOT NULL,"
+            " owner TEXT, lease_until REAL)"
+        )
+        # 이전 스키마(소유자/임대 열 없음) 파일 이어 쓰기
+        columns = {r[1] for r in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    @staticmethod
+    def _body(job: Job) -> str:
+        return json.dumps(job.to_dict(), ensure_ascii=False)
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, state, finished_at, body, owner, lease_until)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.state, job.finished_at, self._body(job), job.owner, job.lease_until),
+            )
+            if job.state in TERMINAL_STATES:
+                self._db.execute("DELETE FROM jobs WHERE finished_at < ?",
+                                 (time.time() - self.retention_s,))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT body FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(**json.loads(row[0])) if row else None
+
+    def pending(self) -> List[Job]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT body FROM jobs WHERE state IN (?, ?)", (SUBMITTED, WORKING)
+            ).fetchall()
+        return [Job(**json.loads(r[0])) for r in rows]
+
+    def claim(self, job_id: str, owner: str, lease_s: float) -> Optional[Job]:
+        """submitted 이거나 임대가 만료된 작업만 가져감. 조건부 UPDATE 라 프로세스 간에도 한 곳만 성공"""
+        job = self.get(job_id)
+        if job is None or job.state not in (SUBMITTED, WORKING):
+            return None
+        now = time.time()
+        _claimed(job, owner, lease_s, now)
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET state = ?, owner = ?, lease_until = ?, body = ?"
+                " WHERE id = ? AND (state = ? OR (state = ? AND COALESCE(lease_until, 0) < ?))",
+                (WORKING, owner, job.lease_until, self._body(job), job_id, SUBMITTED, WORKING, now),
+            )
+        return job if cur.rowcount == 1 else None
+
+    def renew(self, job: Job, lease_s: float) -> bool:
+        """임대 연장. 그새 다른 프로세스가 가져갔으면 False"""
+        job.lease_until = time.time() + lease_s
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET lease_until = ?, body = ? WHERE id = ? AND owner = ? AND state = ?",
+                (job.lease_until, self._body(job), job.id, job.owner, WORKING),
+            )
+        return cur.rowcount == 1
+
+    def finish(self, job: Job, state: str) -> bool:
+        """
+        끝난 상태 기록. 조건부 UPDATE 라 그새 다른 프로세스가 취소했거나(canceled) 임대를 가져갔으면
+        아무 행도 바꾸지 않고 False
+        """
+        job.state, job.finished_at, job.lease_until = state, time.time(), None
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, lease_until = NULL, body = ?"
+                " WHERE id = ? AND owner = ? AND state = ?",
+                (state, job.finished_at, self._body(job), job.id, job.owner, WORKING),
+            )
+            if cur.rowcount == 1:
+                self._db.execute("DELETE FROM jobs WHERE finished_at < ?",
+                                 (time.time() - self.retention_s,))
+        return cur.rowcount == 1
+
+
+class JobQueue:
+    """인프로세스 우선순위 큐 + 고정 개수 워커"""
+
+    def __init__(self, store: JobStore, workers: int = 4, lease_s: float = 60.0):
+        self.store = store
+        self.workers = workers
+        self.lease_s = lease_s
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._queued: set = set()  # 이 프로세스 큐에 들어 있는 job_id (복구 중복 방지)
+        self._active: Dict[str, asyncio.Task] = {}  # 이 프로세스에서 실행 중인 job_id → run 태스크
+
+    async def start(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover_loop()))
+
+    def _enqueue(self, job: Job) -> None:
+        self._queued.add(job.id)
+        self._queue.put_nowait((job.priority, next(self._seq), job.id))
+
+    def _recover(self) -> None:
+        """죽은 프로세스가 남긴 작업(임대 만료 / 오래된 submitted)을 이 프로세스 큐에 넣음"""
+        now = time.time()
+        for job in self.store.pending():
+            if job.id not in self._queued and job.claimable(now, self.lease_s):
+                LOGGER.info("[jobs] recovering id=%s state=%s owner=%s", job.id, job.state, job.owner)
+                self._enqueue(job)
+
+    async def _recover_loop(self) -> None:
+        while True:
+            try:
+                self._recover()
+            except Exception:
+                LOGGER.exception("[jobs] recovery scan failed")
+            await asyncio.sleep(self.lease_s / 2)
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self._queue = [], None
+
+    async def submit(self, ticker: str, priority: int = 5, callback_url: Optional[str] = None,
+                     tenant: Optional[str] = None, job_id: Optional[str] = None) -> Job:
+        """job_id: 지정하면 그 id 로 등록 (A2A 태스크 id 와 맞출 때)"""
+        await self.start()
+        job = Job(ticker=ticker.upper().strip(), priority=priority, callback_url=callback_url, tenant=tenant)
+        if job_id:
+            job.id = job_id
+        self.store.save(job)
+        self._enqueue(job)
+        LOGGER.info("[jobs] submitted id=%s ticker=%s priority=%d", job.id, job.ticker, priority)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    async def watch(self, job_id: str, poll_s: float = 0.5):
+        """상태가 바뀔 때마다 작업을 돌려줌 (끝난 상태에서 멈춤). 다른 프로세스가 실행해도 저장소를 보고 따라감"""
+        last = None
+        while True:
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            if job.state != last:
+                last = job.state
+                yield job
+            if job.state in TERMINAL_STATES:
+                return
+            await asyncio.sleep(poll_s)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        작업 취소. 이 프로세스에서 실행 중이면 run 태스크를 취소하고(진행 중인 MCP/LLM 호출까지),
+        대기 중이거나 다른 프로세스가 실행 중이면 저장소에 canceled 로 기록
+        (실행 중인 프로세스는 다음 임대 연장 때 이를 보고 실행을 멈춤)
+        """
+        job = self.store.get(job_id)
+        if job is None or job.state in TERMINAL_STATES:
+            return job
+        run = self._active.get(job_id)
+        if run is not None:
+            run.cancel()
+            return job
+        job.state, job.finished_at, job.lease_until = CANCELED, time.time(), None
+        self.store.save(job)
+        LOGGER.info("[jobs] cancelled id=%s", job_id)
+        return job
+
+    async def _worker(self, idx: int) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                # 다른 프로세스가 먼저 가져갔거나 이미 끝났으면 None
+                job = self.store.claim(job_id, WORKER_ID, self.lease_s)
+                if job is not None:
+                    await self._run(job)
+            except Exception:
+                LOGGER.exception("[jobs] worker-%d crashed on %s", idx, job_id)
+            finally:
+                self._queued.discard(job_id)
+                self._queue.task_done()
+
+    async def _heartbeat(self, job: Job, run: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            if not self.store.renew(job, self.lease_s):
+                # 다른 곳에서 취소됐거나 임대를 잃음(다른 프로세스가 복구) → 실행 중단
+                LOGGER.warning("[jobs] lost lease id=%s, stopping run", job.id)
+                run.cancel()
+                return
+
+    async def _execute(self, job: Job) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+        """(끝난 상태, 결과, 오류). job 은 건드리지 않음 — 기록은 store.finish 가 성공할 때만"""
+        try:
+            # 작업은 항상 batch 클래스 (대화형 요청을 밀어내지 않음)
+            async with scheduled(tenants.get(job.tenant), "batch"):
+                result = await run_once(job.ticker)
+            return COMPLETED, {k: result.get(k) for k in
+                               ("ticker", "score", "rationale", "price", "news", "filings")}, None
+        except Exception as e:
+            LOGGER.error("[jobs] %s failed: %s", job.id, e)
+            return FAILED, None, f"{type(e).__name__}: {e}"
+
+    async def _run(self, job: Job) -> None:
+        run = asyncio.create_task(self._execute(job))
+        self._active[job.id] = run
+        heartbeat = asyncio.create_task(self._heartbeat(job, run))
+        try:
+            # wait() 는 run 이 취소돼도 예외 없이 돌아옴 → 작업 취소와 큐 종료(이 태스크 취소)를 구분
+            await asyncio.wait({run})
+        except asyncio.CancelledError:
+            run.cancel()
+            raise
+        finally:
+            heartbeat.cancel()
+            self._active.pop(job.id, None)
+        if run.cancelled():
+            state = CANCELED
+        else:
+            state, job.result, job.error = run.result()
+        # 다른 프로세스가 취소했거나 임대를 가져갔으면 결과를 버리고 콜백도 보내지 않음
+        if not self.store.finish(job, state):
+            LOGGER.warning("[jobs] %s was cancelled or taken over elsewhere, dropping result", job.id)
+            return
+        if job.callback_url:
+            await _notify(job)
+
+
+async def _notify(job: Job, attempts: int = 3) -> None:
+    """완료 콜백(webhook) POST, 실패 시 지수 백오프로 재시도"""
+    import httpx
+
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        for i in range(attempts):
+            try:
+                resp = await client.post(job.callback_url, json=job.to_dict())
+                if resp.status_code < 500:
+                    return
+            except httpx.HTTPError as e:
+                LOGGER.warning("[jobs] callback %s failed: %s", job.callback_url, e)
+            await asyncio.sleep(2 ** i)
+    LOGGER.error("[jobs] callback gave up id=%s url=%s", job.id, job.callback_url)
+
+
+def _build_store() -> JobStore:
+    if settings.job_store_path:
+        return SqliteJobStore(settings.job_store_path, settings.job_retention_s)
+    if settings.workers > 1:
+        # 워커마다 따로 저장 → 다른 워커로 간 GET /jobs/{id} 는 404
+        LOGGER.warning("[jobs] in-memory job store with %d workers: jobs are not shared between workers, "
+                       "set JOB_STORE_PATH (python -m app.serve does this automatically)", settings.workers)
+    return InMemoryJobStore(settings.job_retention_s)
+
+
+job_queue = JobQueue(_build_store(), workers=settings.job_workers, lease_s=settings.job_lease_s)
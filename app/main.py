@@ -1,8 +1,26 @@
 from __future__ import annotations
-import json
-from fastapi import FastAPI, Query
-from fastapi.responses import JSONResponse, StreamingResponse
-from workflow.graph import run_with_trace, run_stream, run_once
+import asyncio
+import time
+from typing import List, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from app.workflow.graph import run_with_trace, run_stream, run_once
+from app.workflow.mcp_clients import mcp_pool
+from app.workflow.cassette import cassette
+from app.jobs import job_queue
+from app.subscriptions import broadcaster, refresher
+from app.tenants import QuotaExceeded, Tenant, Unauthorized, request_class, scheduled, scheduler, tenants
+from app.sse import KEEPALIVE, EventStreamResponse, format_event, sse_runs
+from app.workflow.metrics import metrics
+from app.workflow.prescore import llm_gate
+from app.workflow.cache import result_cache
+from app.workflow.universe import universe
+from app.workflow.llm import llm_router, llm_routers
+from app.workflow.enrichment import parse_enrich
+from app.workflow.profiles import DeadlineExceeded, profile_stats, resolve_profile
+from app.workflow.deadline import cancel_stats, record_cancel
+from app.settings import settings
 
 app = FastAPI(title="Parallel MCP + CLOVA X Scoring")
 
@@ -13,27 +31,346 @@ logging.basicConfig(
 )
 LOGGER = logging.getLogger("ticker-graph")
 
-@app.get("/score")
-async def score(ticker: str = Query(..., min_length=1)):
-    result = await run_once(ticker)
-    return JSONResponse({
+@app.on_event("startup")
+async def _start_jobs():
+    await job_queue.start()
+    await refresher.start()
+
+@app.on_event("shutdown")
+async def _close_mcp_pool():
+    await refresher.stop()
+    await job_queue.stop()
+    await mcp_pool.close()
+    cassette.close()
+
+# 보강 데이터셋 선택: "financials,holders,recommendations,actions,options" 중 쉼표 구분 / "all"
+ENRICH_QUERY = Query(None, description="optional enrichment datasets (comma separated, or 'all')")
+# 점수 프로필: fast | standard | deep (생략 시 DEFAULT_PROFILE)
+PROFILE_QUERY = Query(None, description="scoring profile: fast | standard | deep")
+# 클라이언트 마감: 프로필 마감보다 짧으면 이 시간 안에 끝나지 않는 MCP/LLM 호출을 끊고 504
+TIMEOUT_QUERY = Query(None, gt=0, description="client deadline in ms (capped by the profile deadline)")
+
+# 테넌트 인증 (TENANTS_PATH 가 없으면 인증 없이 default 테넌트)
+def _tenant(x_api_key: Optional[str] = Header(None, alias="X-API-Key")) -> Tenant:
+    try:
+        return tenants.authenticate(x_api_key)
+    except Unauthorized as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "ApiKey"})
+
+TENANT = Depends(_tenant)
+# 스케줄링 클래스: interactive | batch (엔드포인트/테넌트 기본값보다 낮추는 것만 가능)
+PRIORITY_CLASS = Header(None, alias="X-Priority-Class", description="interactive | batch (can only lower priority)")
+
+@app.exception_handler(QuotaExceeded)
+async def _quota_exceeded(request: Request, exc: QuotaExceeded):
+    return JSONResponse({"detail": exc.detail, "retry_after_s": exc.retry_after_s}, status_code=429,
+                        headers={"Retry-After": str(exc.retry_after_s)})
+
+def _check_request(enrich: Optional[str], profile: Optional[str] = None) -> None:
+    try:
+        parse_enrich(enrich)
+        resolve_profile(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _score_body(result: dict) -> dict:
+    return {
         "ticker":    result["ticker"],
         "score":     result["score"],
-        "rationale": result["rationale"]
+        "rationale": result["rationale"],
+        "score_source": result["score_source"],
+        "output_status": result["output_status"],
+        "profile":   result["profile"],
+        "enrichment": result["enrichment"],
+    }
+
+class ClientDisconnected(Exception):
+    """응답을 기다리던 클라이언트가 연결을 끊음"""
+
+async def _cancel_on_disconnect(request: Request, aw):
+    """
+    aw 를 실행하다 클라이언트가 끊기면(http.disconnect) 취소 → 진행 중인 MCP/LLM 호출까지 중단.
+    (본문은 이미 읽었으므로 다음 receive() 는 끊김 때만 돌아옴)
+    """
+    task = asyncio.ensure_future(aw)
+
+    async def disconnected() -> None:
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        gone = watcher.done()
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            if gone:
+                record_cancel("disconnect")
+    if task.cancelled():
+        raise ClientDisconnected()
+    return task.result()
+
+@app.exception_handler(ClientDisconnected)
+async def _client_disconnected(request: Request, exc: ClientDisconnected):
+    # 받을 사람이 없는 응답 (nginx 관례의 499)
+    return JSONResponse({"detail": "client closed request"}, status_code=499)
+
+async def _run_scheduled(tenant: Tenant, cls: str, ticker: str, enrich: Optional[str], profile: Optional[str],
+                         timeout_s: Optional[float] = None) -> dict:
+    """스케줄러 슬롯을 받아 run_once (대기열에서 보낸 시간도 클라이언트 마감에 포함)"""
+    t0 = time.perf_counter()
+    async with scheduled(tenant, cls):
+        if timeout_s is not None:
+            timeout_s -= time.perf_counter() - t0
+            if timeout_s <= 0:
+                raise DeadlineExceeded(f"request deadline exceeded while queued for {ticker}")
+        return await run_once(ticker, enrich=enrich, profile=profile, timeout_s=timeout_s)
+
+@app.get("/score")
+async def score(request: Request, ticker: str = Query(..., min_length=1), enrich: Optional[str] = ENRICH_QUERY,
+                profile: Optional[str] = PROFILE_QUERY, timeout_ms: Optional[int] = TIMEOUT_QUERY,
+                tenant: Tenant = TENANT, priority_class: Optional[str] = PRIORITY_CLASS):
+    _check_request(enrich, profile)
+    tenants.admit(tenant)
+    cls = request_class(tenant, "interactive", priority_class)
+    timeout_s = timeout_ms / 1000 if timeout_ms else None
+    try:
+        result = await _cancel_on_disconnect(
+            request, _run_scheduled(tenant, cls, ticker, enrich, profile, timeout_s))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return JSONResponse(_score_body(result))
+
+class BatchRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1, max_length=200)
+    profile: Optional[str] = None
+    enrich: Optional[str] = None
+    timeout_ms: Optional[int] = Field(None, gt=0)  # 배치 전체 마감 (티커별 실행은 남은 시간만큼)
+
+@app.post("/score/batch")
+async def score_batch(req: BatchRequest, request: Request, tenant: Tenant = TENANT,
+                      priority_class: Optional[str] = PRIORITY_CLASS):
+    """
+    여러 티커를 같은 프로필로 동시에 점수화 (동시 실행 수 BATCH_CONCURRENCY, 티커별 실패는 error 로 표시).
+    티커마다 요청 쿼터 1건, 스케줄러에서는 batch 클래스.
+    마감이 지난 뒤 차례가 온 티커는 실행하지 않고, 클라이언트가 끊기면 남은 실행을 모두 취소
+    """
+    _check_request(req.enrich, req.profile)
+    names = [t.strip() for t in req.tickers if t.strip()]
+    tenants.admit(tenant, len(names))
+    cls = request_class(tenant, "batch", priority_class)
+    sem = asyncio.Semaphore(max(1, settings.batch_concurrency))
+    deadline = time.time() + req.timeout_ms / 1000 if req.timeout_ms else None
+
+    async def one(ticker: str) -> dict:
+        async with sem:
+            timeout_s = None if deadline is None else deadline - time.time()
+            if timeout_s is not None and timeout_s <= 0:
+                metrics.incr("cancel.runs_skipped")
+                return {"ticker": ticker, "score": None, "error": "DeadlineExceeded: batch deadline exceeded"}
+            try:
+                return _score_body(await _run_scheduled(tenant, cls, ticker, req.enrich, req.profile, timeout_s))
+            except Exception as e:
+                LOGGER.warning("[batch] %s failed: %s", ticker, e)
+                return {"ticker": ticker, "score": None, "error": f"{type(e).__name__}: {e}"}
+
+    t0 = time.perf_counter()
+    results = await _cancel_on_disconnect(
+        request, asyncio.gather(*(one(t) for t in names)))
+    return JSONResponse({
+        "profile": resolve_profile(req.profile).name,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "results": results,
     })
 
+LAST_EVENT_ID = Header(None, alias="Last-Event-ID", description="resume a run from this event id")
+
+def _sse_run(key: tuple, source, last_event_id: Optional[str], tenant: Tenant) -> EventStreamResponse:
+    """
+    Last-Event-ID 가 같은 요청(같은 테넌트)의 살아 있는 실행을 가리키면 이어서, 아니면 새 실행 시작.
+    요청 쿼터는 새 실행에만 차감. 재개하지 못한 Last-Event-ID 는 restarted 이벤트로 알림
+    """
+    resumed = sse_runs.resume(last_event_id, (tenant.name, *key))
+    if resumed is not None:
+        return EventStreamResponse(sse_runs.stream(*resumed), headers={"X-Run-Id": resumed[0].run_id})
+    tenants.admit(tenant)
+    buf = sse_runs.start((tenant.name, *key), source())
+    return EventStreamResponse(sse_runs.stream(buf, restarted_from=last_event_id),
+                               headers={"X-Run-Id": buf.run_id})
+
 @app.get("/score/stream")
-async def score_stream(ticker: str = Query(..., min_length=1)):
-    async def sse():
-        async for ev in run_stream(ticker):
-            yield f"event: progress\ndata: {json.dumps(ev, ensure_ascii=False)}\n\n"
-        yield f"event: done\ndata: {json.dumps({'ticker': ticker}, ensure_ascii=False)}\n\n"
+async def score_stream(ticker: str = Query(..., min_length=1), enrich: Optional[str] = ENRICH_QUERY,
+                       profile: Optional[str] = PROFILE_QUERY, last_event_id: Optional[str] = LAST_EVENT_ID,
+                       tenant: Tenant = TENANT, priority_class: Optional[str] = PRIORITY_CLASS):
+    _check_request(enrich, profile)
+    cls = request_class(tenant, "interactive", priority_class)
+
+    async def events():
+        async with scheduled(tenant, cls):
+            async for ev in run_stream(ticker, enrich=enrich, profile=profile):
+                yield "progress", ev
+        yield "done", {"ticker": ticker}
 
-    return StreamingResponse(sse(), media_type="text/event-stream")
+    return _sse_run(("stream", ticker, enrich, profile), events, last_event_id, tenant)
 
 @app.get("/score/trace")
-async def score_trace(ticker: str = Query(...)):
+async def score_trace(ticker: str = Query(...), enrich: Optional[str] = ENRICH_QUERY,
+                      profile: Optional[str] = PROFILE_QUERY, last_event_id: Optional[str] = LAST_EVENT_ID,
+                      tenant: Tenant = TENANT, priority_class: Optional[str] = PRIORITY_CLASS):
+    _check_request(enrich, profile)
+    cls = request_class(tenant, "interactive", priority_class)
+
+    async def events():
+        async with scheduled(tenant, cls):
+            async for ev in run_with_trace(ticker, enrich=enrich, profile=profile):
+                yield ev["event"], ev
+
+    return _sse_run(("trace", ticker, enrich, profile), events, last_event_id, tenant)
+
+# ── 점수 변경 구독 (push) ────────────────────────────────────────────────────
+def _subscribe_tickers(tickers: str) -> List[str]:
+    names = [t for t in tickers.split(",") if t.strip()]
+    if not names or len(names) > settings.subscribe_max_tickers:
+        raise ValueError(f"1..{settings.subscribe_max_tickers} tickers required")
+    return names
+
+@app.get("/subscribe")
+async def subscribe(tickers: str = Query(..., min_length=1, description="comma separated tickers"),
+                    tenant: Tenant = TENANT):
+    """SSE 구독: 최신 상태(snapshot) 후 점수/가격이 임계값 이상 바뀔 때마다 update 이벤트 (연결 시 요청 쿼터 1건)"""
+    try:
+        names = _subscribe_tickers(tickers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tenants.admit(tenant)
+
     async def sse():
-        async for ev in run_with_trace(ticker):
-            yield f"event: {ev['event']}\ndata: {json.dumps(ev, ensure_ascii=False)}\n\n"
-    return StreamingResponse(sse(), media_type="text/event-stream")
+        sub = broadcaster.subscribe(names)  # 연결이 끊기면 finally 에서 해제
+        try:
+            yield format_event("subscribed", {"tickers": sorted(sub.tickers)})
+            while True:
+                try:
+                    ev = await asyncio.wait_for(sub.next(), settings.sse_keepalive_s)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                yield format_event(ev["type"], ev)
+                if ev["type"] == "dropped":
+                    break
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    # 재개(Last-Event-ID)는 없음: 재접속하면 snapshot 으로 최신 상태를 다시 받음
+    return EventStreamResponse(sse())
+
+@app.websocket("/subscribe/ws")
+async def subscribe_ws(ws: WebSocket):
+    """
+    WebSocket 구독 (?tickers=AAPL,MSFT). 연결 중 {"subscribe": [...]} / {"unsubscribe": [...]} 로 목록 변경.
+    서버 → 클라이언트 메시지는 SSE 이벤트와 같은 JSON (type: subscribed | snapshot | update | dropped | error)
+    API 키는 X-API-Key 헤더 또는 ?api_key= (브라우저는 헤더를 못 붙임). 쿼터 초과면 1013 + 재시도 시간
+    """
+    await ws.accept()
+    try:
+        names = _subscribe_tickers(ws.query_params.get("tickers", ""))
+        tenants.admit(tenants.authenticate(ws.headers.get("x-api-key") or ws.query_params.get("api_key")))
+    except (ValueError, Unauthorized) as e:
+        await ws.close(code=1008, reason=str(e))
+        return
+    except QuotaExceeded as e:
+        await ws.close(code=1013, reason=f"{e.detail}; retry after {e.retry_after_s}s")
+        return
+    sub = broadcaster.subscribe(())
+    broadcaster.offer(sub, {"type": "subscribed", "tickers": sorted({n.strip().upper() for n in names})})
+    broadcaster.update(sub, add=names)  # 이미 발행된 티커는 snapshot 이 뒤따름
+
+    async def receive():
+        while True:
+            msg = await ws.receive_json()
+            try:
+                broadcaster.update(sub, add=msg.get("subscribe") or (), remove=msg.get("unsubscribe") or ())
+                broadcaster.offer(sub, {"type": "subscribed", "tickers": sorted(sub.tickers)})
+            except (AttributeError, ValueError) as e:
+                broadcaster.offer(sub, {"type": "error", "detail": str(e)})
+
+    async def send():
+        # 전송은 이 태스크만 담당 (제어 응답도 구독자 큐를 거침)
+        while True:
+            ev = await sub.next()
+            await ws.send_json(ev)
+            if ev["type"] == "dropped":
+                await ws.close(code=1013, reason="slow consumer")
+                return
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for t in tasks:
+            t.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        broadcaster.unsubscribe(sub)
+    for r in results:
+        if isinstance(r, Exception) and not isinstance(r, (WebSocketDisconnect, asyncio.CancelledError)):
+            LOGGER.warning("[subscribe] websocket closed: %r", r)
+
+@app.get("/rank")
+async def rank(k: int = Query(20, ge=1, le=1000),
+               sector: Optional[str] = Query(None, description="sector name (case-insensitive)"),
+               min_score: Optional[float] = Query(None, ge=0, le=100),
+               max_score: Optional[float] = Query(None, ge=0, le=100),
+               max_age_s: Optional[float] = Query(None, gt=0, description="only scores newer than this"),
+               tickers: Optional[str] = Query(None, description="restrict to these tickers (comma separated)"),
+               order: str = Query("desc", pattern="^(asc|desc)$"), tenant: Tenant = TENANT):
+    """점수화된 종목 테이블에서 top-k / 백분위 조회 (그래프를 실행하지 않음)"""
+    return universe.query(
+        k=k, sector=sector, min_score=min_score, max_score=max_score, max_age_s=max_age_s,
+        tickers=tickers.split(",") if tickers else None, ascending=order == "asc",
+    )
+
+@app.get("/metrics")
+async def get_metrics():
+    """워커 프로세스 로컬 메트릭 (프로필별 지연/SLO, LLM 토큰/프롬프트 캐시 적중률, 게이트, 결과 캐시)"""
+    return {
+        **metrics.snapshot(),
+        "profiles": profile_stats(),
+        "llm_cached_token_ratio": metrics.ratio("llm.cached_tokens", "llm.input_tokens"),
+        "llm_gate": dict(llm_gate.stats),
+        "llm_backends": llm_router.status(),
+        "llm_tiers": {tier: r.status() for tier, r in llm_routers.items() if tier != "default"},
+        "result_cache": dict(result_cache.stats),
+        "universe": {"size": len(universe), "sectors": universe.sectors()},
+        "subscriptions": broadcaster.stats(),
+        "sse": sse_runs.stats(),
+        "cancellation": cancel_stats(),
+        "tenants": tenants.stats(),
+        "scheduler": scheduler.stats(),
+    }
+
+# ── 비동기 작업 API ──────────────────────────────────────────────────────────
+class JobRequest(BaseModel):
+    ticker: str = Field(..., min_length=1)
+    priority: int = Field(5, ge=0, le=9)  # 0이 가장 높음
+    callback_url: Optional[str] = None
+
+@app.post("/jobs", status_code=202)
+async def submit_job(req: JobRequest, tenant: Tenant = TENANT):
+    """작업 등록 (등록 시 요청 쿼터 1건, 실행은 batch 클래스로 스케줄링되고 LLM 토큰은 등록한 테넌트에 차감)"""
+    tenants.admit(tenant)
+    job = await job_queue.submit(req.ticker, priority=req.priority, callback_url=req.callback_url,
+                                 tenant=tenant.name)
+    return JSONResponse(
+        {"job_id": job.id, "state": job.state, "status_url": f"/jobs/{job.id}"},
+        status_code=202,
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, tenant: Tenant = TENANT):
+    job = job_queue.get(job_id)
+    if job is None or (tenants.auth_required and job.tenant != tenant.name):
+        raise HTTPException(status_code=404, detail=f"job not found: {job_id}")
+    return JSONResponse(job.to_dict())
@@ -0,0 +1,72 @@
+"""
+멀티 워커 실행 진입점 (supervisor)
+
+`uvicorn app.main:app --workers N` 은 워커마다 MCP 서브프로세스와 캐시를 따로 가지므로,
+이 진입점은 워커를 띄우기 전에 다음을 맞춰 둡니다.
+- 워커 간 공유 캐시 디렉터리 (SHARED_CACHE_DIR, 기본: /dev/shm 또는 임시 디렉터리)
+- 워커당 MCP 세션 풀 크기 (MCP_POOL_SIZE = mcp_pool_budget // workers)
+- 작업 큐 저장소 (JOB_STORE_PATH 가 없고 워커가 2개 이상이면 공유 캐시 디렉터리의 SQLite)
+
+사용법:
+    python -m app.serve --port 8080 --workers 4
+"""
+from __future__ import annotations
+import argparse
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from app.settings import settings
+
+LOGGER = logging.getLogger("ticker-graph")
+
+
+def _default_shared_dir() -> str:
+    base = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+    return str(base / "ticker-score-cache")
+
+
+def plan_workers(workers: int = 0, pool_budget: int = 0) -> Dict[str, int]:
+    """워커 수와 워커당 MCP 세션 수 결정"""
+    workers = workers or settings.workers or (os.cpu_count() or 1)
+    if pool_budget:
+        pool_size = max(1, pool_budget // workers)
+    else:
+        pool_size = max(1, settings.mcp_pool_size)
+    return {"workers": workers, "mcp_pool_size": pool_size}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Ticker Score API (multi-worker)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=0, help="0이면 CPU 코어 수")
+    parser.add_argument("--mcp-pool-budget", type=int, default=settings.mcp_pool_budget,
+                        help="호스트 전체 MCP 세션 상한 (0이면 워커당 mcp_pool_size)")
+    parser.add_argument("--shared-cache-dir", default=settings.shared_cache_dir or _default_shared_dir())
+    args = parser.parse_args(argv)
+
+    plan = plan_workers(args.workers, args.mcp_pool_budget)
+    Path(args.shared_cache_dir).mkdir(parents=True, exist_ok=True)
+
+    # 워커 프로세스는 환경 변수를 상속 → 각자 Settings() 에서 읽는다
+    os.environ["SHARED_CACHE_DIR"] = args.shared_cache_dir
+    os.environ["MCP_POOL_SIZE"] = str(plan["mcp_pool_size"])
+    os.environ["WORKERS"] = str(plan["workers"])
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if plan["workers"] > 1 and not settings.job_store_path:
+        # 메모리 저장소는 워커마다 따로라 /jobs 조회가 다른 워커로 가면 404 → 워커들이 공유하는 SQLite 사용
+        os.environ["JOB_STORE_PATH"] = str(Path(args.shared_cache_dir) / "jobs.sqlite3")
+        LOGGER.warning("[serve] JOB_STORE_PATH not set, sharing jobs via %s", os.environ["JOB_STORE_PATH"])
+    LOGGER.info("[serve] workers=%d mcp_pool_size/worker=%d shared_cache=%s",
+                plan["workers"], plan["mcp_pool_size"], args.shared_cache_dir)
+
+    import uvicorn
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=plan["workers"])
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,99 @@ class Settings(BaseSettings):
 
     mcp_config_path: str = str(BASE_DIR / "ticker-score-agent/mcp_config.json")
 
+    # MCP 세션 풀 (워커 프로세스당 세션 수, 0이면 호출마다 새 세션)
+    mcp_pool_size: int = 2
+    # 결과 캐시: 기본 TTL(초) / 워커 간 공유 캐시 디렉터리 (비우면 프로세스 로컬만)
+    cache_ttl_s: float = 60.0
+    shared_cache_dir: str = ""
+    # 만료된 캐시 항목 추가 보관 시간(초) — fast 프로필처럼 오래된 값을 허용하는 요청용
+    cache_stale_keep_s: float = 24 * 3600
+    # 멀티 워커 실행 (python -m app.serve): 0이면 CPU 코어 수
+    workers: int = 0
+    # 호스트 전체 MCP 세션 상한 (0이면 워커당 mcp_pool_size 그대로)
+    mcp_pool_budget: int = 0
+
+    # 비동기 작업 큐 (/jobs): 워커 수 / 영속 저장소 경로(비우면 메모리) / 완료 작업 보관(초)
+    # / 실행 임대(초, 이 시간 동안 연장이 없으면 다른 프로세스가 작업을 복구)
+    job_workers: int = 4
+    job_store_path: str = ""
+    job_retention_s: float = 3600.0
+    job_lease_s: float = 60.0
+
+    # 일봉 히스토리 로컬 저장소 (티커별 memmap 파일) / 전체 용량 상한(바이트)
+    price_store_dir: str = str(Path(__file__).resolve().parents[0] / "data" / "prices")
+    price_store_max_bytes: int = 256 * 1024 * 1024
+
+    # 점수 프로필 (fast | standard | deep): 요청에서 지정하지 않을 때 / /score/batch 동시 실행 수
+    default_profile: str = "standard"
+    batch_concurrency: int = 8
+
+    # 점수 변경 구독 (/subscribe): 갱신 주기(초) / 갱신 프로필 / 발행 임계값(점수 차, 가격 변화 %)
+    # / 구독자별 큐 크기(넘치면 끊음) / 구독 1개당 최대 티커 수
+    subscribe_refresh_s: float = 60.0
+    subscribe_profile: str = "standard"
+    subscribe_score_threshold: float = 2.0
+    subscribe_price_threshold_pct: float = 0.5
+    subscribe_queue_size: int = 64
+    subscribe_max_tickers: int = 50
+
+    # SSE: keepalive 주기(초) / 실행별 이벤트 버퍼 크기 / 끊긴 뒤 실행 취소까지 재접속 유예(초)
+    # / 끝난 실행 재개 보관(초) / 보관 실행 수 상한 / 클라이언트 재접속 간격(ms)
+    sse_keepalive_s: float = 15.0
+    sse_buffer_events: int = 256
+    sse_resume_grace_s: float = 10.0
+    sse_retention_s: float = 60.0
+    sse_max_runs: int = 1000
+    sse_retry_ms: int = 3000
+
+    # 테넌트: 정의 파일(JSON, API 키 → 쿼터·클래스. 비우면 인증 없이 모두 default 테넌트)
+    # / default 테넌트의 분당 요청 수, 시간당 LLM 토큰 (0이면 무제한)
+    tenants_path: str = ""
+    tenant_default_rpm: float = 0.0
+    tenant_default_llm_tokens_per_hour: float = 0.0
+    # run_once 스케줄러: 동시 실행 수 / 클래스 가중치(interactive:batch) / 클래스별 대기열 상한(넘으면 429)
+    sched_concurrency: int = 16
+    sched_weights: str = "interactive:4,batch:1"
+    sched_queue_limit: int = 256
+
+    # 기본 보강 데이터셋 (쉼표 구분: financials, holders, recommendations, actions, options, all / 비우면 없음)
+    enrich_default: str = ""
+
+    # 옵션 분석: 분석할 가까운 만기 수 / Black-Scholes 무위험 이자율(연율)
+    options_expirations: int = 4
+    options_risk_free_rate: float = 0.04
+
+    # LLM 게이트: auto | always | never / 규칙 점수 채택 신뢰도 / 재사용 허용 변화량·시간(초)
+    llm_gate_mode: str = "auto"
+    llm_gate_confidence: float = 0.75
+    llm_gate_max_drift: float = 0.1
+    llm_gate_reuse_s: float = 6 * 3600
+
+    # 프롬프트 토큰 예산(티커별 user 메시지, 고정 system 메시지 제외) / 뉴스 요약 1건당 최대 토큰
+    prompt_token_budget: int = 800
+    prompt_summary_tokens: int = 80
+
+    # 공급자 프롬프트 캐시 (OpenAI: 같은 접두부 요청을 prompt_cache_key 로 묶어 캐시 적중률 향상)
+    prompt_cache: bool = True
+    prompt_cache_key: str = "ticker-score"
+
+    # LLM 라우터: 백엔드 목록(쉼표 구분: openai, clovax, fake) / 호출 타임아웃 /
+    # 헤지 대기(초, 0이면 끔) / 비용 가중치(초 per USD/1M 토큰)
+    llm_backends: str = "openai"
+    # 공급자별 모델: 기본(default) / 소형(small, fast 프로필)
+    openai_model: str = "gpt-4o"
+    openai_small_model: str = "gpt-4o-mini"
+    clovax_model: str = "HCX-007"
+    clovax_small_model: str = "HCX-DASH-002"
+    llm_timeout_s: float = 30.0
+    llm_hedge_after_s: float = 0.0
+    llm_cost_weight: float = 0.2
+
+    # MCP/LLM 녹화·재생: "" | record | replay / cassette 파일(.jsonl, .jsonl.gz) / 재생 시 녹화 지연 재현
+    cassette_mode: str = ""
+    cassette_path: str = ""
+    cassette_replay_latency: bool = False
+
     model_config = SettingsConfigDict(
         env_file=str(BASE_DIR / ".env"),  # 절대경로 지정
         extra="ignore"
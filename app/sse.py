@@ -0,0 +1,211 @@
+"""
+SSE 스트리밍 공통 처리 (/score/stream, /score/trace)
+
+- 실행(run)마다 이벤트를 크기 제한 버퍼(deque)에 쌓고, 연결은 버퍼의 커서(seq)만 들고 읽음
+  → 느린 클라이언트가 있어도 연결별 큐가 커지지 않음 (버퍼 창을 벗어나면 gap 이벤트 후 가장 오래된 것부터)
+- 이벤트마다 `id: <run_id>:<seq>` → 재접속 시 Last-Event-ID 로 놓친 이벤트부터 이어서 전송
+  실행 버퍼는 워커 프로세스 메모리에 있으므로 재개는 같은 워커로 재접속할 때만 가능. 이 워커가 모르는 실행이면
+  (만료, 다른 워커, 재시작) 새 실행 앞에 restarted 이벤트를 보내 클라이언트가 이전 진행 상태를 버리게 함
+- 이벤트가 없으면 SSE_KEEPALIVE_S 마다 주석(`: keepalive`) 전송 (프록시 유휴 타임아웃 방지)
+- 마지막 클라이언트가 끊기면 SSE_RESUME_GRACE_S 뒤 실행(graph.astream)을 취소 — 그 안에 재접속하면 계속 진행
+- 끝난 실행은 SSE_RETENTION_S 동안만 재개용으로 보관 (최대 SSE_MAX_RUNS 개)
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+from uuid import uuid4
+
+import anyio
+from starlette.responses import StreamingResponse
+
+from app.settings import settings
+from app.workflow.deadline import record_cancel
+from app.workflow.metrics import metrics
+
+LOGGER = logging.getLogger("ticker-graph")
+
+
+def format_event(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+KEEPALIVE = ": keepalive\n\n"
+# 프록시 버퍼링/캐시 방지
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    text/event-stream 응답. 클라이언트가 끊기면(http.disconnect) 본문 제너레이터를 즉시 취소한다.
+    (Starlette 는 ASGI 2.4 서버에서 다음 전송이 실패할 때까지 끊김을 알아채지 못함)
+    """
+    media_type = "text/event-stream"
+
+    def __init__(self, content, headers: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(content, headers={**SSE_HEADERS, **(headers or {})}, **kwargs)
+
+    async def __call__(self, scope, receive, send) -> None:
+        async with anyio.create_task_group() as tg:
+            async def stream() -> None:
+                try:
+                    await self.stream_response(send)
+                except OSError:
+                    pass
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(stream)
+            await self.listen_for_disconnect(receive)
+            tg.cancel_scope.cancel()
+
+
+class RunBuffer:
+    """실행 1건의 이벤트 버퍼 (최근 maxlen 개만 유지)"""
+
+    def __init__(self, key: Hashable, maxlen: int):
+        self.run_id = uuid4().hex[:12]
+        self.key = key
+        self.events: deque = deque(maxlen=maxlen)   # (seq, 직렬화된 SSE 프레임)
+        self.next_seq = 0
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.listeners = 0
+        self.task: Optional[asyncio.Task] = None
+        self._cancel_handle: Optional[asyncio.TimerHandle] = None
+        self._wake = asyncio.Event()
+
+    def append(self, event: str, data: Any) -> None:
+        seq = self.next_seq
+        self.events.append((seq, format_event(event, data, f"{self.run_id}:{seq}")))
+        self.next_seq += 1
+        self._notify()
+
+    def finish(self) -> None:
+        self.done, self.finished_at = True, time.time()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+    def since(self, seq: int) -> Tuple[List[str], bool, int]:
+        """seq 이후 프레임, 버퍼 창을 벗어나 누락이 있었는지, 마지막 seq"""
+        frames = [(s, f) for s, f in self.events if s > seq]
+        gap = bool(frames) and frames[0][0] > seq + 1
+        return [f for _, f in frames], gap, frames[-1][0] if frames else seq
+
+
+class RunRegistry:
+    def __init__(self):
+        self._runs: "OrderedDict[str, RunBuffer]" = OrderedDict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        for run_id, buf in list(self._runs.items()):
+            expired = buf.done and now - buf.finished_at > settings.sse_retention_s
+            if expired or (len(self._runs) > settings.sse_max_runs and buf.done and not buf.listeners):
+                del self._runs[run_id]
+
+    def start(self, key: Hashable, source: AsyncIterator[Tuple[str, Any]]) -> RunBuffer:
+        """source((event, data) 비동기 이터레이터)를 백그라운드로 버퍼에 옮겨 담기 시작"""
+        self._evict()
+        buf = RunBuffer(key, settings.sse_buffer_events)
+        buf.task = asyncio.create_task(self._pump(buf, source))
+        self._runs[buf.run_id] = buf
+        return buf
+
+    def resume(self, last_event_id: Optional[str], key: Hashable) -> Optional[Tuple[RunBuffer, int]]:
+        """Last-Event-ID("<run_id>:<seq>") → (버퍼, seq). 모르는/만료된/다른 요청의 실행이면 None"""
+        if not last_event_id or ":" not in last_event_id:
+            return None
+        run_id, _, seq = last_event_id.rpartition(":")
+        buf = self._runs.get(run_id)
+        if buf is None or buf.key != key or not seq.isdigit():
+            return None
+        metrics.incr("sse.resumed")
+        return buf, int(seq)
+
+    async def _pump(self, buf: RunBuffer, source: AsyncIterator[Tuple[str, Any]]) -> None:
+        try:
+            async for event, data in source:
+                buf.append(event, data)
+        except asyncio.CancelledError:
+            metrics.incr("sse.cancelled_runs")
+            record_cancel("disconnect")
+            buf.append("cancelled", {"reason": "client disconnected"})
+        except Exception as e:
+            LOGGER.exception("[sse] run %s failed", buf.run_id)
+            buf.append("error", {"detail": f"{type(e).__name__}: {e}"})
+        finally:
+            # 취소되었을 때도 제너레이터 정리(graph.astream 종료, 컨텍스트 복원)를 이 태스크에서 수행
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await asyncio.shield(aclose())
+            buf.finish()
+
+    def attach(self, buf: RunBuffer) -> None:
+        buf.listeners += 1
+        if buf._cancel_handle is not None:
+            buf._cancel_handle.cancel()
+            buf._cancel_handle = None
+
+    def detach(self, buf: RunBuffer) -> None:
+        buf.listeners -= 1
+        if buf.listeners or buf.done or buf.task is None:
+            return
+        # 마지막 클라이언트가 끊김 → 재접속 유예 후 실행 취소
+        if settings.sse_resume_grace_s > 0:
+            buf._cancel_handle = asyncio.get_running_loop().call_later(settings.sse_resume_grace_s, buf.task.cancel)
+        else:
+            buf.task.cancel()
+
+    async def stream(self, buf: RunBuffer, after: int = -1,
+                     restarted_from: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        버퍼 → SSE 프레임 (keepalive 포함). 연결이 끊기면 detach
+        restarted_from: 재개하지 못한 Last-Event-ID (있으면 첫 이벤트로 restarted 전송)
+        """
+        self.attach(buf)
+        try:
+            yield f"retry: {int(settings.sse_retry_ms)}\n\n"
+            if restarted_from:
+                metrics.incr("sse.restarted")
+                yield format_event("restarted", {"last_event_id": restarted_from, "run_id": buf.run_id,
+                                                 "reason": "unknown run (expired or started on another worker)"})
+            seq = after
+            while True:
+                wake = buf._wake
+                frames, gap, seq_next = buf.since(seq)
+                if gap:
+                    metrics.incr("sse.gap")
+                    yield format_event("gap", {"after": seq, "resumed_at": seq_next - len(frames) + 1})
+                for frame in frames:
+                    yield frame
+                seq = seq_next
+                if buf.done and seq >= buf.next_seq - 1:
+                    return
+                try:
+                    await asyncio.wait_for(wake.wait(), settings.sse_keepalive_s)
+                except asyncio.TimeoutError:
+                    metrics.incr("sse.keepalive")
+                    yield KEEPALIVE
+        finally:
+            self.detach(buf)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": len(self._runs),
+            "active": sum(1 for b in self._runs.values() if not b.done),
+            "listeners": sum(b.listeners for b in self._runs.values()),
+            "resumed": int(metrics.get("sse.resumed")),
+            "cancelled_runs": int(metrics.get("sse.cancelled_runs")),
+            "gaps": int(metrics.get("sse.gap")),
+            "restarted": int(metrics.get("sse.restarted")),
+        }
+
+
+sse_runs = RunRegistry()
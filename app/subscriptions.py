@@ -0,0 +1,248 @@
+"""
+점수 변경 구독 (SSE / WebSocket push)
+
+대시보드가 /score 를 반복 호출하는 대신 티커 목록을 구독하고, 백그라운드 갱신에서
+점수/가격이 임계값 이상 바뀔 때만 push 를 받습니다.
+
+- Broadcaster: 프로세스당 1개. ticker → 구독자 역색인으로 팬아웃하며 구독자마다 크기 제한 큐를 둠.
+  큐가 가득 찬(따라오지 못하는) 구독자는 끊어서 다른 구독자나 갱신 루프를 막지 않음
+  → 클라이언트는 재접속하면 snapshot 으로 최신 상태부터 다시 받음
+- Refresher: 구독 중인 티커 집합을 주기적으로 티커당 1회만 run_once → 구독자가 1만 명이어도 비용은 티커 수에 비례
+  (run_once 결과는 순위 테이블(/rank)에도 그대로 반영됨)
+
+둘 다 워커 프로세스마다 따로 돕니다(구독 연결이 붙은 워커가 그 구독자에게 직접 push).
+여러 워커가 같은 티커를 구독해도 점수화는 호스트 전체에서 주기당 1회: 갱신 결과를 result_cache
+(SHARED_CACHE_DIR 공유 캐시 + 프로세스 간 키 락)에 두고, 먼저 갱신한 워커의 결과를 나머지 워커가 재사용합니다.
+SHARED_CACHE_DIR 를 끄면 워커마다 따로 점수화하므로 단일 워커로 실행하세요.
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.settings import settings
+from app.workflow.cache import result_cache
+from app.workflow.graph import run_once
+from app.tenants import scheduled, tenants
+from app.workflow.metrics import metrics
+
+LOGGER = logging.getLogger("ticker-graph")
+
+_ids = itertools.count(1)
+
+
+@dataclass(eq=False)
+class Subscriber:
+    tickers: Set[str]
+    queue: asyncio.Queue
+    id: int = field(default_factory=lambda: next(_ids))
+    dropped: bool = False   # 느린 소비자로 끊김
+
+    async def next(self) -> Dict[str, Any]:
+        """다음 이벤트 (type == "dropped" 이면 마지막 이벤트)"""
+        return await self.queue.get()
+
+
+def _norm(tickers: Iterable[str]) -> Set[str]:
+    return {t.strip().upper() for t in tickers if t and t.strip()}
+
+
+class Broadcaster:
+    """ticker → 구독자 팬아웃 (구독자별 bounded queue, 느린 소비자 끊기)"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subs: Dict[int, Subscriber] = {}
+        self._by_ticker: Dict[str, Set[int]] = {}
+        self.latest: Dict[str, Dict[str, Any]] = {}    # 티커별 마지막 발행 상태 (snapshot 용)
+        self.changed = asyncio.Event()                 # 구독 티커 집합 변경 알림 (Refresher 깨우기)
+
+    def tickers(self) -> List[str]:
+        return sorted(self._by_ticker)
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def subscribe(self, tickers: Iterable[str]) -> Subscriber:
+        sub = Subscriber(set(), asyncio.Queue(maxsize=self.queue_size))
+        self._subs[sub.id] = sub
+        self.update(sub, add=tickers)
+        metrics.incr("subscriptions.opened")
+        return sub
+
+    def update(self, sub: Subscriber, add: Iterable[str] = (), remove: Iterable[str] = ()) -> None:
+        """구독 티커 추가/제거. 새로 추가된 티커는 최신 상태를 snapshot 이벤트로 즉시 전달"""
+        add, remove = _norm(add) - sub.tickers, _norm(remove) & sub.tickers
+        if len(sub.tickers) + len(add) - len(remove) > settings.subscribe_max_tickers:
+            raise ValueError(f"too many tickers per subscription (max {settings.subscribe_max_tickers})")
+        new_ticker = False
+        for t in remove:
+            sub.tickers.discard(t)
+            ids = self._by_ticker.get(t)
+            if ids is not None:
+                ids.discard(sub.id)
+                if not ids:
+                    del self._by_ticker[t]
+        for t in add:
+            if sub.dropped:
+                break
+            sub.tickers.add(t)
+            new_ticker |= t not in self._by_ticker
+            self._by_ticker.setdefault(t, set()).add(sub.id)
+            if t in self.latest:
+                self.offer(sub, {**self.latest[t], "type": "snapshot"})
+        if new_ticker or remove:
+            self.changed.set()
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        if self._subs.pop(sub.id, None) is None:
+            return
+        self.update(sub, remove=list(sub.tickers))
+        metrics.incr("subscriptions.closed")
+
+    def offer(self, sub: Subscriber, event: Dict[str, Any]) -> None:
+        """구독자 1명에게 전달 (블로킹 없음, 큐가 가득 차면 구독자를 끊음)"""
+        if sub.dropped:
+            return
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 느린 소비자: 큐를 비우고 종료 이벤트만 남긴 뒤 구독 해제
+            sub.dropped = True
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+            sub.queue.put_nowait({"type": "dropped", "reason": "slow consumer", "queue_size": self.queue_size})
+            self.unsubscribe(sub)
+            metrics.incr("subscriptions.dropped_slow")
+            LOGGER.warning("[subscribe] dropped slow subscriber id=%d", sub.id)
+
+    def publish(self, ticker: str, event: Dict[str, Any]) -> int:
+        """티커 구독자 전원에게 전달 (블로킹 없음). 전달한 구독자 수 반환"""
+        self.latest[ticker] = event
+        subs = [self._subs[i] for i in self._by_ticker.get(ticker, ()) if i in self._subs]
+        for sub in subs:
+            self.offer(sub, event)
+        metrics.incr("subscriptions.published")
+        metrics.incr("subscriptions.delivered", len(subs))
+        return len(subs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subs),
+            "tickers": len(self._by_ticker),
+            "published": int(metrics.get("subscriptions.published")),
+            "delivered": int(metrics.get("subscriptions.delivered")),
+            "dropped_slow": int(metrics.get("subscriptions.dropped_slow")),
+            "refreshes": int(metrics.get("subscriptions.refreshes")),
+            "refresh_reused": int(metrics.get("subscriptions.refresh_reused")),
+        }
+
+
+def _changed(prev: Optional[Dict[str, Any]], score: Optional[float], last: Optional[float]) -> Optional[str]:
+    """발행 사유 (임계값 미만이면 None)"""
+    if prev is None:
+        return "initial"
+    if score is not None and prev.get("score") is not None \
+            and abs(score - prev["score"]) >= settings.subscribe_score_threshold:
+        return "score"
+    prev_last = (prev.get("price") or {}).get("last")
+    if last and prev_last and abs(last / prev_last - 1) * 100 >= settings.subscribe_price_threshold_pct:
+        return "price"
+    return None
+
+
+class Refresher:
+    """구독 중인 티커를 주기적으로 다시 점수화하고 변화가 크면 발행"""
+
+    def __init__(self, broadcaster: Broadcaster, interval_s: float, concurrency: int):
+        self.broadcaster = broadcaster
+        self.interval_s = interval_s
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+        self._last_run: Dict[str, float] = {}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(ticker: str) -> None:
+            async with sem:
+                await self.refresh(ticker)
+
+        while True:
+            self.broadcaster.changed.clear()
+            now = time.time()
+            # 주기가 된 티커 + 아직 한 번도 갱신하지 않은(새로 구독된) 티커
+            due = [t for t in self.broadcaster.tickers()
+                   if now - self._last_run.get(t, 0.0) >= self.interval_s]
+            if due:
+                await asyncio.gather(*(one(t) for t in due))
+            for t in set(self._last_run) - set(self.broadcaster.tickers()):
+                self._last_run.pop(t, None)
+            try:
+                await asyncio.wait_for(self.broadcaster.changed.wait(), self.interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _score(self, ticker: str) -> Dict[str, Any]:
+        metrics.incr("subscriptions.refreshes")
+        # 서버 내부 실행: 쿼터 없는 system 테넌트, batch 클래스
+        async with scheduled(tenants.system, "batch"):
+            result = await run_once(ticker, profile=settings.subscribe_profile or None)
+        # 공유 캐시에 넣을 수 있게 발행에 필요한 필드만 (JSON 직렬화 가능)
+        price = result.get("price") or {}
+        return {"score": result.get("score"), "rationale": result.get("rationale"),
+                "price": {"last": price.get("last"), "pct": price.get("pct")}}
+
+    async def refresh(self, ticker: str) -> None:
+        self._last_run[ticker] = time.time()
+        loaded = False
+
+        async def load() -> Dict[str, Any]:
+            nonlocal loaded
+            loaded = True
+            return await self._score(ticker)
+
+        try:
+            # 다른 워커가 이번 주기에 이미 갱신했으면 그 결과를 재사용 (주기보다 조금 짧게 보관해
+            # 다음 주기에는 반드시 새로 점수화)
+            result = await result_cache.get_or_load(
+                f"subscribe:{settings.subscribe_profile}:{ticker}", load, ttl=self.interval_s * 0.9)
+        except Exception as e:
+            LOGGER.warning("[subscribe] refresh %s failed: %s", ticker, e)
+            return
+        if not loaded:
+            metrics.incr("subscriptions.refresh_reused")
+        price = result.get("price") or {}
+        score = result.get("score")
+        prev = self.broadcaster.latest.get(ticker)
+        reason = _changed(prev, score, price.get("last"))
+        if reason is None:
+            return
+        self.broadcaster.publish(ticker, {
+            "type": "update",
+            "reason": reason,
+            "ticker": ticker,
+            "score": score,
+            "prev_score": prev.get("score") if prev else None,
+            "rationale": result.get("rationale"),
+            "price": price,
+            "scored_at": time.time(),
+        })
+
+
+broadcaster = Broadcaster(queue_size=settings.subscribe_queue_size)
+refresher = Refresher(broadcaster, interval_s=settings.subscribe_refresh_s,
+                      concurrency=settings.batch_concurrency)
@@ -0,0 +1,324 @@
+"""
+테넌트(API 키)별 쿼터 + run_once 우선순위 스케줄링
+
+여러 팀이 한 배포(같은 이벤트 루프, 같은 MCP/LLM 상한)를 같이 쓰므로 API 경계에서 요청을 입장시킵니다.
+- 테넌트: TENANTS_PATH(JSON)의 API 키(X-API-Key) → 이름 / 분당 요청 수 / 시간당 LLM 토큰 / 최고 클래스
+  파일을 지정하지 않으면 인증 없이 모든 요청이 default 테넌트 (쿼터는 TENANT_DEFAULT_*, 0이면 무제한)
+- 쿼터: 테넌트별 토큰 버킷. 요청 쿼터는 입장할 때 차감, LLM 토큰은 실행 뒤 실제 사용량(입력+출력)을 차감하고
+  잔량이 음수이면 회복될 때까지 입장을 거절 → QuotaExceeded (REST 429 + Retry-After)
+- 스케줄러: run_once 동시 실행은 SCHED_CONCURRENCY 개. 넘치면 클래스(interactive / batch)별 대기열에 넣고
+  가중치(SCHED_WEIGHTS) 비율로 꺼내며(stride 스케줄링), 클래스 안에서는 테넌트 라운드로빈
+  → 한 팀의 배치 스윕이 대화형 요청이나 다른 팀의 배치를 굶기지 않음. 대기열이 SCHED_QUEUE_LIMIT 를 넘으면 QuotaExceeded
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional
+
+from app.settings import settings
+from app.workflow.metrics import llm_usage_meter, metrics
+
+LOGGER = logging.getLogger("ticker-graph")
+
+# 우선순위 순서 (앞이 높음). 요청은 더 낮은 클래스로만 내릴 수 있음
+CLASSES = ("interactive", "batch")
+
+
+class Unauthorized(Exception):
+    """API 키가 없거나 모르는 키"""
+
+
+class QuotaExceeded(Exception):
+    """테넌트 쿼터 초과 또는 스케줄러 대기열 가득 참. retry_after_s 뒤 재시도"""
+
+    def __init__(self, detail: str, retry_after_s: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after_s = max(1, math.ceil(retry_after_s))
+
+
+class TokenBucket:
+    """초당 rate 로 채워지는 용량 capacity 버킷 (rate 0 이면 무제한)"""
+
+    def __init__(self, capacity: float, rate_per_s: float):
+        self.capacity = capacity
+        self.rate = rate_per_s
+        self.level = capacity
+        self._t = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._t) * self.rate)
+        self._t = now
+
+    def take(self, n: float = 1.0) -> float:
+        """n 만큼 꺼냄. 모자라면 꺼내지 않고 채워질 때까지 기다릴 시간(초)을 반환 (성공이면 0)"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        if self.level >= n:
+            self.level -= n
+            return 0.0
+        return (n - self.level) / self.rate
+
+    def charge(self, n: float) -> None:
+        """사후 차감 (잔량이 음수가 될 수 있음)"""
+        if self.rate > 0:
+            self._refill()
+            self.level -= n
+
+    def deficit_s(self) -> float:
+        """잔량이 양수로 돌아올 때까지 걸리는 시간(초). 남아 있으면 0"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return 0.0 if self.level > 0 else (1 - self.level) / self.rate
+
+    def remaining(self) -> Optional[float]:
+        if self.rate <= 0:
+            return None
+        self._refill()
+        return round(self.level, 1)
+
+
+@dataclass(eq=False)
+class Tenant:
+    name: str
+    requests_per_min: float = 0.0        # 0 이면 무제한 (버스트는 1분치)
+    llm_tokens_per_hour: float = 0.0     # 0 이면 무제한 (버스트는 1시간치)
+    max_class: str = "interactive"       # 이 테넌트 요청이 받을 수 있는 가장 높은 클래스
+    requests: TokenBucket = field(init=False, repr=False)
+    llm_tokens: TokenBucket = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.max_class not in CLASSES:
+            raise ValueError(f"unknown class for tenant {self.name}: {self.max_class} (available: {list(CLASSES)})")
+        self.requests = TokenBucket(self.requests_per_min, self.requests_per_min / 60)
+        self.llm_tokens = TokenBucket(self.llm_tokens_per_hour, self.llm_tokens_per_hour / 3600)
+
+
+def request_class(tenant: Tenant, default: str, requested: Optional[str] = None) -> str:
+    """엔드포인트 기본 클래스 · 테넌트 최고 클래스 · 요청한 클래스(X-Priority) 중 가장 낮은 것"""
+    wanted = [default, tenant.max_class]
+    if requested and requested.strip().lower() in CLASSES:
+        wanted.append(requested.strip().lower())
+    return max(wanted, key=CLASSES.index)
+
+
+class TenantRegistry:
+    def __init__(self, tenants: Dict[str, Tenant], keys: Dict[str, Tenant]):
+        self._tenants = tenants
+        self._keys = keys
+        # 인증을 쓰지 않을 때의 기본 테넌트 / 서버 내부 실행(구독 갱신 등)용 무제한 테넌트
+        self.default = tenants.get("default") or Tenant(
+            "default", settings.tenant_default_rpm, settings.tenant_default_llm_tokens_per_hour)
+        self.system = Tenant("system")
+
+    @classmethod
+    def from_settings(cls) -> "TenantRegistry":
+        if not settings.tenants_path:
+            return cls({}, {})
+        with open(settings.tenants_path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        tenants: Dict[str, Tenant] = {}
+        keys: Dict[str, Tenant] = {}
+        for t in cfg.get("tenants") or []:
+            tenant = Tenant(t["name"], float(t.get("requests_per_min") or 0),
+                            float(t.get("llm_tokens_per_hour") or 0), t.get("class") or "interactive")
+            tenants[tenant.name] = tenant
+            for key in t.get("api_keys") or []:
+                keys[key] = tenant
+        LOGGER.info("[tenants] loaded %d tenants from %s", len(tenants), settings.tenants_path)
+        return cls(tenants, keys)
+
+    @property
+    def auth_required(self) -> bool:
+        return bool(self._keys)
+
+    def authenticate(self, api_key: Optional[str]) -> Tenant:
+        if not self.auth_required:
+            return self.default
+        tenant = self._keys.get(api_key or "")
+        if tenant is None:
+            raise Unauthorized("missing or unknown API key")
+        return tenant
+
+    def get(self, name: Optional[str]) -> Tenant:
+        """이름 → 테넌트 (작업 큐처럼 나중에 실행하는 경우). 모르는 이름이면 default"""
+        if name == self.system.name:
+            return self.system
+        return self._tenants.get(name or "", self.default)
+
+    def admit(self, tenant: Tenant, n: int = 1) -> None:
+        """요청 n 건 입장 (LLM 토큰 잔량 → 요청 쿼터 순으로 확인). 초과면 QuotaExceeded"""
+        wait = tenant.llm_tokens.deficit_s()
+        if wait > 0:
+            metrics.incr(f"tenant.{tenant.name}.rejected.llm_tokens")
+            raise QuotaExceeded(f"LLM token quota exhausted for tenant {tenant.name}", wait)
+        if tenant.requests.rate > 0 and n > tenant.requests.capacity:
+            metrics.incr(f"tenant.{tenant.name}.rejected.requests")
+            raise QuotaExceeded(f"{n} requests exceed the per-minute quota of tenant {tenant.name} "
+                                f"({tenant.requests_per_min:g})", 60)
+        wait = tenant.requests.take(n)
+        if wait > 0:
+            metrics.incr(f"tenant.{tenant.name}.rejected.requests")
+            raise QuotaExceeded(f"request quota exceeded for tenant {tenant.name}", wait)
+        metrics.incr(f"tenant.{tenant.name}.requests", n)
+
+    def charge_llm(self, tenant: Tenant, tokens: float) -> None:
+        if tokens:
+            tenant.llm_tokens.charge(tokens)
+            metrics.incr(f"tenant.{tenant.name}.llm_tokens", tokens)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        listed = list(self._tenants.values())
+        if not self.auth_required and self.default not in listed:
+            listed.append(self.default)
+        for t in listed:
+            prefix = f"tenant.{t.name}"
+            out[t.name] = {
+                "max_class": t.max_class,
+                "requests_per_min": t.requests_per_min or None,
+                "llm_tokens_per_hour": t.llm_tokens_per_hour or None,
+                "requests": int(metrics.get(f"{prefix}.requests")),
+                "llm_tokens": int(metrics.get(f"{prefix}.llm_tokens")),
+                "rejected": {"requests": int(metrics.get(f"{prefix}.rejected.requests")),
+                             "llm_tokens": int(metrics.get(f"{prefix}.rejected.llm_tokens"))},
+                "remaining": {"requests": t.requests.remaining(), "llm_tokens": t.llm_tokens.remaining()},
+            }
+        return out
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    weights = {c: 1.0 for c in CLASSES}
+    for part in spec.split(","):
+        name, _, w = part.partition(":")
+        if name.strip() in weights and w.strip():
+            weights[name.strip()] = max(float(w), 0.01)
+    return weights
+
+
+class FairScheduler:
+    """
+    run_once 동시 실행 제한 + 클래스 가중 공정 대기열.
+    클래스는 stride 스케줄링: 대기자가 있는 클래스 중 pass 가 가장 작은 것을 꺼내고 pass += 1/weight
+    (오래 비어 있던 클래스는 pass 를 현재 가상 시간으로 당겨 밀린 몫을 몰아 쓰지 않음)
+    """
+
+    def __init__(self, concurrency: int, weights: Dict[str, float], queue_limit: int):
+        self.concurrency = max(1, concurrency)
+        self.weights = weights
+        self.queue_limit = queue_limit
+        self.running = 0
+        # 클래스 → 테넌트 → 대기 Future (테넌트 순서가 라운드로빈 순서)
+        self._queues: Dict[str, "OrderedDict[str, Deque[asyncio.Future]]"] = {c: OrderedDict() for c in CLASSES}
+        self._waiting = {c: 0 for c in CLASSES}
+        self._pass = {c: 0.0 for c in CLASSES}
+        self._vtime = 0.0
+        self._run_s = 1.0   # 실행 시간 EWMA (Retry-After 추정용)
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, cls: str):
+        await self._acquire(tenant, cls)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._run_s = 0.8 * self._run_s + 0.2 * (time.perf_counter() - t0)
+            self._release()
+
+    async def _acquire(self, tenant: str, cls: str) -> None:
+        t0 = time.perf_counter()
+        if self.running < self.concurrency and not any(self._waiting.values()):
+            self.running += 1
+            metrics.observe(f"sched.{cls}.wait_ms", 0.0)
+            return
+        if self._waiting[cls] >= self.queue_limit:
+            metrics.incr(f"sched.{cls}.rejected")
+            raise QuotaExceeded(f"{cls} queue is full ({self.queue_limit})",
+                                self._waiting[cls] / self.concurrency * self._run_s)
+        if not self._waiting[cls]:
+            self._pass[cls] = max(self._pass[cls], self._vtime)
+        fut = asyncio.get_running_loop().create_future()
+        self._queues[cls].setdefault(tenant, deque()).append(fut)
+        self._waiting[cls] += 1
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.cancelled():
+                self._discard(cls, tenant, fut)
+            else:
+                self._release()  # 슬롯을 받은 직후 취소됨 → 다음 대기자에게 넘김
+            raise
+        metrics.observe(f"sched.{cls}.wait_ms", (time.perf_counter() - t0) * 1000)
+
+    def _discard(self, cls: str, tenant: str, fut: asyncio.Future) -> None:
+        q = self._queues[cls].get(tenant)
+        if q is not None and fut in q:
+            q.remove(fut)
+            self._waiting[cls] -= 1
+            if not q:
+                del self._queues[cls][tenant]
+
+    def _release(self) -> None:
+        self.running -= 1
+        while self.running < self.concurrency:
+            ready = [c for c in CLASSES if self._waiting[c]]
+            if not ready:
+                return
+            cls = min(ready, key=lambda c: self._pass[c])
+            tenants = self._queues[cls]
+            tenant, q = next(iter(tenants.items()))
+            fut = q.popleft()
+            self._waiting[cls] -= 1
+            if q:
+                tenants.move_to_end(tenant)  # 같은 클래스의 다음 테넌트 차례
+            else:
+                del tenants[tenant]
+            if fut.done():
+                continue  # 대기 중 취소됨(끊김/마감/tasks/cancel) → 슬롯을 주지 않고 다음 대기자
+            self._vtime = self._pass[cls]
+            self._pass[cls] += 1 / self.weights[cls]
+            self.running += 1
+            fut.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"concurrency": self.concurrency, "running": self.running}
+        for c in CLASSES:
+            q = metrics.quantiles(f"sched.{c}.wait_ms") or {}
+            out[c] = {
+                "weight": self.weights[c],
+                "waiting": self._waiting[c],
+                "rejected": int(metrics.get(f"sched.{c}.rejected")),
+                **{f"wait_{k}_ms": round(v, 1) for k, v in q.items()},
+            }
+        return out
+
+
+tenants = TenantRegistry.from_settings()
+scheduler = FairScheduler(settings.sched_concurrency, _parse_weights(settings.sched_weights),
+                          settings.sched_queue_limit)
+
+# A2A 서버: 미들웨어가 인증한 테넌트 (실행 태스크로 전파됨). 없으면 서버 내부 호출
+current_tenant: ContextVar[Optional[Tenant]] = ContextVar("current_tenant", default=None)
+
+
+@asynccontextmanager
+async def scheduled(tenant: Tenant, cls: str):
+    """스케줄러 슬롯을 받아 실행하고, 실행 중 쓴 LLM 토큰을 테넌트 쿼터에서 차감"""
+    async with scheduler.slot(tenant.name, cls):
+        meter = {"tokens": 0}
+        token = llm_usage_meter.set(meter)
+        try:
+            yield
+        finally:
+            llm_usage_meter.reset(token)
+            tenants.charge_llm(tenant, meter["tokens"])
@@ -7,6 +7,9 @@ from typing import Dict, Any, Optional
 import logging
 
 from app.workflow.graph import run_once
+from app.jobs import job_queue
+from app.tenants import QuotaExceeded, current_tenant, request_class, scheduled, tenants
+from app.workflow.universe import universe
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +34,11 @@ async def calculate_ticker_score(
     3. LLM으로 종합 분석하여 0-100점 점수 산출
 
     Args:
-        input: {"ticker": "AAPL", "MSFT", "NVDA" 등}
+        input: {"ticker": "AAPL", "MSFT", "NVDA" 등,
+                "enrich": "financials,options" (선택: 보강 데이터셋, "all" 이면 전부),
+                "profile": "fast" | "standard" | "deep" (선택: 점수 프로필),
+                "timeout_ms": 3000 (선택: 클라이언트 마감, 프로필 마감보다 짧을 때만 적용),
+                "class": "batch" (선택: 일괄 처리면 batch 클래스로 스케줄링)}
         context: A2A 컨텍스트 (선택사항)
 
     Returns:
@@ -63,20 +70,32 @@ async def calculate_ticker_score(
         logger.info(f"[A2A] Calculating score for ticker: {ticker}")
 
         # 기존 LangGraph 워크플로우 실행
-        result = await run_once(ticker)
+        timeout_ms = input.get("timeout_ms")
+        # A2A 서버 미들웨어가 인증한 테넌트 (없으면 서버 내부 호출)
+        tenant = current_tenant.get() or tenants.system
+        async with scheduled(tenant, request_class(tenant, "interactive", input.get("class"))):
+            result = await run_once(ticker, enrich=input.get("enrich"), profile=input.get("profile"),
+                                    timeout_s=float(timeout_ms) / 1000 if timeout_ms else None)
 
         response = {
             "ticker": result["ticker"],
             "score": result.get("score"),
             "rationale": result.get("rationale"),
+            "score_source": result.get("score_source"),
+            "output_status": result.get("output_status"),
+            "profile": result.get("profile"),
             "price": result.get("price"),
             "news": result.get("news"),
             "filings": result.get("filings"),
+            "enrichment": result.get("enrichment"),
         }
 
         logger.info(f"[A2A] Score calculated successfully: {ticker} = {response.get('score')}")
         return response
 
+    except QuotaExceeded as e:
+        logger.warning(f"[A2A] {ticker} rejected: {e.detail}")
+        return {"error": e.detail, "retry_after_s": e.retry_after_s, "ticker": ticker, "score": None}
     except Exception as e:
         logger.error(f"[A2A] Error calculating score for {ticker}: {e}")
         return {
@@ -87,6 +106,85 @@ async def calculate_ticker_score(
         }
 
 
+async def submit_ticker_score_job(
+    input: Dict[str, Any],
+    context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    오래 걸리는 점수 계산을 비동기 작업으로 등록합니다. 결과를 기다리지 않고 즉시 반환합니다.
+
+    Args:
+        input: {"ticker": "AAPL", "priority": 5 (선택, 0이 가장 높음), "callback_url": "..." (선택)}
+
+    Returns:
+        {"job_id": "...", "state": "submitted"}  (state 는 A2A TaskState 값)
+    """
+    ticker = input.get("ticker")
+    if not ticker:
+        return {"error": "ticker parameter is required", "example": {"ticker": "AAPL"}}
+    tenant = current_tenant.get() or tenants.system
+    job = await job_queue.submit(
+        ticker,
+        priority=int(input.get("priority", 5)),
+        callback_url=input.get("callback_url"),
+        tenant=tenant.name,
+    )
+    return {"job_id": job.id, "ticker": job.ticker, "state": job.state}
+
+
+def get_ticker_score_job(
+    input: Dict[str, Any],
+    context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    submit_ticker_score_job 으로 등록한 작업의 상태와 결과를 조회합니다.
+
+    Args:
+        input: {"job_id": "..."}
+
+    Returns:
+        {"job_id", "state": submitted|working|completed|failed, "result": {...} | None, "error": ...}
+    """
+    job = job_queue.get(input.get("job_id") or "")
+    if job is None:
+        return {"error": f"job not found: {input.get('job_id')}"}
+    return {"job_id": job.id, "ticker": job.ticker, "state": job.state,
+            "result": job.result, "error": job.error}
+
+
+def rank_tickers(
+    input: Dict[str, Any],
+    context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    지금까지 점수화된 종목들을 점수순으로 조회합니다 (새로 계산하지 않고 저장된 최신 점수 사용).
+
+    Args:
+        input: {"k": 20 (선택), "sector": "Technology" (선택), "min_score": 60 (선택),
+                "max_score": 100 (선택), "max_age_s": 3600 (선택: 이보다 오래된 점수 제외),
+                "tickers": "AAPL,MSFT" (선택: 해당 종목만), "order": "desc" | "asc" (선택)}
+
+    Returns:
+        {"total": 전체 종목 수, "matched": 필터 통과 수,
+         "items": [{"rank", "ticker", "score", "percentile", "pct", "sector", "scored_at"}, ...]}
+    """
+    tickers = input.get("tickers")
+    if isinstance(tickers, str):
+        tickers = tickers.split(",")
+    try:
+        return universe.query(
+            k=int(input.get("k", 20)),
+            sector=input.get("sector"),
+            min_score=input.get("min_score"),
+            max_score=input.get("max_score"),
+            max_age_s=input.get("max_age_s"),
+            tickers=tickers,
+            ascending=input.get("order") == "asc",
+        )
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
+
+
 def get_ticker_info(
     input: Dict[str, Any],
     context: Optional[Dict[str, Any]] = None
@@ -107,7 +205,8 @@ def get_ticker_info(
             "Yahoo Finance 주가 데이터 수집 (MCP)",
             "뉴스 감성 분석",
             "DART 공시 정보 수집",
-            "LLM 기반 종합 점수 산출"
+            "LLM 기반 종합 점수 산출",
+            "점수화된 종목 순위/백분위 조회 (섹터·점수·신선도 필터)"
         ],
         "example_tickers": ["AAPL", "MSFT", "NVDA", "TSLA", "GOOGL", "005930.KS"],
         "usage": "calculate_ticker_score 툴을 호출하여 ticker 파라미터를 전달하세요"
@@ -128,7 +227,13 @@ root_agent = LlmAgent(
         "3. AI 모델로 종합 분석하여 0-100점 투자 점수 산출\n"
         "4. 점수의 근거를 명확히 설명\n\n"
         "결과는 JSON 형식으로 제공되며, 점수와 함께 상세한 근거를 포함합니다. "
-        "사용자가 에이전트 정보를 요청하면 get_ticker_info 툴을 사용하세요."
+        "사용자가 에이전트 정보를 요청하면 get_ticker_info 툴을 사용하세요.\n"
+        "사용자가 비동기/백그라운드 처리를 원하면 submit_ticker_score_job 으로 작업을 등록하고 "
+        "job_id 를 알려주며, 이후 get_ticker_score_job 으로 상태(submitted/working/completed)를 조회하세요.\n"
+        "빠른 응답을 원하면 input 에 \"profile\": \"fast\" 를, 재무·애널리스트·옵션까지 포함한 "
+        "심층 분석을 원하면 \"profile\": \"deep\" 을 넣으세요.\n"
+        "\"섹터 X 상위 20개\" 처럼 이미 점수화된 종목의 순위를 물으면 rank_tickers 툴로 "
+        "저장된 점수에서 바로 답하세요 (새로 계산하지 않음)."
     ),
-    tools=[calculate_ticker_score, get_ticker_info],
+    tools=[calculate_ticker_score, submit_ticker_score_job, get_ticker_score_job, rank_tickers, get_ticker_info],
 )
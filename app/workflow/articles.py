@@ -0,0 +1,167 @@
+# app/workflow/articles.py
+"""
+티커 간 공유 기사 저장소
+
+대형주는 같은 기사를 공유하는 경우가 많습니다 (NVDA 기사가 AMD/TSM 뉴스에도 등장).
+- 기사 id: 정규화 URL(추적 파라미터/프래그먼트 제거) 해시, URL 이 없으면 정규화 제목 해시
+- 유사 중복: 제목 SimHash(64bit) 해밍 거리 ≤ NEAR_DUP_BITS 이면 같은 기사로 합침
+  (16bit 블록 4개로 버킷팅 → 거리 3 이하 후보는 최소 한 블록이 일치)
+- 역색인: ticker → 기사 id (최근 순)
+- 기사당 파싱/감성 채점/요약 정리는 최초 1회만 수행
+"""
+from __future__ import annotations
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.workflow.sentiment import sentiment_scorer
+
+NEAR_DUP_BITS = 3
+SUMMARY_CHARS = 200
+_BLOCKS = 4  # 64bit → 16bit × 4
+_TRACKING = ("utm_", "guccounter", "guce_", "ncid", "cmpid", "ref", "src", "soc_")
+_WORD_RE = re.compile(r"[a-z0-9]+|[가-힣]+")
+# "... - Reuters", "... | Yahoo Finance" 같은 출처 꼬리표
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,40}$")
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith(_TRACKING)]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", parts.netloc.lower().removeprefix("www."), path, urlencode(query), ""))
+
+
+def normalize_title(title: Optional[str]) -> str:
+    t = _SOURCE_SUFFIX_RE.sub("", (title or "").strip())
+    return " ".join(_WORD_RE.findall(t.lower()))
+
+
+def article_id(article: Dict[str, Any]) -> str:
+    basis = normalize_url(article.get("url")) or normalize_title(article.get("title"))
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()[:16]
+
+
+def _shingles(text: str) -> List[str]:
+    words = text.split()
+    if len(words) >= 3:
+        return [" ".join(words[i:i + 2]) for i in range(len(words) - 1)]
+    s = text.replace(" ", "")
+    return [s[i:i + 3] for i in range(max(1, len(s) - 2))]
+
+
+def simhash(text: str) -> int:
+    """64bit SimHash (제목 단어 2-gram, 짧으면 글자 3-gram)"""
+    v = [0] * 64
+    for sh in _shingles(text):
+        h = int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "big")
+        for b in range(64):
+            v[b] += 1 if (h >> b) & 1 else -1
+    return sum(1 << b for b in range(64) if v[b] > 0)
+
+
+def _blocks(h: int) -> List[int]:
+    return [(i << 16) | ((h >> (16 * i)) & 0xFFFF) for i in range(_BLOCKS)]
+
+
+def _summarize(text: Optional[str]) -> Optional[str]:
+    """프롬프트용 요약: 공백 정리 후 첫 문장(최대 SUMMARY_CHARS 자)"""
+    if not text:
+        return text
+    text = " ".join(text.split())
+    m = re.search(r"(?<=[.!?다])\s", text[:SUMMARY_CHARS])
+    return text[:m.start()] if m else text[:SUMMARY_CHARS]
+
+
+class ArticleStore:
+    def __init__(self, maxsize: int = 20000, per_ticker: int = 50):
+        self.maxsize = maxsize
+        self.per_ticker = per_ticker
+        self._articles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._alias: Dict[str, str] = {}            # 중복 기사 id → 대표 id
+        self._hashes: Dict[str, int] = {}            # 대표 id → simhash
+        self._buckets: Dict[int, set] = {}           # 블록 → 대표 id 집합
+        self._by_ticker: Dict[str, "OrderedDict[str, None]"] = {}
+        self._lock = threading.Lock()
+        self.stats = {"new": 0, "exact_dup": 0, "near_dup": 0}
+
+    def _near(self, h: int) -> Optional[str]:
+        for blk in _blocks(h):
+            for aid in self._buckets.get(blk, ()):
+                if bin(self._hashes[aid] ^ h).count("1") <= NEAR_DUP_BITS:
+                    return aid
+        return None
+
+    def _evict(self) -> None:
+        while len(self._articles) > self.maxsize:
+            aid, _ = self._articles.popitem(last=False)
+            h = self._hashes.pop(aid, None)
+            if h is not None:
+                for blk in _blocks(h):
+                    self._buckets.get(blk, set()).discard(aid)
+            for alias in [a for a, c in self._alias.items() if c == aid]:
+                del self._alias[alias]
+
+    def _link(self, ticker: str, aid: str) -> None:
+        idx = self._by_ticker.setdefault(ticker, OrderedDict())
+        idx[aid] = None
+        idx.move_to_end(aid)
+        while len(idx) > self.per_ticker:
+            idx.popitem(last=False)
+        self._articles[aid]["tickers"].add(ticker)
+        self._articles.move_to_end(aid)
+
+    def ingest(self, ticker: str, articles: List[Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        ticker 의 뉴스 목록을 저장소에 반영하고, 중복/유사 중복을 합친 대표 기사 목록을 반환.
+        새 기사만 감성 채점(배치)과 요약 정리를 수행합니다.
+        """
+        ticker = ticker.upper()
+        out_ids: List[str] = []
+        fresh: List[Dict[str, Any]] = []
+        with self._lock:
+            for a in articles:
+                aid = article_id(a)
+                canon = self._alias.get(aid, aid)
+                if canon in self._articles:
+                    self.stats["exact_dup"] += 1
+                else:
+                    h = simhash(normalize_title(a.get("title")))
+                    near = self._near(h) if a.get("title") else None
+                    if near is not None:
+                        self._alias[aid] = canon = near
+                        self.stats["near_dup"] += 1
+                    else:
+                        rec = {**a, "id": aid, "summary": _summarize(a.get("summary")), "tickers": set()}
+                        self._articles[aid] = rec
+                        self._hashes[aid] = h
+                        for blk in _blocks(h):
+                            self._buckets.setdefault(blk, set()).add(aid)
+                        fresh.append(rec)
+                        self.stats["new"] += 1
+                self._link(ticker, canon)
+                if canon not in out_ids:
+                    out_ids.append(canon)
+            self._evict()
+
+        # 새 기사만 한 번에 감성 채점 (락 밖에서)
+        sentiment_scorer.annotate([fresh])
+        return [self._public(self._articles[aid]) for aid in out_ids[:limit] if aid in self._articles]
+
+    def for_ticker(self, ticker: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """역색인: ticker 와 연결된 대표 기사 (최근 순)"""
+        with self._lock:
+            ids = list(self._by_ticker.get(ticker.upper(), {}))[::-1][:limit]
+            return [self._public(self._articles[i]) for i in ids if i in self._articles]
+
+    @staticmethod
+    def _public(rec: Dict[str, Any]) -> Dict[str, Any]:
+        return {**rec, "tickers": sorted(rec["tickers"])}
+
+
+article_store = ArticleStore()
@@ -0,0 +1,300 @@
+# app/workflow/cache.py
+from __future__ import annotations
+import asyncio, contextlib, hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+import logging
+LOGGER = logging.getLogger("ticker-graph")
+
+try:
+    import fcntl  # 프로세스 간 파일 락 (POSIX)
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+_MISS = object()
+
+
+class CacheMissError(LookupError):
+    """cache_only 정책에서 캐시에 값이 없음 (로더를 호출하지 않음)"""
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    요청 단위 캐시 정책 (scoring profile 이 설정)
+    max_stale_s: 만료 후에도 이 시간(초)까지는 캐시 값을 그대로 사용
+    cache_only: 캐시에 없으면 원본(MCP)을 호출하지 않고 CacheMissError
+    """
+    max_stale_s: float = 0.0
+    cache_only: bool = False
+
+
+# 현재 요청의 캐시 정책. run_once 가 설정하면 그래프 노드 태스크들로 전파됨
+cache_policy: ContextVar[CachePolicy] = ContextVar("cache_policy", default=CachePolicy())
+
+
+class TTLCache:
+    """
+    프로세스 로컬 TTL + LRU 캐시 (1차 캐시)
+    stale_keep_s: 만료된 항목을 이 시간만큼 더 보관 (max_stale 조회용, LRU 상한은 그대로)
+    """
+
+    def __init__(self, maxsize: int = 2048, stale_keep_s: float = 0.0):
+        self.maxsize = maxsize
+        self.stale_keep_s = stale_keep_s
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str, max_stale: float = 0.0) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return _MISS
+        expires, value = item
+        now = time.time()
+        if expires < now:
+            if expires + self.stale_keep_s < now:
+                self._data.pop(key, None)
+                return _MISS
+            if expires + max_stale < now:
+                return _MISS
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class SharedCache:
+    """
+    같은 호스트의 모든 uvicorn 워커가 공유하는 2차 캐시.
+    - 저장소: shared_cache_dir 아래 SQLite(WAL) 파일 (/dev/shm 이면 사실상 공유 메모리)
+    - 락: 키별 lock 파일 + flock → 프로세스 간 single-flight (해제할 때 파일을 지워 locks/ 가 커지지 않음)
+    값은 JSON 직렬화 가능한 것만 저장합니다.
+    """
+
+    def __init__(self, directory: str, stale_keep_s: float = 0.0):
+        self.dir = Path(directory)
+        self.stale_keep_s = stale_keep_s
+        (self.dir / "locks").mkdir(parents=True, exist_ok=True)
+        self.path = self.dir / "cache.sqlite3"
+        self._local = threading.local()
+        with self._conn() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " key TEXT PRIMARY KEY, expires REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # to_thread 의 워커 스레드마다 커넥션 1개
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def get(self, key: str, max_stale: float = 0.0) -> Any:
+        row = self._conn().execute(
+            "SELECT expires, value FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] + min(max_stale, self.stale_keep_s) < time.time():
+            return _MISS
+        return json.loads(row[1])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return  # 직렬화 불가 값은 로컬 캐시에만 둔다
+        db = self._conn()
+        db.execute(
+            "INSERT OR REPLACE INTO kv (key, expires, value) VALUES (?, ?, ?)",
+            (key, time.time() + ttl, payload),
+        )
+        # 만료 항목은 가끔씩만 정리
+        if hash(key) % 64 == 0:
+            db.execute("DELETE FROM kv WHERE expires < ?", (time.time() - self.stale_keep_s,))
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: str, timeout: float = 30.0):
+        """
+        키별 프로세스 간 배타 락. 이벤트 루프를 막지 않도록 LOCK_NB 폴링.
+        timeout 을 넘기면 락 없이 진행 (중복 호출은 허용, 정지는 불허).
+        """
+        if fcntl is None:
+            yield False
+            return
+        path = self.dir / "locks" / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.lock"
+        fd: Optional[int] = None
+        acquired = False
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                if fd is None:
+                    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    if time.monotonic() > deadline:
+                        LOGGER.warning("[cache] lock timeout key=%s", key)
+                        break
+                    await asyncio.sleep(0.02)
+                    continue
+                # 기다리는 사이 이전 보유자가 파일을 지웠으면(아래 finally) 지워진 파일의 락 → 새 파일로 다시
+                try:
+                    current = os.fstat(fd).st_ino == os.stat(path).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    acquired = True
+                    break
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+                fd = None
+            yield acquired
+        finally:
+            if acquired:
+                # 잡고 있는 동안 지워야 다음 보유자가 항상 새 파일을 씀 → locks/ 에는 사용 중인 키만 남음
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            if fd is not None:
+                os.close(fd)
+
+
+class ResultCache:
+    """
+    로컬 TTL 캐시 → 공유 캐시 → (single-flight) loader 순으로 조회.
+    - 같은 프로세스의 동시 요청은 asyncio.Future 하나를 공유
+    - 다른 워커의 동시 요청은 SharedCache.lock 으로 직렬화 후 결과 재사용
+    - 현재 cache_policy 에 따라 만료된 값 허용(max_stale_s) / 캐시 전용(cache_only)
+    """
+
+    def __init__(self, local: TTLCache, shared: Optional[SharedCache] = None,
+                 default_ttl: float = 60.0):
+        self.local = local
+        self.shared = shared
+        self.default_ttl = default_ttl
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.stats = {"local_hit": 0, "shared_hit": 0, "coalesced": 0, "miss": 0, "cache_only_miss": 0,
+                      "owner_cancelled": 0, "uncached": 0}
+
+    async def _shared_get(self, key: str, max_stale: float = 0.0) -> Any:
+        if self.shared is None:
+            return _MISS
+        try:
+            return await asyncio.to_thread(self.shared.get, key, max_stale)
+        except Exception as e:
+            LOGGER.warning("[cache] shared get failed: %s", e)
+            return _MISS
+
+    async def _shared_set(self, key: str, value: Any, ttl: float) -> None:
+        if self.shared is None:
+            return
+        try:
+            await asyncio.to_thread(self.shared.set, key, value, ttl)
+        except Exception as e:
+            LOGGER.warning("[cache] shared set failed: %s", e)
+
+    def peek(self, key: str) -> Any:
+        """로컬 캐시만 확인 (없으면 None)"""
+        v = self.local.get(key)
+        return None if v is _MISS else v
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None,
+                          cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        cacheable: 로더 결과를 저장할지 판단 (False 면 동시 대기자에게만 전달하고 캐시하지 않음,
+        예: 일시적인 오류 응답)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        policy = cache_policy.get()
+
+        v = self.local.get(key, policy.max_stale_s)
+        if v is not _MISS:
+            self.stats["local_hit"] += 1
+            return v
+
+        if policy.cache_only:
+            # 로딩 중인 요청도 기다리지 않음 (지연 예산이 짧은 요청용)
+            v = await self._shared_get(key, policy.max_stale_s)
+            if v is _MISS:
+                self.stats["cache_only_miss"] += 1
+                raise CacheMissError(key)
+            self.stats["shared_hit"] += 1
+            return v
+
+        # 같은 프로세스에서 이미 로딩 중이면 그 결과를 기다린다
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats["coalesced"] += 1
+            # wait() 는 fut 가 취소돼도 예외 없이 돌아오고, 이 요청이 취소되면 fut 는 건드리지 않고 CancelledError
+            # → 두 경우를 Task.cancelling()(3.11+) 없이 구분
+            await asyncio.wait({fut})
+            if fut.cancelled():
+                # 로딩하던 요청만 취소됨(클라이언트 끊김 등) → 이 요청이 직접 다시 로드
+                self.stats["owner_cancelled"] += 1
+                return await self.get_or_load(key, loader, ttl, cacheable)
+            return fut.result()
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            store = True
+            v = await self._shared_get(key, policy.max_stale_s)
+            if v is not _MISS:
+                self.stats["shared_hit"] += 1
+            elif self.shared is None:
+                self.stats["miss"] += 1
+                v = await loader()
+                store = cacheable is None or cacheable(v)
+            else:
+                async with self.shared.lock(key):
+                    # 락을 기다리는 동안 다른 워커가 채웠을 수 있음
+                    v = await self._shared_get(key)
+                    if v is not _MISS:
+                        self.stats["coalesced"] += 1
+                    else:
+                        self.stats["miss"] += 1
+                        v = await loader()
+                        store = cacheable is None or cacheable(v)
+                        if store:
+                            await self._shared_set(key, v, ttl)
+            if store:
+                self.local.set(key, v, ttl)
+            else:
+                self.stats["uncached"] += 1
+            fut.set_result(v)
+            return v
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # 대기자가 없을 때 "never retrieved" 경고 방지
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+def _build_cache() -> ResultCache:
+    from app.settings import settings
+
+    shared = None
+    if settings.shared_cache_dir:
+        try:
+            shared = SharedCache(settings.shared_cache_dir, stale_keep_s=settings.cache_stale_keep_s)
+        except Exception as e:
+            LOGGER.warning("[cache] shared cache disabled (%s): %s", settings.shared_cache_dir, e)
+    return ResultCache(TTLCache(stale_keep_s=settings.cache_stale_keep_s), shared,
+                       default_ttl=settings.cache_ttl_s)
+
+
+result_cache = _build_cache()
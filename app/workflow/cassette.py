@@ -0,0 +1,182 @@
+# app/workflow/cassette.py
+"""
+MCP / LLM 트래픽 녹화·재생 (cassette)
+
+- CASSETTE_MODE=record : 모든 call_tool 요청/응답과 LLM 호출을 CASSETTE_PATH 에 JSONL 로 기록
+- CASSETTE_MODE=replay : 파일을 메모리 색인(키 → 응답 목록)으로 올려 네트워크 없이 재생
+  CASSETTE_REPLAY_LATENCY=true 이면 녹화 당시 지연만큼 대기 (코드 버전 간 지연 비교용)
+- 경로가 .gz 로 끝나면 gzip 압축
+
+한 줄 형식: {"kind": "tool"|"llm", "key": ..., "req": ..., "resp": ..., "ms": 지연}
+같은 키가 여러 번 녹화되면 녹화 순서대로 재생하고, 다 쓰면 마지막 응답을 반복합니다.
+"""
+from __future__ import annotations
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.settings import settings
+
+LOGGER = logging.getLogger("ticker-graph")
+
+
+class CassetteMissError(LookupError):
+    """재생 모드에서 녹화되지 않은 요청"""
+
+
+def tool_key(name: str, args: dict) -> str:
+    return f"{name}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
+
+
+def _message_dump(m: Any) -> Dict[str, Any]:
+    if isinstance(m, BaseMessage):
+        return {"role": m.type, "content": m.content}
+    return {"role": "user", "content": str(m)}
+
+
+def llm_key(messages: Any, kwargs: Dict[str, Any]) -> str:
+    msgs = messages if isinstance(messages, list) else [messages]
+    body = json.dumps({"m": [_message_dump(m) for m in msgs], "kw": kwargs},
+                      sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    def __init__(self, mode: str = "", path: str = "", replay_latency: bool = False):
+        if mode not in ("", "record", "replay"):
+            raise ValueError(f"unknown cassette mode: {mode}")
+        self.mode = mode
+        self.path = Path(path) if path else None
+        self.replay_latency = replay_latency
+        self._index: Dict[str, List[dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._fh = None
+        if mode and self.path is None:
+            raise ValueError("CASSETTE_PATH is required when CASSETTE_MODE is set")
+        if mode == "replay":
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ── 파일 ────────────────────────────────────────────────────────────────
+    def _load(self) -> None:
+        n = 0
+        with _open(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._index[f"{entry['kind']}:{entry['key']}"].append(entry)
+                    n += 1
+        LOGGER.info("[cassette] loaded %d entries from %s", n, self.path)
+
+    def _write(self, entry: dict) -> None:
+        with self._lock:
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = _open(self.path, "a")
+            self._fh.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            self._fh.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def entries(self, kind: Optional[str] = None) -> List[dict]:
+        return [e for v in self._index.values() for e in v if kind is None or e["kind"] == kind]
+
+    # ── 재생 ────────────────────────────────────────────────────────────────
+    async def _replay(self, kind: str, key: str, hint: str) -> dict:
+        with self._lock:
+            items = self._index.get(f"{kind}:{key}")
+            if not items:
+                raise CassetteMissError(f"no recorded {kind} response for {hint}")
+            i = self._cursor[f"{kind}:{key}"]
+            self._cursor[f"{kind}:{key}"] = i + 1
+            entry = items[min(i, len(items) - 1)]
+        if self.replay_latency and entry.get("ms"):
+            await asyncio.sleep(entry["ms"] / 1000)
+        return entry
+
+    # ── 훅 ──────────────────────────────────────────────────────────────────
+    async def tool(self, name: str, args: dict, call: Callable[[], Awaitable[Any]]) -> Any:
+        """call_tool 훅: 재생이면 기록된 응답, 녹화면 실제 호출 후 기록"""
+        key = tool_key(name, args)
+        if self.replaying:
+            return (await self._replay("tool", key, key))["resp"]
+        t0 = time.perf_counter()
+        resp = await call()
+        if self.recording:
+            self._write({"kind": "tool", "key": key, "req": {"name": name, "args": args},
+                         "resp": resp, "ms": round((time.perf_counter() - t0) * 1000, 1)})
+        return resp
+
+    async def llm(self, messages: Any, kwargs: Dict[str, Any],
+                  call: Callable[[], Awaitable[Any]]) -> Any:
+        key = llm_key(messages, kwargs)
+        if self.replaying:
+            r = (await self._replay("llm", key, f"llm:{key[:12]}"))["resp"]
+            return AIMessage(content=r["content"], usage_metadata=r.get("usage") or None,
+                             response_metadata=r.get("meta") or {})
+        t0 = time.perf_counter()
+        resp = await call()
+        if self.recording:
+            msgs = messages if isinstance(messages, list) else [messages]
+            self._write({
+                "kind": "llm", "key": key,
+                "req": {"messages": [_message_dump(m) for m in msgs]},
+                "resp": {"content": getattr(resp, "content", str(resp)),
+                         "usage": getattr(resp, "usage_metadata", None),
+                         "meta": getattr(resp, "response_metadata", None)},
+                "ms": round((time.perf_counter() - t0) * 1000, 1),
+            })
+        return resp
+
+
+class CassetteLLM:
+    """
+    LLM 라우터를 감싸 녹화/재생. 재생 모드에서는 inner 없이도 동작
+    tier: 모델 등급("default" 외)이면 키에 포함해 등급별 응답을 구분
+    """
+
+    def __init__(self, inner: Any, cassette: Cassette, tier: str = "default"):
+        self.inner = inner
+        self.cassette = cassette
+        self.tier = tier
+
+    async def ainvoke(self, messages: Any, *, timeout_s: Optional[float] = None, **kwargs: Any) -> Any:
+        # timeout_s 는 요청마다 달라지므로 키에 넣지 않음
+        key_kwargs = kwargs if self.tier == "default" else {**kwargs, "tier": self.tier}
+        return await self.cassette.llm(messages, key_kwargs,
+                                       lambda: self.inner.ainvoke(messages, timeout_s=timeout_s, **kwargs))
+
+    def status(self) -> Dict[str, Any]:
+        if self.inner is None:
+            return {"cassette": {"mode": self.cassette.mode, "path": str(self.cassette.path)}}
+        return self.inner.status()
+
+
+cassette = Cassette(settings.cassette_mode, settings.cassette_path, settings.cassette_replay_latency)
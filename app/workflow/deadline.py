@@ -0,0 +1,49 @@
+# app/workflow/deadline.py
+"""
+요청 마감 전파 / 협력적 취소
+
+run_once(run_stream, run_with_trace) 가 요청 마감(epoch 초)을 ContextVar 로 설정하면
+cache_policy 와 같이 그래프 노드 태스크들로 전파됩니다.
+- MCP 호출(call_tool): 마감이 지났으면 호출하지 않고(None), 남은 시간만큼만 기다림
+- LLM 호출(node_score): state["deadline"] 으로 남은 시간만큼만 기다림 (시간이 없으면 규칙 점수)
+- 요청이 취소되면(클라이언트 끊김, A2A tasks/cancel, 마감 초과) 진행 중인 MCP/LLM 대기가
+  CancelledError 로 끊기고 헤지 요청까지 함께 취소됨
+
+취소로 아낀 작업은 metrics 의 cancel.* 로 집계 (GET /metrics 의 "cancellation")
+"""
+from __future__ import annotations
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from app.workflow.metrics import metrics
+
+# 현재 요청의 마감 (epoch 초, 없으면 None)
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# 실행 취소 사유: 마감 초과 | 클라이언트 끊김(/score, /score/batch, SSE) | A2A tasks/cancel
+CANCEL_REASONS = ("deadline", "disconnect", "a2a")
+
+
+def time_left() -> Optional[float]:
+    """요청 마감까지 남은 시간(초). 마감이 없으면 None"""
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def record_cancel(reason: str) -> None:
+    metrics.incr(f"cancel.reason.{reason}")
+
+
+def cancel_stats() -> Dict[str, Any]:
+    """GET /metrics 용: 취소된 실행과 그 덕분에 중단/생략된 MCP·LLM 호출"""
+    return {
+        "runs_cancelled": int(metrics.get("cancel.runs")),
+        "runs_skipped": int(metrics.get("cancel.runs_skipped")),
+        "by_reason": {r: int(metrics.get(f"cancel.reason.{r}")) for r in CANCEL_REASONS},
+        "mcp_calls_cancelled": int(metrics.get("cancel.mcp_calls")),
+        "mcp_calls_skipped": int(metrics.get("cancel.mcp_skipped")),
+        "llm_calls_cancelled": int(metrics.get("cancel.llm_calls")),
+        # 중단된 LLM 호출의 프롬프트 토큰 (출력 토큰은 생성되지 않음)
+        "llm_prompt_tokens_cancelled": int(metrics.get("cancel.llm_prompt_tokens")),
+    }
@@ -0,0 +1,185 @@
+# app/workflow/enrichment.py
+"""
+선택형 보강(enrichment) 데이터셋
+
+yfinance MCP 의 나머지 툴(재무제표/주주/애널리스트 추천/배당·분할/옵션)을 요청별로 골라 수집합니다.
+(옵션은 체인 분석이 커서 app/workflow/options.py 에 따로 있음)
+- 그래프에서 데이터셋마다 노드 1개 → 선택된 노드만 yahoo/dart/history 와 같은 단계에서 병렬 실행
+  (선택하지 않으면 노드 자체가 실행되지 않으므로 추가 지연 없음)
+- 각 노드는 풀에서 세션을 따로 빌리므로 서로 직렬화되지 않음
+- 캐시 TTL 은 데이터 변화 주기에 맞춰 툴별로 다름 (mcp_clients.TOOL_TTL_S: 재무제표는 하루 등)
+
+summarize 함수는 MCP 원본(JSON 문자열/리스트)을 프롬프트에 넣을 작은 dict 로 줄입니다.
+"""
+from __future__ import annotations
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.workflow.mcp_clients import (
+    get_financial_statement,
+    get_holder_info,
+    get_recommendations,
+    get_stock_actions,
+)
+from app.workflow.options import fetch_options
+
+LOGGER = logging.getLogger("ticker-graph")
+
+
+def _load(raw: Any) -> Any:
+    """MCP 응답(JSON 문자열 | 이미 파싱된 값) → 파이썬 값. 파싱 불가면 None"""
+    if isinstance(raw, str):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+    return raw
+
+
+def _rows(raw: Any) -> List[dict]:
+    data = _load(raw)
+    if isinstance(data, dict):
+        data = data.get("items") or data.get("data") or [data]
+    return [r for r in data if isinstance(r, dict)] if isinstance(data, list) else []
+
+
+def _num(x: Any) -> Optional[float]:
+    try:
+        return None if x is None else float(x)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ratio(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    return round(a / b, 4) if a is not None and b else None
+
+
+def _first(row: dict, *keys: str) -> Any:
+    for k in keys:
+        if row.get(k) is not None:
+            return row[k]
+    return None
+
+
+# ── 데이터셋별 수집 + 요약 ────────────────────────────────────────────────────
+async def fetch_financials(client, ticker: str) -> Optional[Dict[str, Any]]:
+    """분기 손익계산서: 최근 분기 매출/순이익, 순이익률, 전분기 대비 매출 증가율"""
+    rows = _rows(await get_financial_statement(client, ticker, "quarterly_income_stmt"))
+    if not rows:
+        return None
+    rows.sort(key=lambda r: str(_first(r, "date", "Date") or ""), reverse=True)
+    revenue = [_num(_first(r, "Total Revenue", "TotalRevenue", "totalRevenue")) for r in rows[:2]]
+    income = _num(_first(rows[0], "Net Income", "NetIncome", "netIncome"))
+    return {
+        "period": str(_first(rows[0], "date", "Date") or "")[:10] or None,
+        "revenue": revenue[0],
+        "net_income": income,
+        "net_margin": _ratio(income, revenue[0]),
+        "revenue_growth": (_ratio(revenue[0] - revenue[1], abs(revenue[1]))
+                           if len(revenue) > 1 and None not in revenue else None),
+    }
+
+
+async def fetch_holders(client, ticker: str) -> Optional[Dict[str, Any]]:
+    """기관 보유: 상위 보유 기관 수와 상위 3곳"""
+    rows = _rows(await get_holder_info(client, ticker, "institutional_holders"))
+    if not rows:
+        return None
+    return {
+        "institutions": len(rows),
+        "top": [str(_first(r, "Holder", "holder", "name")) for r in rows[:3]],
+    }
+
+
+# 추천 등급 가중치 (1 = 강력 매수 … 5 = 강력 매도)
+_RATING_WEIGHTS = {"strongBuy": 1, "buy": 2, "hold": 3, "sell": 4, "strongSell": 5}
+
+
+async def fetch_recommendations(client, ticker: str) -> Optional[Dict[str, Any]]:
+    """애널리스트 추천 분포(최근 기간): 매수 비중과 평균 등급"""
+    rows = _rows(await get_recommendations(client, ticker))
+    latest = next((r for r in rows if str(r.get("period")) == "0m"), rows[0] if rows else None)
+    if not latest:
+        return None
+    counts = {k: int(_num(latest.get(k)) or 0) for k in _RATING_WEIGHTS}
+    total = sum(counts.values())
+    if not total:
+        return None
+    return {
+        "analysts": total,
+        "buy_ratio": round((counts["strongBuy"] + counts["buy"]) / total, 3),
+        "mean_rating": round(sum(_RATING_WEIGHTS[k] * v for k, v in counts.items()) / total, 2),
+    }
+
+
+async def fetch_actions(client, ticker: str) -> Optional[Dict[str, Any]]:
+    """배당/분할 이력: 최근 4건 배당 합계와 마지막 분할"""
+    rows = _rows(await get_stock_actions(client, ticker))
+    if not rows:
+        return None
+    rows.sort(key=lambda r: str(_first(r, "Date", "date") or ""))
+    divs = [(str(_first(r, "Date", "date"))[:10], _num(r.get("Dividends"))) for r in rows]
+    divs = [(d, v) for d, v in divs if v]
+    splits = [(str(_first(r, "Date", "date"))[:10], _num(r.get("Stock Splits"))) for r in rows]
+    splits = [(d, v) for d, v in splits if v]
+    return {
+        "dividends_recent": round(sum(v for _, v in divs[-4:]), 4) if divs else 0.0,
+        "last_dividend_date": divs[-1][0] if divs else None,
+        "last_split": f"{splits[-1][0]} x{splits[-1][1]:g}" if splits else None,
+    }
+
+
+@dataclass(frozen=True)
+class Enricher:
+    name: str
+    fetch: Callable[[Any, str], Awaitable[Optional[Dict[str, Any]]]]
+    label: str          # 프롬프트 표시 이름
+
+
+ENRICHERS: Dict[str, Enricher] = {
+    e.name: e for e in (
+        Enricher("financials", fetch_financials, "재무"),
+        Enricher("holders", fetch_holders, "기관보유"),
+        Enricher("recommendations", fetch_recommendations, "애널리스트"),
+        Enricher("actions", fetch_actions, "배당/분할"),
+        Enricher("options", fetch_options, "옵션"),
+    )
+}
+
+
+def parse_enrich(spec: Any) -> List[str]:
+    """
+    "financials,options" | ["financials", ...] | "all" | "" → 데이터셋 이름 목록 (ENRICHERS 순서)
+    모르는 이름이면 ValueError
+    """
+    if spec is None:
+        return []
+    names = spec.split(",") if isinstance(spec, str) else list(spec)
+    names = {str(n).strip().lower() for n in names if str(n).strip()}
+    if "all" in names:
+        return list(ENRICHERS)
+    unknown = names - set(ENRICHERS)
+    if unknown:
+        raise ValueError(f"unknown enrichment dataset(s): {sorted(unknown)} (available: {list(ENRICHERS)})")
+    return [n for n in ENRICHERS if n in names]
+
+
+def _fmt(v: Any) -> str:
+    if isinstance(v, float):
+        return f"{v:.4g}" if abs(v) < 1e6 else f"{v:.3e}"
+    if isinstance(v, list):
+        return "/".join(map(str, v))
+    return str(v)
+
+
+def format_enrichment(enrichment: Optional[Dict[str, Any]]) -> List[str]:
+    """프롬프트용 한 줄 요약 (데이터셋당 1줄, 값이 없는 데이터셋은 생략)"""
+    lines = []
+    for name, e in ENRICHERS.items():
+        data = (enrichment or {}).get(name)
+        if data:
+            body = ", ".join(f"{k}={_fmt(v)}" for k, v in data.items() if v is not None)
+            lines.append(f"  - {e.label}: {body}")
+    return lines
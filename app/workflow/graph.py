@@ -1,11 +1,23 @@
 from __future__ import annotations
-from typing import Any, Dict
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 from app.workflow.state import ScoreState
-from app.workflow.nodes import node_yahoo, node_dart, node_score, node_finalize, node_ingest
+from app.workflow.nodes import (
+    node_yahoo, node_dart, node_history, node_score, node_finalize, node_ingest, make_enrich_node,
+)
+from app.workflow.enrichment import ENRICHERS, parse_enrich
+from app.workflow.profiles import SOURCES, DeadlineExceeded, Profile, record_run, resolve_profile
+from app.workflow.cache import cache_policy
+from app.workflow.deadline import record_cancel, request_deadline
+from app.workflow.metrics import metrics
+from app.workflow.universe import universe
+from app.settings import settings
 from uuid import uuid4
-from app.workflow.trace import events_to_mermaid_flow
+from app.workflow.trace import FlowTrace
 
 # 그래프 선언 (병렬 노드 구성)
 memory = MemorySaver()
@@ -14,15 +26,27 @@ builder = StateGraph(ScoreState)
 builder.add_node("ingest", node_ingest)
 builder.add_node("yahoo",    node_yahoo)
 builder.add_node("dart",     node_dart)
+builder.add_node("history",  node_history)
 builder.add_node("score",    node_score)
 builder.add_node("finalize", node_finalize)
+for _name in ENRICHERS:
+    builder.add_node(_name, make_enrich_node(_name))
 
-# START → yahoo & dart (병렬) → score → finalize → END
+
+def route_sources(state: ScoreState) -> List[str]:
+    """
+    프로필이 정한 수집 노드 + 요청에서 선택한 보강 노드만 실행.
+    sources 가 없으면(LangGraph Studio 등 직접 실행) 기본 수집 노드 전부
+    """
+    sources = [n for n in (state.get("sources") or SOURCES) if n in SOURCES] or ["yahoo"]
+    return sources + [n for n in (state.get("enrich") or []) if n in ENRICHERS]
+
+
+# START → ingest → (프로필의 수집 노드 + 선택한 보강 노드, 병렬) → score → finalize → END
 builder.add_edge(START, "ingest")
-builder.add_edge("ingest", "yahoo")
-builder.add_edge("ingest", "dart")
-builder.add_edge("yahoo", "score")
-builder.add_edge("dart",  "score")
+builder.add_conditional_edges("ingest", route_sources, [*SOURCES, *ENRICHERS])
+for _name in (*SOURCES, *ENRICHERS):
+    builder.add_edge(_name, "score")
 builder.add_edge("score", "finalize")
 builder.add_edge("finalize", END)
 
@@ -30,33 +54,144 @@ builder.add_edge("finalize", END)
 graph = builder.compile()  # ✅ 메모리 저장 비활성화
 
 # 실행 유틸
-async def run_once(ticker: str) -> Dict[str, Any]:
-    cfg = {"configurable": {"thread_id": f"score-{ticker}-{uuid4()}"}}  # ✅ 새 스레드 id
-    final: ScoreState = await graph.ainvoke({"ticker": ticker}, config=cfg)
+EnrichSpec = Optional[Iterable[str] | str]
+
+def initial_state(ticker: str, enrich: EnrichSpec = None, profile: Optional[str | Profile] = None,
+                  timeout_s: Optional[float] = None) -> ScoreState:
+    """
+    profile: 점수 프로필 이름 (None 이면 settings.default_profile)
+    enrich: 보강 데이터셋 선택 (None 이면 프로필 기본값). 모르는 이름이면 ValueError
+    timeout_s: 클라이언트 마감(초). 프로필 마감보다 짧을 때만 적용
+    """
+    p = profile if isinstance(profile, Profile) else resolve_profile(profile)
+    if enrich is None:
+        enrich = settings.enrich_default if p.enrich is None else p.enrich
     return {
+        "ticker": ticker,
+        "profile": p.name,
+        "sources": list(p.sources),
+        "enrich": parse_enrich(enrich),
+        "deadline": time.time() + _deadline_s(p, timeout_s),
+    }
+
+def _deadline_s(p: Profile, timeout_s: Optional[float]) -> float:
+    return p.deadline_s if timeout_s is None else min(p.deadline_s, timeout_s)
+
+@contextmanager
+def _request_context(p: Profile, state: ScoreState):
+    """프로필 캐시 정책 + 요청 마감을 노드 태스크들로 전파 (MCP 호출이 마감을 봄)"""
+    tokens = cache_policy.set(p.cache), request_deadline.set(state.get("deadline"))
+    try:
+        yield
+    finally:
+        request_deadline.reset(tokens[1])
+        cache_policy.reset(tokens[0])
+
+async def run_once(ticker: str, enrich: EnrichSpec = None, profile: Optional[str] = None,
+                   timeout_s: Optional[float] = None) -> Dict[str, Any]:
+    """
+    프로필의 캐시 정책·마감 시간으로 그래프 1회 실행.
+    timeout_s: 클라이언트 마감(초). 프로필 마감과 둘 중 짧은 쪽이 요청 마감이 되어 모든 노드로 전파됨
+    마감을 넘기면 실행을 취소하고 DeadlineExceeded (프로필별 지연/SLO 는 metrics 에 집계).
+    호출자가 취소하면(클라이언트 끊김, A2A tasks/cancel) 진행 중인 MCP/LLM 호출도 함께 취소됨
+    """
+    p = resolve_profile(profile)
+    state = initial_state(ticker, enrich, p, timeout_s)
+    deadline_s = _deadline_s(p, timeout_s)
+    cfg = {"configurable": {"thread_id": f"score-{ticker}-{uuid4()}"}}  # ✅ 새 스레드 id
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        with _request_context(p, state):
+            final: ScoreState = await asyncio.wait_for(graph.ainvoke(state, config=cfg), deadline_s)
+        outcome = "ok"
+    except asyncio.TimeoutError:
+        outcome = "deadline"
+        metrics.incr("cancel.runs")
+        record_cancel("deadline")
+        who = f"{p.name} profile" if deadline_s == p.deadline_s else "request"
+        raise DeadlineExceeded(f"{who} deadline exceeded ({deadline_s * 1000:.0f}ms) for {ticker}")
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        metrics.incr("cancel.runs")
+        raise
+    finally:
+        record_run(p, time.perf_counter() - t0, outcome)
+    result = {
         "ticker":    ticker,
+        "profile":   p.name,
         "price":     final.get("price"),
         "news":      final.get("news"),
         "filings":   final.get("filings"),
+        "indicators": final.get("indicators"),
+        "enrichment": final.get("enrichment") or {},
         "score":     final.get("score"),
         "rationale": final.get("rationale"),
+        "score_source": final.get("score_source"),
+        "output_status": final.get("output_status"),
+        "prescore":  final.get("prescore"),
+        "prompt_tokens": final.get("prompt_tokens"),
         "logs":      final.get("logs"),
         "trace": final.get("trace", {}),  # 🔎 노드별 request/response 미리보기
     }
+    universe.record(result)  # 순위 테이블(/rank) 갱신
+    return result
 
-async def run_stream(ticker: str):
+async def run_stream(ticker: str, enrich: EnrichSpec = None, profile: Optional[str] = None):
     cfg = {"configurable": {"thread_id": f"stream-{ticker}-{uuid4()}"}}  # ✅
-    async for ev in graph.astream({"ticker": ticker}, config=cfg):
-        yield ev  # {"yahoo": {...}}, {"dart": {...}}, {"score": {...}}, ...
+    p = resolve_profile(profile)
+    state = initial_state(ticker, enrich, p)
+    with _request_context(p, state):
+        try:
+            async for ev in graph.astream(state, config=cfg):
+                yield ev  # {"yahoo": {...}}, {"dart": {...}}, {"score": {...}}, ...
+        except asyncio.CancelledError:
+            metrics.incr("cancel.runs")
+            raise
+
+# 추적용: 노드 이름(이 이름의 실행 이벤트만 구독) / 그래프 간선(실행된 선행 노드로 분기 복원)
+TRACE_NODES = [n for n in graph.nodes if n != "__start__"]
+TRACE_EDGES = [(e.source, e.target) for e in graph.get_graph().edges]
 
-async def run_with_trace(ticker: str):
+async def run_with_trace(ticker: str, enrich: EnrichSpec = None, profile: Optional[str] = None):
+    """
+    노드 start/end 이벤트만 구독해 흘려보내고, 노드가 끝날 때마다 부분 Mermaid 를 함께 보냄.
+    LLM/하위 체인 이벤트와 페이로드는 구독하지 않으므로 실행 길이와 무관하게 메모리가 일정함
+    """
     cfg = {"configurable": {"thread_id": f"trace-{ticker}-{uuid4()}"}}
-    events = []
-    async for ev in graph.astream_events({"ticker": ticker}, version="v2", config=cfg):
-        # ev 예: {"event":"on_node_start","name":"yahoo",...}, {"event":"on_node_end","name":"yahoo",...}
-        events.append(ev)
-        yield {"event": ev.get("event"), "name": ev.get("name")}  # SSE 등으로 바로 전송 가능
-
-    # 실행 종료 후 Mermaid 텍스트 생성
-    mermaid = events_to_mermaid_flow(events)
-    yield {"event": "diagram", "mermaid": mermaid}
+    p = resolve_profile(profile)
+    flow = FlowTrace(TRACE_EDGES)
+    final: Dict[str, Any] = {}
+    state = initial_state(ticker, enrich, p)
+    t0 = time.perf_counter()
+    with _request_context(p, state):
+        try:
+            async for ev in graph.astream_events(state, version="v2", config=cfg,
+                                                 include_names=[*TRACE_NODES, graph.name], include_types=["chain"]):
+                kind = ev["event"]
+                if ev["name"] == graph.name:
+                    if kind == "on_chain_end":  # 그래프 전체 종료: 최종 상태
+                        final = ev["data"].get("output") or {}
+                    continue
+                if ev["name"] != ev.get("metadata", {}).get("langgraph_node"):
+                    continue  # 노드 안에서 도는 하위 실행 (조건부 간선 라우터 등)
+                if kind == "on_chain_start":
+                    yield flow.start(ev["name"], ev.get("metadata", {}).get("langgraph_step", 0), ev["run_id"])
+                elif kind == "on_chain_end":
+                    rec = flow.end(ev["run_id"])
+                    if rec is not None:
+                        yield rec
+                        yield {"event": "diagram", "mermaid": flow.mermaid(), "partial": True}
+        except asyncio.CancelledError:
+            metrics.incr("cancel.runs")
+            raise
+
+    yield {"event": "diagram", "mermaid": flow.mermaid(), "partial": False}
+    yield {
+        "event": "done",
+        "ticker": ticker,
+        "score": final.get("score"),
+        "rationale": final.get("rationale"),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "nodes": flow.nodes(),
+    }
@@ -0,0 +1,147 @@
+# app/workflow/indicators.py
+"""
+가격 히스토리 → 기술 지표 (NumPy 벡터화)
+
+여러 티커의 종가를 (n_tickers, T) 행렬 하나로 쌓아 한 번에 계산합니다.
+길이가 다른 히스토리는 오른쪽(최신) 정렬 후 왼쪽을 NaN 으로 채우며,
+바(bar) 단위 파이썬 루프 없이 축(axis=1) 연산만 사용합니다.
+"""
+from __future__ import annotations
+import json
+import warnings
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+RETURN_WINDOWS = (5, 20, 60)
+VOL_WINDOW = 20
+RSI_WINDOW = 14
+SMA_FAST, SMA_SLOW = 20, 50
+CROSS_LOOKBACK = 5
+TRADING_DAYS = 252
+
+_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def parse_history(raw: Any) -> Dict[str, np.ndarray]:
+    """
+    get_historical_stock_prices 결과(JSON 문자열 | list[dict] | {"data": [...]})를
+    {"date": datetime64[D], "open", "high", "low", "close", "volume": float64} 배열로 변환.
+    """
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = []
+    if isinstance(raw, dict):
+        raw = raw.get("data") or raw.get("items") or []
+    if not isinstance(raw, list):
+        raw = []  # None (캐시 전용 조회 미스) 등
+    rows = [{str(k).lower(): v for k, v in r.items()} for r in raw if isinstance(r, dict)]
+    rows = [r for r in rows if r.get("close") is not None and (r.get("date") or r.get("datetime"))]
+
+    dates = np.array([str(r.get("date") or r.get("datetime"))[:10] for r in rows], dtype="datetime64[D]")
+    out = {"date": dates}
+    for f in _FIELDS:
+        out[f] = np.array([r.get(f, np.nan) if r.get(f) is not None else np.nan for r in rows],
+                          dtype=np.float64)
+    order = np.argsort(dates, kind="stable")
+    return {k: v[order] for k, v in out.items()}
+
+
+def stack_right_aligned(series: Sequence[np.ndarray], length: Optional[int] = None) -> np.ndarray:
+    """길이가 다른 1차원 배열들을 (n, length) 행렬로 오른쪽 정렬 (앞쪽은 NaN)"""
+    length = length or max((len(s) for s in series), default=0)
+    out = np.full((len(series), length), np.nan, dtype=np.float64)
+    for i, s in enumerate(series):
+        s = np.asarray(s, dtype=np.float64)[-length:]
+        if len(s):
+            out[i, length - len(s):] = s
+    return out
+
+
+def _window_mean(x: np.ndarray, w: int, end: int = 0) -> np.ndarray:
+    """마지막 w 개(끝에서 end 만큼 이전까지)의 평균 (NaN 무시, 전부 NaN 이면 NaN)"""
+    stop = x.shape[1] - end
+    if stop < w:
+        return np.full(x.shape[0], np.nan)
+    win = x[:, stop - w:stop]
+    cnt = np.sum(~np.isnan(win), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(cnt >= w, np.nansum(win, axis=1) / cnt, np.nan)
+
+
+def compute_indicators(close: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    close: (n_tickers, T) 오른쪽 정렬 종가 행렬
+    반환: 지표명 → (n_tickers,) 배열
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    n, T = close.shape
+    last = close[:, -1] if T else np.full(n, np.nan)
+    out: Dict[str, np.ndarray] = {"last_close": last}
+
+    # 데이터가 짧거나 전부 NaN 인 행은 NaN 으로 두고 경고는 숨긴다
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # 기간 수익률
+        for w in RETURN_WINDOWS:
+            out[f"ret_{w}d"] = last / close[:, -1 - w] - 1.0 if T > w else np.full(n, np.nan)
+
+        # 변동성: 일간 로그수익률 표준편차(연율화)
+        logret = np.diff(np.log(close), axis=1)
+        if logret.shape[1] >= VOL_WINDOW:
+            win = logret[:, -VOL_WINDOW:]
+            out["vol_20d"] = np.nanstd(win, axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+        else:
+            out["vol_20d"] = np.full(n, np.nan)
+
+        # RSI(14): 최근 14개 변화의 평균 상승/하락 (단순평균 RSI)
+        diff = np.diff(close, axis=1)
+        if diff.shape[1] >= RSI_WINDOW:
+            win = diff[:, -RSI_WINDOW:]
+            gain = np.nanmean(np.clip(win, 0, None), axis=1)
+            loss = np.nanmean(np.clip(-win, 0, None), axis=1)
+            rs = gain / loss
+            out["rsi_14"] = np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+        else:
+            out["rsi_14"] = np.full(n, np.nan)
+
+        # 이동평균 / 골든·데드 크로스 (최근 CROSS_LOOKBACK 바 안에서 부호 변화)
+        fast_now, slow_now = _window_mean(close, SMA_FAST), _window_mean(close, SMA_SLOW)
+        fast_prev = _window_mean(close, SMA_FAST, end=CROSS_LOOKBACK)
+        slow_prev = _window_mean(close, SMA_SLOW, end=CROSS_LOOKBACK)
+        out[f"sma_{SMA_FAST}"], out[f"sma_{SMA_SLOW}"] = fast_now, slow_now
+        now_sign, prev_sign = np.sign(fast_now - slow_now), np.sign(fast_prev - slow_prev)
+        out["ma_cross"] = np.where(np.isnan(now_sign) | np.isnan(prev_sign), 0.0,
+                                   np.where(now_sign > prev_sign, 1.0,
+                                            np.where(now_sign < prev_sign, -1.0, 0.0)))
+        out["above_sma_slow"] = np.where(np.isnan(slow_now), np.nan, (last > slow_now).astype(float))
+
+        # 최대 낙폭(MDD): 누적 최고가 대비 (NaN 패딩은 fmax 가 무시)
+        running_max = np.fmax.accumulate(close, axis=1)
+        dd = close / running_max - 1.0
+        out["max_drawdown"] = np.nanmin(dd, axis=1) if T else np.full(n, np.nan)
+        out["drawdown_now"] = dd[:, -1] if T else np.full(n, np.nan)
+
+    return out
+
+
+def summarize(ind: Mapping[str, np.ndarray], i: int = 0, digits: int = 4) -> Dict[str, Any]:
+    """i 번째 티커의 지표를 JSON 친화적인 dict 로 (NaN → None)"""
+    out: Dict[str, Any] = {}
+    for k, v in ind.items():
+        x = float(v[i])
+        out[k] = None if np.isnan(x) else round(x, digits)
+    out["ma_cross"] = int(out["ma_cross"] or 0)
+    return out
+
+
+def indicators_for(histories: Mapping[str, Dict[str, np.ndarray]]) -> Dict[str, Dict[str, Any]]:
+    """{ticker: parse_history 결과} → {ticker: 지표 요약}. 배치 전체를 한 번에 계산"""
+    tickers: List[str] = list(histories)
+    if not tickers:
+        return {}
+    close = stack_right_aligned([histories[t]["close"] for t in tickers])
+    ind = compute_indicators(close)
+    return {t: summarize(ind, i) for i, t in enumerate(tickers)}
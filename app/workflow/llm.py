@@ -8,19 +8,88 @@ import os
 
 from langchain_openai import ChatOpenAI
 
+from app.settings import settings
+from app.workflow.cassette import CassetteLLM, cassette
+from app.workflow.llm_router import Backend, FakeChatModel, LLMRouter
+from app.workflow.output import SCORE_SCHEMA
+from app.workflow.prompts import PROMPT_VERSION
+
 load_dotenv()
 
-# 사용자 지정 파라미터 적용 (요청하신 설정)
-# 내부에서 OPENAI_* env를 읽어 OpenAI 호환 클라이언트로 초기화됨
-# llm_naver = ChatClovaX(
-#     model="HCX-007",
-#     temperature=0.5,
-#     max_tokens=None,
-#     timeout=None,
-#     max_retries=2
-# )
-
-llm_openapi = ChatOpenAI(model="gpt-4o", temperature=0.3).bind(
-    response_format={"type": "json_object"}  # ✅ JSON만 출력
+# 프롬프트 캐시: OpenAI 는 1024 토큰 이상 동일 접두부를 자동 캐시하며,
+# prompt_cache_key 가 같으면 같은 캐시로 라우팅됨 (ClovaX 는 미지원 → 인자 없이 사용)
+_cache_kwargs = (
+    {"prompt_cache_key": f"{settings.prompt_cache_key}-{PROMPT_VERSION}"} if settings.prompt_cache else {}
 )
 
+# 입력 100만 토큰당 비용(USD) — 라우터의 비용 가중치에만 쓰이는 상대값
+COST_PER_1M = {"openai": 2.5, "clovax": 1.25, "fake": 0.0}
+
+
+# 모델 등급별 모델명: default(standard/deep 프로필) / small(fast 프로필)
+LLM_MODELS = {
+    "openai": {"default": settings.openai_model, "small": settings.openai_small_model},
+    "clovax": {"default": settings.clovax_model, "small": settings.clovax_small_model},
+}
+
+
+def _openai(model: str):
+    # 내부에서 OPENAI_* env를 읽어 OpenAI 호환 클라이언트로 초기화됨
+    return ChatOpenAI(model=model, temperature=0.3).bind(
+        response_format={"type": "json_schema", "json_schema": SCORE_SCHEMA},  # ✅ 스키마 강제 JSON
+        **_cache_kwargs,
+    )
+
+
+def _clovax(model: str):
+    # ClovaX 는 json_schema 를 지원하지 않음 → output.parse_score 의 로컬 복구에 맡김
+    return ChatClovaX(
+        model=model,
+        temperature=0.5,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+        api_key=settings.clovastudio_api_key or os.getenv("CLOVASTUDIO_API_KEY"),
+    )
+
+
+def _fake(tier: str):
+    return FakeChatModel(latency_s=0.02 if tier == "small" else 0.05)
+
+
+_FACTORIES = {
+    "openai": lambda tier: _openai(LLM_MODELS["openai"][tier]),
+    "clovax": lambda tier: _clovax(LLM_MODELS["clovax"][tier]),
+    "fake": _fake,
+}
+
+
+def build_router(tier: str = "default") -> LLMRouter:
+    """LLM_BACKENDS(쉼표 구분, 예: "openai,clovax") 순서대로 백엔드 구성 (tier: 모델 등급)"""
+    backends = []
+    for name in [n.strip() for n in settings.llm_backends.split(",") if n.strip()]:
+        if name not in _FACTORIES:
+            raise ValueError(f"unknown LLM backend: {name} (choose from {', '.join(_FACTORIES)})")
+        backends.append(Backend(name, _FACTORIES[name](tier), COST_PER_1M.get(name, 0.0), settings.llm_timeout_s))
+    return LLMRouter(backends, hedge_after_s=settings.llm_hedge_after_s, cost_weight=settings.llm_cost_weight)
+
+
+# 등급별 라우터 (처음 쓰일 때 생성, 지연/오류율 관측값도 등급별로 따로 유지)
+llm_routers: dict = {}
+
+
+def get_router(tier: str = "default"):
+    router = llm_routers.get(tier)
+    if router is None:
+        if tier not in ("default", "small"):
+            raise ValueError(f"unknown LLM tier: {tier}")
+        # 녹화/재생 모드(CASSETTE_MODE)면 라우터를 감쌈 — 재생 시에는 실제 백엔드를 만들지 않음
+        if cassette.mode:
+            router = CassetteLLM(None if cassette.replaying else build_router(tier), cassette, tier)
+        else:
+            router = build_router(tier)
+        llm_routers[tier] = router
+    return router
+
+
+llm_router = get_router("default")
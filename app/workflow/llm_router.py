@@ -0,0 +1,208 @@
+# app/workflow/llm_router.py
+"""
+LLM 공급자 라우터 (OpenAI / ClovaX / Fake)
+
+- 요청마다 백엔드 순위: EWMA 지연 × (1 + 오류율 가중) + 비용 가중
+  아직 호출해 본 적 없는 백엔드는 설정 순서대로 먼저 시도 (관측값 확보)
+- 실패/타임아웃 → 다음 순위로 페일오버, 연속 실패가 쌓이면 잠시(cooldown) 제외
+- 헤지(선택): hedge_after_s 안에 응답이 없으면 다음 백엔드에도 동시에 요청, 먼저 온 응답 채택
+- 요청 마감(timeout_s): 호출별 타임아웃을 남은 시간으로 줄이고, 시간이 없으면 페일오버하지 않음
+- FakeChatModel: 네트워크 없이 테스트/벤치마크용으로 쓰는 결정적 가짜 공급자
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage
+
+from app.workflow.metrics import metrics
+
+LOGGER = logging.getLogger("ticker-graph")
+
+
+class LLMUnavailableError(RuntimeError):
+    """모든 백엔드가 실패"""
+
+
+@dataclass
+class Backend:
+    name: str
+    model: Any                       # ainvoke(messages, **kwargs) 를 가진 LangChain Runnable
+    cost_per_1m: float = 0.0         # 입력 100만 토큰당 비용(USD, 상대값이면 충분)
+    timeout_s: float = 30.0
+    # 관측값
+    ewma_latency: Optional[float] = None
+    ewma_error: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+    cooldown_until: float = 0.0
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ewma_latency_s": None if self.ewma_latency is None else round(self.ewma_latency, 3),
+            "error_rate": round(self.ewma_error, 3),
+            "calls": self.calls,
+            "errors": self.errors,
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+class LLMRouter:
+    def __init__(self, backends: Sequence[Backend], *, hedge_after_s: float = 0.0,
+                 alpha: float = 0.2, error_weight: float = 4.0, cost_weight: float = 0.2,
+                 explore_rate: float = 0.02,
+                 cooldown_after: int = 3, cooldown_s: float = 30.0):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.hedge_after_s = hedge_after_s
+        self.alpha = alpha
+        self.error_weight = error_weight
+        self.cost_weight = cost_weight
+        self.explore_rate = explore_rate
+        self.cooldown_after = cooldown_after
+        self.cooldown_s = cooldown_s
+
+    # ── 순위 ────────────────────────────────────────────────────────────────
+    def _cost(self, b: Backend) -> tuple:
+        if b.calls == 0:
+            return (0, self.backends.index(b))
+        # 실패만 있었던 백엔드는 타임아웃을 지연으로 간주
+        latency = b.ewma_latency if b.ewma_latency is not None else b.timeout_s
+        return (1, latency * (1 + self.error_weight * b.ewma_error) + self.cost_weight * b.cost_per_1m)
+
+    def rank(self) -> List[Backend]:
+        now = time.monotonic()
+        ready = [b for b in self.backends if b.cooldown_until <= now]
+        cooling = [b for b in self.backends if b.cooldown_until > now]
+        order = sorted(ready, key=self._cost) + sorted(cooling, key=lambda b: b.cooldown_until)
+        # 가끔 2순위를 먼저 써서 관측값이 낡지 않게 함
+        if len(ready) > 1 and random.random() < self.explore_rate:
+            order[0], order[1] = order[1], order[0]
+        return order
+
+    def status(self) -> Dict[str, Any]:
+        return {b.name: b.status() for b in self.backends}
+
+    # ── 호출 ────────────────────────────────────────────────────────────────
+    def _observe(self, b: Backend, latency: Optional[float], ok: bool) -> None:
+        a = self.alpha
+        b.calls += 1
+        b.ewma_error = (1 - a) * b.ewma_error + a * (0.0 if ok else 1.0)
+        if latency is not None:
+            b.ewma_latency = latency if b.ewma_latency is None else (1 - a) * b.ewma_latency + a * latency
+            metrics.observe(f"llm.backend.{b.name}.latency_s", latency)
+        if ok:
+            b.consecutive_errors = 0
+        else:
+            b.errors += 1
+            b.consecutive_errors += 1
+            metrics.incr(f"llm.backend.{b.name}.errors")
+            if b.consecutive_errors >= self.cooldown_after:
+                b.cooldown_until = time.monotonic() + self.cooldown_s
+                LOGGER.warning("[llm-router] %s cooling down for %.0fs", b.name, self.cooldown_s)
+
+    async def _call(self, b: Backend, messages: Any, kwargs: Dict[str, Any],
+                    deadline: Optional[float] = None) -> Any:
+        timeout = b.timeout_s
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        t0 = time.perf_counter()
+        try:
+            resp = await asyncio.wait_for(b.model.ainvoke(messages, **kwargs), timeout)
+        except asyncio.CancelledError:
+            raise  # 헤지에서 진 요청: 오류로 집계하지 않음
+        except Exception as e:
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            if timed_out and timeout < b.timeout_s:
+                # 요청 마감 시간에 잘린 것: 백엔드 탓이 아니므로 관측값에 넣지 않음
+                metrics.incr("llm.deadline_cut")
+                raise
+            # 타임아웃은 지연으로도 반영 (느린 백엔드가 계속 1순위가 되지 않도록)
+            self._observe(b, b.timeout_s if timed_out else None, ok=False)
+            raise
+        self._observe(b, time.perf_counter() - t0, ok=True)
+        metrics.incr(f"llm.backend.{b.name}.calls")
+        meta = getattr(resp, "response_metadata", None)
+        if isinstance(meta, dict):
+            meta["router_backend"] = b.name
+        return resp
+
+    async def ainvoke(self, messages: Any, *, timeout_s: Optional[float] = None, **kwargs: Any) -> Any:
+        """timeout_s: 페일오버·헤지를 포함한 전체 마감(초). 남은 시간이 없으면 다음 백엔드를 시작하지 않음"""
+        order = self.rank()
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        pending: Dict[asyncio.Task, Backend] = {}
+        errors: List[str] = []
+        nxt = 0
+
+        def start() -> None:
+            nonlocal nxt
+            b = order[nxt]
+            nxt += 1
+            pending[asyncio.ensure_future(self._call(b, messages, kwargs, deadline))] = b
+
+        def has_time() -> bool:
+            return deadline is None or deadline - time.monotonic() > 0
+
+        try:
+            while (nxt < len(order) and has_time()) or pending:
+                if not pending:
+                    if errors:
+                        metrics.incr("llm.failover")
+                    start()
+                can_hedge = (self.hedge_after_s > 0 and len(pending) == 1 and nxt < len(order)
+                             and has_time())
+                done, _ = await asyncio.wait(pending, timeout=self.hedge_after_s if can_hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    metrics.incr("llm.hedge")
+                    start()
+                    continue
+                for task in done:
+                    b = pending.pop(task)
+                    if task.exception() is None:
+                        if errors or len(order) > 1 and b is not order[0]:
+                            LOGGER.info("[llm-router] served by %s (errors=%s)", b.name, errors)
+                        return task.result()
+                    errors.append(f"{b.name}: {type(task.exception()).__name__}: {task.exception()}")
+            if not has_time():
+                errors.append(f"deadline exceeded ({timeout_s:.3f}s)")
+            raise LLMUnavailableError("; ".join(errors))
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class FakeChatModel:
+    """
+    로컬 가짜 공급자: 마지막 메시지 해시로 결정적인 점수 JSON 을 반환.
+    latency_s / jitter_s 만큼 대기하고, fail_rate 확률로 예외를 던집니다.
+    """
+
+    def __init__(self, latency_s: float = 0.05, jitter_s: float = 0.0, fail_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+
+    async def ainvoke(self, messages: Any, **kwargs: Any) -> AIMessage:
+        await asyncio.sleep(self.latency_s + self._rng.uniform(0, self.jitter_s))
+        if self._rng.random() < self.fail_rate:
+            raise RuntimeError("fake provider failure")
+        last = messages[-1] if isinstance(messages, list) else messages
+        text = str(getattr(last, "content", last))
+        h = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+        body = {"score": 1 + h % 100, "rationale": "가짜 공급자 응답입니다."}
+        n_in = sum(len(str(getattr(m, "content", m))) for m in (messages if isinstance(messages, list) else [messages]))
+        return AIMessage(content=json.dumps(body, ensure_ascii=False),
+                         usage_metadata={"input_tokens": n_in // 4, "output_tokens": 20,
+                                         "total_tokens": n_in // 4 + 20})
@@ -1,17 +1,49 @@
 from __future__ import annotations
+import asyncio
 import json
 from typing import Any, Dict
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
 
 import aiofiles
 
+import logging
+
 from app.settings import settings
+from app.workflow.cache import CacheMissError, result_cache
+from app.workflow.cassette import cassette
+from app.workflow.deadline import time_left
+from app.workflow.metrics import metrics
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
 
+LOGGER = logging.getLogger("ticker-graph")
 
-@asynccontextmanager
-async def open_mcp_client() -> MultiServerMCPClient:
-    """mcp_config.json 로드 후 MultiServerMCPClient 반환"""
+# 툴별 캐시 TTL(초). 없는 툴은 settings.cache_ttl_s
+TOOL_TTL_S: Dict[str, float] = {
+    "get_stock_info": 30.0,
+    "get_yahoo_finance_news": 300.0,
+    "get_historical_stock_prices": 3600.0,
+    # 보강 데이터셋: 분기/연 단위로 바뀌는 펀더멘털은 길게, 옵션 체인은 짧게
+    "get_financial_statement": 24 * 3600.0,
+    "get_holder_info": 24 * 3600.0,
+    "get_stock_actions": 24 * 3600.0,
+    "get_recommendations": 6 * 3600.0,
+    "get_option_expiration_dates": 6 * 3600.0,
+    "get_option_chain": 900.0,
+}
+
+
+def _is_error_result(value: Any) -> bool:
+    """
+    MCP 서버가 예외 대신 돌려주는 오류 문자열("Error: ...") 인지.
+    일시적인 업스트림 실패일 수 있으므로 캐시하지 않는다 (금융 데이터는 TTL 이 하루라 워커 전체가 오염됨)
+    """
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        value = value[0].get("text")  # content block 형태 응답
+    return isinstance(value, str) and value.lstrip()[:6].lower() == "error:"
+
+
+async def _load_servers_cfg() -> dict:
     # ✅ 비동기 파일 읽기
     async with aiofiles.open(settings.mcp_config_path, "r", encoding="utf-8") as f:
         text = await f.read()
@@ -20,20 +52,166 @@ async def open_mcp_client() -> MultiServerMCPClient:
     servers_cfg = cfg.get("servers") or cfg.get("mcpServers") or {}
     if not servers_cfg:
         raise RuntimeError("No MCP servers found in config")
+    return servers_cfg
 
-    client = MultiServerMCPClient(servers_cfg)
-    await client.get_tools()  # 연결 확인
-    try:
-        yield client
-    finally:
-        if hasattr(client, "close"):
-            await client.close()
 
-async def call_tool(client: MultiServerMCPClient, name: str, args: dict):
+class _Slot:
     """
-    MCP 툴 호출 공통 함수.
-    name: 'yahoo:get_stock_info' 같은 풀네임 또는 'price' 같은 단일 툴 이름
+    풀에 들어가는 세션 묶음 (설정된 모든 서버에 대한 세션 1개씩).
+    stdio 세션은 anyio 태스크 그룹에 묶여 있어 연 태스크에서 닫아야 하므로
+    전용 keeper 태스크가 세션을 열고, close() 신호를 받을 때까지 유지한다.
     """
+
+    def __init__(self, client: MultiServerMCPClient):
+        self._client = client
+        self._closed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.tools: list = []
+
+    async def open(self) -> "_Slot":
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._keep(ready))
+        self.tools = await ready
+        return self
+
+    async def _keep(self, ready: asyncio.Future) -> None:
+        try:
+            async with AsyncExitStack() as stack:
+                tools = []
+                for name in self._client.connections:
+                    session = await stack.enter_async_context(self._client.session(name))
+                    tools.extend(await load_mcp_tools(session))
+                if ready.cancelled():
+                    return  # 여는 도중 요청이 취소됨 → 풀에 들어가지 않으므로 바로 닫음
+                ready.set_result(tools)
+                await self._closed.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                LOGGER.warning("[mcp] pooled session closed with error: %s", e)
+
+    async def close(self) -> None:
+        self._closed.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class MCPSessionPool:
+    """
+    워커 프로세스당 MCP 세션 풀.
+    툴 호출마다 서버 서브프로세스를 새로 띄우는 대신, size 개의 세션을 재사용한다.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._client: MultiServerMCPClient | None = None
+        self._idle: list[_Slot] = []
+        self._created = 0
+        self._cond: asyncio.Condition | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _bind_loop(self) -> None:
+        # 이벤트 루프가 바뀌면(테스트/스크립트의 asyncio.run 반복) 상태를 버린다
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._cond = asyncio.Condition()
+            self._idle.clear()
+            self._created = 0
+
+    async def acquire(self) -> _Slot:
+        self._bind_loop()
+        async with self._cond:
+            while not self._idle and self._created >= self.size:
+                await self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            if self._client is None:
+                self._client = MultiServerMCPClient(await _load_servers_cfg())
+            return await _Slot(self._client).open()
+        except BaseException:
+            async with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    async def release(self, slot: _Slot, broken: bool = False) -> None:
+        if broken:
+            await slot.close()
+        async with self._cond:
+            if broken:
+                self._created -= 1
+            else:
+                self._idle.append(slot)
+            self._cond.notify()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        self._created -= len(idle)
+        await asyncio.gather(*(s.close() for s in idle), return_exceptions=True)
+
+
+mcp_pool = MCPSessionPool(settings.mcp_pool_size)
+
+
+class _LeasedClient:
+    """
+    open_mcp_client() 가 돌려주는 클라이언트.
+    call_tool() 이 쓰는 get_tools() 만 제공하며, 캐시 히트만으로 끝나는 요청은
+    세션을 아예 빌리지 않도록 첫 get_tools() 시점에 풀에서 세션을 가져온다.
+    """
+
+    def __init__(self, pool: MCPSessionPool):
+        self._pool = pool
+        self._slot: _Slot | None = None
+        self._lock = asyncio.Lock()
+        self.broken = False
+
+    def mark_broken(self) -> None:
+        """호출이 응답 전에 끊김(마감 초과/취소) → 세션에 버려진 요청이 남아 있으므로 풀에 돌려주지 않음"""
+        if self._slot is not None:
+            self.broken = True
+
+    async def get_tools(self) -> list:
+        async with self._lock:
+            if self._slot is None:
+                self._slot = await self._pool.acquire()
+        return self._slot.tools
+
+    async def release(self, broken: bool) -> None:
+        if self._slot is not None:
+            await self._pool.release(self._slot, broken=broken)
+            self._slot = None
+
+
+@asynccontextmanager
+async def open_mcp_client():
+    """풀에서 MCP 세션을 빌려오는 클라이언트 반환 (mcp_pool_size=0 이면 매번 새 MultiServerMCPClient)"""
+    if mcp_pool.size <= 0:
+        client = MultiServerMCPClient(await _load_servers_cfg())
+        await client.get_tools()  # 연결 확인
+        try:
+            yield client
+        finally:
+            if hasattr(client, "close"):
+                await client.close()
+        return
+
+    lease = _LeasedClient(mcp_pool)
+    broken = False
+    try:
+        yield lease
+    except BaseException:
+        # CancelledError 포함: 진행 중이던 툴 호출이 세션에 남아 있을 수 있음
+        broken = True
+        raise
+    finally:
+        await lease.release(broken or lease.broken)
+
+async def _invoke_tool(client, name: str, args: dict):
     tools = await client.get_tools()
     # 이름이 정확히 일치하는 툴 찾기
     for t in tools:
@@ -41,6 +219,55 @@ async def call_tool(client: MultiServerMCPClient, name: str, args: dict):
             return await t.ainvoke(args)
     raise RuntimeError(f"Tool not found: {name}, available={[t.name for t in tools]}")
 
+def _abandon(client) -> None:
+    # 응답을 기다리지 않고 끊은 호출 → 빌린 세션은 반납 시 닫음 (다음 사용자가 남은 응답을 받지 않도록)
+    mark_broken = getattr(client, "mark_broken", None)
+    if mark_broken is not None:
+        mark_broken()
+
+
+async def call_tool(client, name: str, args: dict):
+    """
+    MCP 툴 호출 공통 함수.
+    name: 'yahoo:get_stock_info' 같은 풀네임 또는 'price' 같은 단일 툴 이름
+    결과는 (툴 이름, 인자) 키로 캐시되며 워커 간 공유 캐시가 있으면 함께 사용된다 ("Error: ..." 응답은 캐시하지 않음).
+    캐시 전용 정책(cache_policy.cache_only)에서 캐시에 없으면 MCP 를 호출하지 않고 None 을 반환한다.
+    요청 마감(request_deadline)이 지났으면 호출하지 않고, 남은 시간 안에 끝나지 않으면 기다리지 않고 None.
+    요청이 취소되면 진행 중인 호출을 기다리지 않고 CancelledError 를 그대로 올린다.
+    """
+    key = f"mcp:{name}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
+
+    async def load():
+        left = time_left()
+        if left is not None and left <= 0:
+            metrics.incr("cancel.mcp_skipped")
+            LOGGER.info("[mcp] deadline passed, skipping %s %s", name, args)
+            return None
+        pending = result_cache.get_or_load(
+            key,
+            lambda: _invoke_tool(client, name, args),
+            ttl=TOOL_TTL_S.get(name),
+            cacheable=lambda v: not _is_error_result(v),
+        )
+        try:
+            # 마감으로 잘려도 같은 키를 기다리던 다른 요청은 직접 다시 로드함 (ResultCache.get_or_load)
+            return await (pending if left is None else asyncio.wait_for(pending, left))
+        except CacheMissError:
+            LOGGER.info("[mcp] cache-only miss: %s %s", name, args)
+            return None
+        except asyncio.TimeoutError:
+            metrics.incr("cancel.mcp_calls")
+            LOGGER.warning("[mcp] deadline exceeded (%.3fs): %s %s", left, name, args)
+            _abandon(client)
+            return None
+        except asyncio.CancelledError:
+            metrics.incr("cancel.mcp_calls")
+            _abandon(client)
+            raise
+
+    # 녹화/재생 모드면 cassette 가 가로챔 (재생 시 MCP 세션을 열지 않음)
+    return await cassette.tool(name, args, load)
+
 
 # ----------------------------
 # Stock Information
@@ -66,17 +293,19 @@ async def get_stock_actions(client, ticker: str):
 # ----------------------------
 # Financial Statements
 # ----------------------------
-async def get_financial_statement(client, ticker: str, statement_type="income", period="annual"):
+async def get_financial_statement(client, ticker: str, financial_type="income_stmt"):
     return await call_tool(client, "get_financial_statement", {
         "ticker": ticker,
-        "statement_type": statement_type,  # "income" | "balance" | "cashflow"
-        "period": period                   # "annual" | "quarterly"
+        # "income_stmt" | "quarterly_income_stmt" | "balance_sheet" | "quarterly_balance_sheet"
+        # | "cashflow" | "quarterly_cashflow"
+        "financial_type": financial_type,
     })
 
-async def get_holder_info(client, ticker: str, holder_type="major"):
+async def get_holder_info(client, ticker: str, holder_type="major_holders"):
     return await call_tool(client, "get_holder_info", {
         "ticker": ticker,
-        "holder_type": holder_type  # "major" | "institutional" | "mutual" | "insider"
+        # "major_holders" | "institutional_holders" | "mutualfund_holders" | "insider_transactions" ...
+        "holder_type": holder_type,
     })
 
 # ----------------------------
@@ -85,15 +314,19 @@ async def get_holder_info(client, ticker: str, holder_type="major"):
 async def get_option_expiration_dates(client, ticker: str):
     return await call_tool(client, "get_option_expiration_dates", {"ticker": ticker})
 
-async def get_option_chain(client, ticker: str, expiration: str, option_type="calls"):
+async def get_option_chain(client, ticker: str, expiration_date: str, option_type="calls"):
     return await call_tool(client, "get_option_chain", {
         "ticker": ticker,
-        "expiration": expiration,  # "2025-01-17" 같은 만기일
-        "option_type": option_type # "calls" | "puts"
+        "expiration_date": expiration_date,  # "2025-01-17" 같은 만기일
+        "option_type": option_type           # "calls" | "puts"
     })
 
 # ----------------------------
 # Analyst Information
 # ----------------------------
-async def get_recommendations(client, ticker: str):
-    return await call_tool(client, "get_recommendations", {"ticker": ticker})
+async def get_recommendations(client, ticker: str, recommendation_type="recommendations", months_back: int = 12):
+    return await call_tool(client, "get_recommendations", {
+        "ticker": ticker,
+        "recommendation_type": recommendation_type,  # "recommendations" | "upgrades_downgrades"
+        "months_back": months_back,
+    })
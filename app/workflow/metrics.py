@@ -0,0 +1,89 @@
+# app/workflow/metrics.py
+"""
+프로세스 로컬 메트릭 (GET /metrics 로 노출)
+
+- counter: 누적 횟수/합계 (incr)
+- summary: 관측값 count/sum/min/max (observe) + 최근 window 개 표본의 p50/p95/p99
+멀티 워커(app.serve)에서는 워커별 값입니다.
+"""
+from __future__ import annotations
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+
+class Metrics:
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+        self._window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            s = self._summaries.get(name)
+            if s is None:
+                self._summaries[name] = {"count": 1, "sum": value, "min": value, "max": value}
+                self._samples[name] = deque([value], maxlen=self._window)
+            else:
+                s["count"] += 1
+                s["sum"] += value
+                s["min"] = min(s["min"], value)
+                s["max"] = max(s["max"], value)
+                self._samples[name].append(value)
+
+    def quantiles(self, name: str, qs=(0.5, 0.95, 0.99)) -> Optional[Dict[str, float]]:
+        """최근 표본 기준 분위수 ({"p50": …, "p95": …}), 표본이 없으면 None"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if not samples:
+                return None
+            values = np.percentile(np.fromiter(samples, dtype=np.float64), [q * 100 for q in qs])
+        return {f"p{round(q * 100)}": round(float(v), 4) for q, v in zip(qs, values)}
+
+    def get(self, name: str, default: float = 0) -> float:
+        return self._counters.get(name, default)
+
+    def ratio(self, num: str, den: str) -> Optional[float]:
+        d = self._counters.get(den, 0)
+        return round(self._counters.get(num, 0) / d, 4) if d else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            names = list(self._summaries)
+            summaries = {
+                k: {**v, "avg": round(v["sum"] / v["count"], 3)} for k, v in self._summaries.items()
+            }
+            counters = dict(self._counters)
+        for k in names:
+            summaries[k].update(self.quantiles(k) or {})
+        return {"counters": counters, "summaries": summaries}
+
+
+metrics = Metrics()
+
+# 현재 요청의 LLM 토큰 사용량 누적 ({"tokens": n}). 테넌트 쿼터 차감용으로 app.tenants.scheduled 가 설정
+llm_usage_meter: ContextVar[Optional[Dict[str, float]]] = ContextVar("llm_usage_meter", default=None)
+
+
+def record_llm_usage(resp: Any, prefix: str = "llm") -> None:
+    """LangChain AIMessage.usage_metadata → 입력/캐시/출력 토큰 누적"""
+    usage = getattr(resp, "usage_metadata", None) or {}
+    if not usage:
+        return
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    metrics.incr(f"{prefix}.calls")
+    metrics.incr(f"{prefix}.input_tokens", usage.get("input_tokens") or 0)
+    metrics.incr(f"{prefix}.cached_tokens", cached)
+    metrics.incr(f"{prefix}.output_tokens", usage.get("output_tokens") or 0)
+    meter = llm_usage_meter.get()
+    if meter is not None:
+        meter["tokens"] += (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
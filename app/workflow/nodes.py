@@ -9,14 +9,27 @@ from app.workflow.mcp_clients import (
     get_stock_info,
     get_yahoo_finance_news,
     # 선택: 필요 시 불러와 사용
-    # get_historical_stock_prices,
     # get_recommendations,
 )
-from app.workflow.llm import llm_openapi
-from app.workflow.prompts import render_prompt
+from app.workflow.llm import get_router
+from app.workflow.llm_router import LLMUnavailableError
+from app.workflow.prompts import build_prompt
 from app.workflow.trace import traced
+from app.workflow.indicators import indicators_for
+from app.workflow.price_store import load_history
+from app.workflow.prescore import prescore, fingerprint, llm_gate, rule_rationale
+from app.workflow.articles import article_store
+from app.workflow.metrics import metrics, record_llm_usage
+from app.workflow.output import parse_score, RETRY_INSTRUCTION
+from app.workflow.enrichment import ENRICHERS
+from app.workflow.profiles import PROFILES
+import asyncio
 import json
+import logging
 import re
+import time
+
+LOGGER = logging.getLogger("ticker-graph")
 
 # ── 병렬 MCP 노드: yahoo ─────────────────────────────────────────────────────
 # -------------------------
@@ -96,7 +109,11 @@ async def node_ingest(state: ScoreState) -> ScoreState:
             "price": None,
             "news": None,
             "filings": None,
+            "indicators": None,
+            "enrichment": None,
             "score": None,
+            "score_source": None,
+            "prescore": None,
             "rationale": None,
             "logs": [*(state.get("logs") or []), f"ingest:set:{new_ticker}"],
         }
@@ -104,6 +121,9 @@ async def node_ingest(state: ScoreState) -> ScoreState:
     # 동일하면 그대로
     return {**state, "ticker": new_ticker, "logs": [*(state.get("logs") or []), f"ingest:keep:{new_ticker}"]}
 
+# 중복 제거 후에도 NEWS_LIMIT 개를 채울 수 있도록 조금 넉넉히 파싱
+NEWS_FETCH, NEWS_LIMIT = 10, 5
+
 @traced("yahoo")
 async def node_yahoo(state: "ScoreState") -> dict:
     async with open_mcp_client() as client:
@@ -157,6 +177,7 @@ async def node_yahoo(state: "ScoreState") -> dict:
             "last": last,
             "chg": chg,
             "pct": pct,
+            "sector": raw_info.get("sector"),  # 순위 테이블(/rank) 섹터 필터용
             # 필요하면 추가 필드도 싣기:
             # "open": raw_info.get("open"),
             # "day_high": raw_info.get("dayHigh"),
@@ -167,7 +188,7 @@ async def node_yahoo(state: "ScoreState") -> dict:
     # --- 뉴스 정규화 (list | dict(items) | str) ---
     norm_news: List[Dict[str, Any]] = []
     if isinstance(news, list):
-        for n in news[:5]:
+        for n in news[:NEWS_FETCH]:
             norm_news.append({
                 "title": n.get("title"),
                 "summary": n.get("summary") or n.get("description"),
@@ -175,7 +196,7 @@ async def node_yahoo(state: "ScoreState") -> dict:
                 "url": n.get("link") or n.get("url"),
             })
     elif isinstance(news, dict) and "items" in news:
-        for n in news["items"][:5]:
+        for n in news["items"][:NEWS_FETCH]:
             norm_news.append({
                 "title": n.get("title"),
                 "summary": n.get("summary") or n.get("description"),
@@ -183,7 +204,10 @@ async def node_yahoo(state: "ScoreState") -> dict:
                 "url": n.get("link") or n.get("url"),
             })
     elif isinstance(news, str):
-        norm_news = _parse_news_blocks(news, limit=5)
+        norm_news = _parse_news_blocks(news, limit=NEWS_FETCH)
+
+    # 공유 기사 저장소: 다른 티커에서 이미 본 기사/유사 제목은 합치고, 새 기사만 감성 채점
+    norm_news = article_store.ingest(state["ticker"], norm_news, limit=NEWS_LIMIT)
 
     return {
         "price": price,
@@ -191,6 +215,27 @@ async def node_yahoo(state: "ScoreState") -> dict:
         "logs": ["yahoo:ok"],
     }
 
+# 기술 지표 계산용 히스토리 기간 (SMA50 + 크로스 판정에 충분한 길이)
+# 최초 1회만 이 기간을 조회하고 이후에는 가격 저장소에 누락된 봉만 추가로 가져온다
+HISTORY_PERIOD = "6mo"
+HISTORY_BARS = 126
+
+@traced("history")
+async def node_history(state: ScoreState) -> dict:
+    async with open_mcp_client() as client:
+        hist = await load_history(client, state["ticker"], period=HISTORY_PERIOD, bars=HISTORY_BARS)
+
+    if not len(hist["close"]):
+        return {"indicators": None, "logs": ["history:empty"]}
+
+    indicators = indicators_for({state["ticker"]: hist})[state["ticker"]]
+    indicators["bars"] = int(len(hist["close"]))
+    indicators["last_date"] = str(hist["date"][-1])
+    return {
+        "indicators": indicators,
+        "logs": ["history:ok"],
+    }
+
 @traced("dart")
 async def node_dart(state: ScoreState) -> dict:
     # DART 노드 구현 (예: 공시 데이터 수집)
@@ -204,32 +249,144 @@ async def node_dart(state: ScoreState) -> dict:
         "logs": ["dart:ok"],
     }
 
+# ── 선택형 보강 노드 (재무/주주/추천/배당·분할/옵션) ───────────────────────────
+# 데이터셋마다 노드 1개. 그래프가 state["enrich"] 에 든 노드만 실행하므로 여기서는 선택 여부를 보지 않음
+def make_enrich_node(name: str):
+    enricher = ENRICHERS[name]
+
+    @traced(name)
+    async def node(state: ScoreState) -> dict:
+        async with open_mcp_client() as client:
+            data = await enricher.fetch(client, state["ticker"])
+        return {
+            "enrichment": {name: data},
+            "logs": [f"{name}:{'ok' if data else 'empty'}"],
+        }
+
+    node.__name__ = f"node_{name}"
+    return node
+
 # ── Score 노드(Clova X 호출) ─────────────────────────────────────────────────
+# 마감 전에 응답을 정리할 여유(초). 남은 시간이 LLM_MIN_TIME_S 보다 적으면 LLM 을 부르지 않음
+LLM_DEADLINE_MARGIN_S = 0.02
+LLM_MIN_TIME_S = 0.05
+
+def _llm_time_left(state: ScoreState):
+    """요청 마감(state["deadline"], epoch 초)까지 LLM 에 쓸 수 있는 시간. 마감이 없으면 None"""
+    deadline = state.get("deadline")
+    return None if deadline is None else deadline - time.time() - LLM_DEADLINE_MARGIN_S
+
+async def _ainvoke_llm(router, messages, time_left, prompt_tokens: int):
+    try:
+        return await router.ainvoke(messages, timeout_s=time_left)
+    except asyncio.CancelledError:
+        # 요청이 취소됨(클라이언트 끊김/tasks/cancel/마감) → 진행 중인 LLM 요청(헤지 포함)도 라우터가 취소
+        metrics.incr("cancel.llm_calls")
+        metrics.incr("cancel.llm_prompt_tokens", prompt_tokens)
+        raise
+
 @traced("score")
 async def node_score(state: ScoreState) -> dict:
-    prompt = render_prompt(
+    # 핵심 데이터(가격)가 없으면 점수를 만들지 않음 (fast 프로필 캐시 미스, MCP 실패 등)
+    if (state.get("price") or {}).get("last") is None:
+        LOGGER.warning("[score] %s no price data, not scoring", state["ticker"])
+        metrics.incr("llm.output.no_data")
+        return {
+            **state,
+            "messages": state.get("messages", []) + [AIMessage(content=f"[{state['ticker']}] 점수: 데이터 없음")],
+            "score": None,
+            "rationale": "가격 데이터가 없어 점수를 계산하지 않았습니다 (캐시 미스 또는 데이터 소스 오류)",
+            "score_source": "no_data",
+            "output_status": "no_data",
+            "logs": ["score:no_data"]}
+
+    # 규칙 기반 사전 점수 → 게이트가 LLM 호출 여부 결정
+    pre = prescore(state.get("price"), state.get("indicators"), state.get("news"))
+    fp = fingerprint(state.get("price"), state.get("indicators"), state.get("news"), state.get("filings"),
+                     state.get("enrichment"))
+    path, last = llm_gate.decide(state["ticker"], pre, fp)
+    if path != "llm":
+        if path == "reuse":
+            score, rationale = last.score, last.rationale
+        else:
+            score, rationale = pre.score, rule_rationale(pre)
+        reply = f"[{state['ticker']}] 점수: {score}\n사유: {rationale}"
+        return {
+            **state,
+            "messages": state.get("messages", []) + [AIMessage(content=reply)],
+            "score": score,
+            "rationale": rationale,
+            "score_source": path,
+            "prescore": pre.to_dict(),
+            "logs": [f"score:{path}"]}
+
+    built = build_prompt(
         ticker=state["ticker"],
         price=state.get("price"),
         news=state.get("news"),
         filings=state.get("filings"),
+        indicators=state.get("indicators"),
+        enrichment=state.get("enrichment"),
     )
 
-    # LangChain ChatClovaX 호출
-    # resp = await llm_naver.ainvoke(prompt)
-    resp = await llm_openapi.ainvoke(prompt)
-    # resp.content(혹은 resp.response) 구조는 사용하는 어댑터에 맞게 확인
-    text = getattr(resp, "content", None) or str(resp)
+    def rule_fallback(status: str) -> dict:
+        # LLM 을 쓸 수 없음 → 규칙 점수로 응답 (표시 포함)
+        metrics.incr(f"llm.output.{status}")
+        return {
+            **state,
+            "messages": state.get("messages", []) + [AIMessage(content=f"[{state['ticker']}] 점수: {pre.score}")],
+            "score": pre.score,
+            "rationale": rule_rationale(pre),
+            "score_source": "fallback",
+            "output_status": status,
+            "prescore": pre.to_dict(),
+            "prompt_tokens": built.tokens,
+            "logs": [f"score:{status}"]}
+
+    # 프로필이 모델 등급(기본/소형)과 마감 시간을 정함
+    profile = PROFILES.get(state.get("profile") or "")
+    router = get_router(profile.llm_tier if profile else "default")
+    time_left = _llm_time_left(state)
+    if time_left is not None and time_left < LLM_MIN_TIME_S:
+        LOGGER.warning("[score] %s no time left for LLM (%.3fs)", state["ticker"], time_left)
+        return rule_fallback("deadline")
 
-    # 모델에게 JSON을 요청했으므로 파싱 시도
-    score, rationale = None, None
+    # 라우터가 OpenAI / ClovaX 중 지연·오류율·비용 기준으로 선택 (실패 시 페일오버)
+    # system(고정 접두부) + user(티커 데이터) 메시지로 호출 → 공급자 프롬프트 캐시 적중
     try:
-        data = json.loads(text)
-        score = int(data.get("score"))
-        rationale = data.get("rationale")
-    except Exception:
-        # 파싱 실패 시 보수적 폴백
-        rationale = text[:200]
-        score = 50
+        resp = await _ainvoke_llm(router, built.messages, time_left, built.tokens)
+    except LLMUnavailableError as e:
+        LOGGER.error("[score] %s all LLM backends failed: %s", state["ticker"], e)
+        return rule_fallback("unavailable")
+    record_llm_usage(resp)
+    # resp.content(혹은 resp.response) 구조는 사용하는 어댑터에 맞게 확인
+    text = _to_text(getattr(resp, "content", None)) or str(resp)
+
+    # 스키마 검증 → 로컬 복구 → (그래도 실패 시) 1회 재질문 → 규칙 점수 폴백
+    data, status = parse_score(text)
+    if data is None:
+        time_left = _llm_time_left(state)
+        if time_left is None or time_left >= LLM_MIN_TIME_S:
+            try:
+                retry = await _ainvoke_llm(
+                    router, [*built.messages, AIMessage(content=text), HumanMessage(content=RETRY_INSTRUCTION)],
+                    time_left, built.tokens)
+                record_llm_usage(retry)
+                data, _ = parse_score(_to_text(getattr(retry, "content", None)) or str(retry))
+            except LLMUnavailableError as e:
+                # 재질문 중 백엔드가 모두 실패 → 첫 호출 실패와 같이 unavailable 로 표시
+                LOGGER.error("[score] %s all LLM backends failed on retry: %s", state["ticker"], e)
+                return rule_fallback("unavailable")
+        status = "retried" if data is not None else "fallback"
+    metrics.incr(f"llm.output.{status}")
+
+    if data is not None:
+        score, rationale, source = data["score"], data["rationale"], "llm"
+        llm_gate.record(state["ticker"], fp, score, rationale)
+    else:
+        # 보이지 않게 50점을 넣지 않고 규칙 점수로 대체 + 응답에 표시
+        LOGGER.warning("[score] %s invalid LLM output, using rule score: %s", state["ticker"], text[:200])
+        score, rationale, source = pre.score, rule_rationale(pre), "fallback"
 
     reply = f"[{state['ticker']}] 점수: {score}\n사유: {rationale}"
     messages = state.get("messages", []) + [AIMessage(content=reply)]
@@ -239,7 +396,11 @@ async def node_score(state: ScoreState) -> dict:
         "messages": messages,
         "score": score,
         "rationale": rationale,
-        "logs": ["score:ok"]}
+        "score_source": source,
+        "output_status": status,
+        "prescore": pre.to_dict(),
+        "prompt_tokens": built.tokens,
+        "logs": [f"score:{status}"]}
 
 # ── Finalize ─────────────────────────────────────────────────────────────────
 @traced("finalize")
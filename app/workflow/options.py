@@ -0,0 +1,287 @@
+# app/workflow/options.py
+"""
+옵션 체인 분석 (NumPy 벡터화 Black-Scholes)
+
+- 가까운 만기 N개의 콜/풋 체인을 동시에 조회 (세션 풀 + 툴 캐시)
+- 만기마다 체인 전체를 배열로 바꿔 한 번에 계산: 내재변동성(뉴턴법, 벡터화), 델타/감마/베가
+- 만기별 결과: ATM IV, 25델타 리스크 리버설(스큐), 풋/콜 미결제약정·거래량, 감마 익스포저
+- 만기별 분석 결과는 (티커, 만기) 키로 다음 미국 장 마감까지 캐시
+
+summarize_options() 결과는 enrichment "options" 데이터셋으로 프롬프트에 들어갑니다.
+"""
+from __future__ import annotations
+import asyncio
+import datetime as dt
+import json
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app.settings import settings
+from app.workflow.cache import result_cache
+from app.workflow.mcp_clients import get_option_chain, get_option_expiration_dates, get_stock_info
+
+LOGGER = logging.getLogger("ticker-graph")
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_CLOSE = dt.time(16, 0)
+_YEAR_S = 365.0 * 24 * 3600
+_MIN_T = 1.0 / (365.0 * 24)          # 만기 직전 계약의 T 하한 (1시간)
+_SIGMA_LO, _SIGMA_HI = 1e-3, 5.0
+
+
+# ── 장 마감 / 만기까지 시간 ──────────────────────────────────────────────────
+def next_market_close(now: Optional[dt.datetime] = None) -> dt.datetime:
+    """다음 미국 정규장 마감 시각 (주말 건너뜀, 공휴일은 고려하지 않음)"""
+    now = (now or dt.datetime.now(dt.timezone.utc)).astimezone(MARKET_TZ)
+    close = dt.datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TZ)
+    if now >= close:
+        close += dt.timedelta(days=1)
+    while close.weekday() >= 5:
+        close += dt.timedelta(days=1)
+    return close
+
+
+def seconds_until_close(now: Optional[dt.datetime] = None) -> float:
+    now = now or dt.datetime.now(dt.timezone.utc)
+    return max(60.0, (next_market_close(now) - now).total_seconds())
+
+
+def years_to_expiry(expiry: str, now: Optional[dt.datetime] = None) -> float:
+    """만기일 장 마감까지 남은 시간(년)"""
+    now = now or dt.datetime.now(dt.timezone.utc)
+    close = dt.datetime.combine(dt.date.fromisoformat(expiry[:10]), MARKET_CLOSE, tzinfo=MARKET_TZ)
+    return max(_MIN_T, (close - now).total_seconds() / _YEAR_S)
+
+
+# ── Black-Scholes (배열 단위) ────────────────────────────────────────────────
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """표준정규 CDF — erf 근사(Abramowitz & Stegun 7.1.26, 오차 1.5e-7)를 ufunc 연산만으로 계산"""
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def _norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+
+def _d1_d2(S, K, T, r, sigma) -> Tuple[np.ndarray, np.ndarray]:
+    vol_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(S, K, T, r, sigma, is_call) -> np.ndarray:
+    """유럽형 옵션 이론가. 모든 인자는 브로드캐스트 가능한 배열/스칼라"""
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    disc = np.exp(-r * T)
+    call = S * _norm_cdf(d1) - K * disc * _norm_cdf(d2)
+    put = K * disc * _norm_cdf(-d2) - S * _norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_greeks(S, K, T, r, sigma, is_call) -> Dict[str, np.ndarray]:
+    """delta, gamma, vega(변동성 1.00 당)"""
+    d1, _ = _d1_d2(S, K, T, r, sigma)
+    pdf = _norm_pdf(d1)
+    cdf = _norm_cdf(d1)
+    return {
+        "delta": np.where(is_call, cdf, cdf - 1.0),
+        "gamma": pdf / (S * sigma * np.sqrt(T)),
+        "vega": S * pdf * np.sqrt(T),
+    }
+
+
+def implied_vol(price, S, K, T, r, is_call, guess=None, iters: int = 30, tol: float = 1e-6) -> np.ndarray:
+    """
+    체인 전체의 내재변동성을 한 번에 계산 (벡터화 뉴턴법, 베가가 작으면 이분법 단계로 대체).
+    시간가치가 없거나(내재가치 이하) 수렴하지 않은 계약은 NaN
+    """
+    price, K, is_call = np.broadcast_arrays(np.asarray(price, dtype=np.float64),
+                                            np.asarray(K, dtype=np.float64), np.asarray(is_call))
+    disc = math.exp(-r * T)
+    intrinsic = np.where(is_call, np.maximum(S - K * disc, 0.0), np.maximum(K * disc - S, 0.0))
+    upper = np.where(is_call, S, K * disc)
+    valid = np.isfinite(price) & (price > intrinsic + 1e-8) & (price < upper)
+
+    sigma = np.full(price.shape, 0.3) if guess is None else np.where(
+        np.isfinite(guess) & (guess > _SIGMA_LO), guess, 0.3)
+    sigma = np.clip(sigma, _SIGMA_LO, _SIGMA_HI)
+    lo = np.full(price.shape, _SIGMA_LO)
+    hi = np.full(price.shape, _SIGMA_HI)
+    done = ~valid
+    for _ in range(iters):
+        diff = bs_price(S, K, T, r, sigma, is_call) - price
+        converged = np.abs(diff) < tol
+        done |= converged
+        if done.all():
+            break
+        # 괄호 구간 갱신 (가격은 sigma 에 단조 증가)
+        hi = np.where(diff > 0, sigma, hi)
+        lo = np.where(diff < 0, sigma, lo)
+        vega = bs_greeks(S, K, T, r, sigma, is_call)["vega"]
+        newton = sigma - diff / np.where(vega > 1e-8, vega, np.nan)
+        bisect = 0.5 * (lo + hi)
+        step = np.where(np.isfinite(newton) & (newton > lo) & (newton < hi), newton, bisect)
+        sigma = np.where(done, sigma, step)
+    final = np.abs(bs_price(S, K, T, r, sigma, is_call) - price) < max(tol * 100, 1e-4)
+    return np.where(valid & final, sigma, np.nan)
+
+
+# ── 체인 → 배열 ─────────────────────────────────────────────────────────────
+def _rows(raw: Any) -> List[dict]:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return []
+    if isinstance(raw, dict):
+        raw = raw.get("data") or raw.get("items") or []
+    return [r for r in raw if isinstance(r, dict)] if isinstance(raw, list) else []
+
+
+def chain_arrays(calls: Any, puts: Any) -> Dict[str, np.ndarray]:
+    """콜/풋 체인(JSON rows) → 열 배열 (strike, price, volume, oi, vendor_iv, is_call)"""
+    rows = [(r, True) for r in _rows(calls)] + [(r, False) for r in _rows(puts)]
+
+    def col(key: str) -> np.ndarray:
+        return np.array([r.get(key) if r.get(key) is not None else np.nan for r, _ in rows], dtype=np.float64)
+
+    bid, ask, last = col("bid"), col("ask"), col("lastPrice")
+    # 호가가 모두 있으면 중간값, 아니면 마지막 체결가
+    price = np.where((bid > 0) & (ask >= bid), 0.5 * (bid + ask), last)
+    return {
+        "strike": col("strike"),
+        "price": price,
+        "volume": np.nan_to_num(col("volume")),
+        "oi": np.nan_to_num(col("openInterest")),
+        "vendor_iv": col("impliedVolatility"),
+        "is_call": np.array([c for _, c in rows], dtype=bool),
+    }
+
+
+def _interp(x: np.ndarray, y: np.ndarray, at: float) -> Optional[float]:
+    ok = np.isfinite(x) & np.isfinite(y)
+    if ok.sum() < 2:
+        return None
+    order = np.argsort(x[ok])
+    xs, ys = x[ok][order], y[ok][order]
+    if not xs[0] <= at <= xs[-1]:
+        return None
+    return float(np.interp(at, xs, ys))
+
+
+def _ratio(a: float, b: float) -> Optional[float]:
+    return round(a / b, 4) if b else None
+
+
+def _r(x: Optional[float], nd: int = 4) -> Optional[float]:
+    return None if x is None or not math.isfinite(x) else round(float(x), nd)
+
+
+def analyze_expiry(spot: float, T: float, chain: Dict[str, np.ndarray], r: float) -> Dict[str, Any]:
+    """만기 1개 분석 (체인 전체 벡터 연산)"""
+    K, is_call = chain["strike"], chain["is_call"]
+    iv = implied_vol(chain["price"], spot, K, T, r, is_call, guess=chain["vendor_iv"])
+    iv = np.where(np.isfinite(iv), iv, chain["vendor_iv"])  # 풀 수 없으면 공급자 IV
+    g = bs_greeks(spot, K, T, r, np.where(np.isfinite(iv), iv, np.nan), is_call)
+
+    fwd = spot * math.exp(r * T)
+    logm = np.log(K / fwd)
+    atm = [_interp(logm[m], iv[m], 0.0) for m in (is_call, ~is_call)]
+    atm = [a for a in atm if a is not None]
+    # 25델타 리스크 리버설: 풋(-0.25) IV − 콜(+0.25) IV (양수면 하방 보호 수요 우세)
+    put_25 = _interp(g["delta"][~is_call], iv[~is_call], -0.25)
+    call_25 = _interp(g["delta"][is_call], iv[is_call], 0.25)
+    # 감마 익스포저: 주가 1% 변동 시 딜러 헤지 규모(달러), 콜 +/풋 − 관행
+    gex = np.nansum(np.where(is_call, 1.0, -1.0) * g["gamma"] * chain["oi"] * 100 * spot * spot * 0.01)
+    return {
+        "days": round(T * 365, 1),
+        "atm_iv": _r(float(np.mean(atm)) if atm else None),
+        "skew_25d": _r(put_25 - call_25 if put_25 is not None and call_25 is not None else None),
+        "call_oi": float(chain["oi"][is_call].sum()), "put_oi": float(chain["oi"][~is_call].sum()),
+        "call_volume": float(chain["volume"][is_call].sum()), "put_volume": float(chain["volume"][~is_call].sum()),
+        "gex_1pct": _r(float(gex), 0),
+        "contracts": int(len(K)),
+        "iv_solved": int(np.isfinite(iv).sum()),
+    }
+
+
+# ── 수집 + 캐시 ─────────────────────────────────────────────────────────────
+def _spot(info: Any) -> Optional[float]:
+    if isinstance(info, str):
+        try:
+            info = json.loads(info)
+        except ValueError:
+            return None
+    if not isinstance(info, dict):
+        return None
+    for k in ("currentPrice", "regularMarketPrice", "previousClose"):
+        try:
+            if info.get(k):
+                return float(info[k])
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+async def _expiry(client, ticker: str, expiry: str, spot: float) -> Optional[Dict[str, Any]]:
+    """(티커, 만기) 분석 결과 — 다음 장 마감까지 캐시"""
+    async def load():
+        calls, puts = await asyncio.gather(
+            get_option_chain(client, ticker, expiry, "calls"),
+            get_option_chain(client, ticker, expiry, "puts"),
+        )
+        chain = chain_arrays(calls, puts)
+        if not len(chain["strike"]):
+            return None
+        return analyze_expiry(spot, years_to_expiry(expiry), chain, settings.options_risk_free_rate)
+
+    return await result_cache.get_or_load(f"options:{ticker}:{expiry}", load, ttl=seconds_until_close())
+
+
+async def fetch_options(client, ticker: str) -> Optional[Dict[str, Any]]:
+    """가까운 만기 OPTIONS_EXPIRATIONS 개를 동시에 분석해 요약 (enrichment "options")"""
+    expirations, info = await asyncio.gather(
+        get_option_expiration_dates(client, ticker), get_stock_info(client, ticker))
+    if isinstance(expirations, str):
+        try:
+            expirations = json.loads(expirations)
+        except ValueError:
+            expirations = None
+    spot = _spot(info)
+    if not isinstance(expirations, list) or not expirations or not spot:
+        return None
+    chosen = sorted(str(e)[:10] for e in expirations)[:settings.options_expirations]
+    results = await asyncio.gather(*(_expiry(client, ticker, e, spot) for e in chosen))
+    return summarize_options([(e, res) for e, res in zip(chosen, results) if res])
+
+
+def summarize_options(per_expiry: List[Tuple[str, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """만기별 결과 → 프롬프트용 요약 (기간 구조, 스큐, 풋/콜 비율, 감마 익스포저)"""
+    if not per_expiry:
+        return None
+    term = [(res["days"], res["atm_iv"]) for _, res in per_expiry if res.get("atm_iv") is not None]
+    near = per_expiry[0][1]
+
+    def total(key: str) -> float:
+        return sum(res[key] for _, res in per_expiry)
+
+    return {
+        "expirations": len(per_expiry),
+        "atm_iv": near.get("atm_iv"),
+        "term_days": [d for d, _ in term],
+        "term_iv": [iv for _, iv in term],
+        # 원월 − 근월 ATM IV (음수면 역전: 단기 이벤트 위험)
+        "term_slope": _r(term[-1][1] - term[0][1]) if len(term) > 1 else None,
+        "skew_25d": near.get("skew_25d"),
+        "put_call_oi": _ratio(total("put_oi"), total("call_oi")),
+        "put_call_volume": _ratio(total("put_volume"), total("call_volume")),
+        "gex_1pct": _r(total("gex_1pct"), 0),
+    }
@@ -0,0 +1,101 @@
+# app/workflow/output.py
+"""
+LLM 점수 출력 스키마 검증 + 로컬 복구
+
+- SCORE_SCHEMA: OpenAI strict json_schema 로 전달 (모델이 스키마에 맞춰 생성)
+- parse_score(): 엄격 파싱 → 실패 시 로컬 복구(코드블록/따옴표/후행 쉼표/키만 추출) → 그래도 실패면 None
+  상태: "ok" | "repaired" | "invalid"
+재질문(retry)과 폴백은 node_score 에서 처리합니다.
+"""
+from __future__ import annotations
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+RATIONALE_MAX = 500
+
+SCORE_SCHEMA: Dict[str, Any] = {
+    "name": "ticker_score",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "score": {"type": "integer", "description": "1~100 투자 점수"},
+            "rationale": {"type": "string", "description": "짧은 한국어 근거 1~3문장"},
+        },
+        "required": ["score", "rationale"],
+        "additionalProperties": False,
+    },
+}
+
+# 복구 실패 시 1회만 보내는 재질문
+RETRY_INSTRUCTION = (
+    "직전 응답이 출력 형식을 따르지 않았습니다. "
+    '설명 없이 {"score": 1~100 정수, "rationale": "짧은 한국어 문장"} 형태의 JSON 객체 하나만 다시 출력하세요.'
+)
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_SCORE_RE = re.compile(r"""["']?score["']?\s*[:=]\s*["']?(\d{1,3}(?:\.\d+)?)""", re.IGNORECASE)
+_RATIONALE_RE = re.compile(
+    r"""["']?rationale["']?\s*[:=]\s*(?:"((?:[^"\\]|\\.)*)"?|'((?:[^'\\]|\\.)*)'?)""", re.IGNORECASE | re.DOTALL)
+
+
+def validate(data: Any) -> Optional[Dict[str, Any]]:
+    """스키마 검증: score 1~100 정수, rationale 비어 있지 않은 문자열"""
+    if not isinstance(data, dict):
+        return None
+    score, rationale = data.get("score"), data.get("rationale")
+    if isinstance(score, bool):
+        return None
+    if isinstance(score, float) and score.is_integer():
+        score = int(score)
+    if isinstance(score, str) and score.strip().isdigit():
+        score = int(score.strip())
+    if not isinstance(score, int) or not 1 <= score <= 100:
+        return None
+    if not isinstance(rationale, str) or not rationale.strip():
+        return None
+    return {"score": score, "rationale": rationale.strip()[:RATIONALE_MAX]}
+
+
+def _repair_json(text: str) -> Optional[Any]:
+    m = _FENCE_RE.search(text)
+    if m:
+        text = m.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0:
+        return None
+    body = text[start:end + 1] if end > start else text[start:] + "}"
+    body = re.sub(r",\s*([}\]])", r"\1", body)                       # 후행 쉼표
+    body = re.sub(r"([{,]\s*)([A-Za-z_]\w*)\s*:", r'\1"\2":', body)  # 따옴표 없는 키
+    for candidate in (body, body.replace("'", '"')):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def _extract_fields(text: str) -> Optional[Dict[str, Any]]:
+    s = _SCORE_RE.search(text)
+    r = _RATIONALE_RE.search(text)
+    if not s or not r:
+        return None
+    rationale = r.group(1) if r.group(1) is not None else r.group(2)
+    return {"score": round(float(s.group(1))), "rationale": rationale.replace('\\"', '"')}
+
+
+def parse_score(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """(검증된 {"score", "rationale"} | None, 상태)"""
+    text = (text or "").strip()
+    try:
+        ok = validate(json.loads(text))
+        if ok:
+            return ok, "ok"
+    except ValueError:
+        pass
+    for fix in (_repair_json, _extract_fields):
+        ok = validate(fix(text))
+        if ok:
+            return ok, "repaired"
+    return None, "invalid"
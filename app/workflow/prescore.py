@@ -0,0 +1,209 @@
+# app/workflow/prescore.py
+"""
+규칙 기반 사전 점수(pre-score) + LLM 호출 게이트
+
+- prescore(): 가격 변화 / 기술 지표 / 뉴스 수·감성만으로 결정적인 1~100 점수와 신뢰도(0~1) 계산
+- LLMGate.decide(): 점수를 어느 경로로 낼지 결정
+    "reuse" : 최근 LLM 점수가 있고 입력이 거의 바뀌지 않음 → 이전 LLM 점수 재사용
+    "rule"  : 사전 점수 신뢰도가 충분히 높음 → LLM 생략
+    "llm"   : 그 외 (신호가 엇갈리거나 데이터가 부족한 경우)
+"""
+from __future__ import annotations
+import hashlib
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.settings import settings
+from app.workflow.cache import TTLCache, _MISS
+
+# 특징별 가중치 (각 특징은 -1~1 로 정규화된 뒤 가중합 → 50 ± 50)
+WEIGHTS = {
+    "day": 0.10,        # 당일 등락률
+    "momentum": 0.30,   # 20d/60d 수익률
+    "trend": 0.20,      # SMA50 위/아래 + 크로스
+    "rsi": 0.10,        # 과매수/과매도 (역방향)
+    "drawdown": 0.10,   # 고점 대비 낙폭
+    "news": 0.20,       # 뉴스 감성 평균
+}
+
+_LABELS = {"positive": 1.0, "bullish": 1.0, "긍정": 1.0,
+           "negative": -1.0, "bearish": -1.0, "부정": -1.0,
+           "neutral": 0.0, "중립": 0.0}
+
+
+def _clip(x: float, lo: float = -1.0, hi: float = 1.0) -> float:
+    return max(lo, min(hi, x))
+
+
+def _num(x: Any) -> Optional[float]:
+    try:
+        x = float(x)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(x) else x
+
+
+def sentiment_value(s: Any) -> Optional[float]:
+    """뉴스 sentiment 필드(숫자 -1~1 또는 라벨) → -1~1"""
+    v = _num(s)
+    if v is not None:
+        return _clip(v)
+    if isinstance(s, str):
+        return _LABELS.get(s.strip().lower())
+    return None
+
+
+def features(price: Optional[dict], indicators: Optional[dict],
+             news: Optional[List[dict]]) -> Dict[str, Optional[float]]:
+    """입력 → 정규화 특징 (-1~1, 데이터 없으면 None)"""
+    ind = indicators or {}
+    f: Dict[str, Optional[float]] = dict.fromkeys(WEIGHTS)
+
+    pct = _num((price or {}).get("pct"))
+    if pct is not None:
+        f["day"] = _clip(pct / 5.0)  # ±5% 에서 포화
+
+    r20, r60 = _num(ind.get("ret_20d")), _num(ind.get("ret_60d"))
+    moms = [_clip(r / scale) for r, scale in ((r20, 0.15), (r60, 0.30)) if r is not None]
+    if moms:
+        f["momentum"] = sum(moms) / len(moms)
+
+    above = _num(ind.get("above_sma_slow"))
+    if above is not None:
+        f["trend"] = _clip((above * 2 - 1) * 0.7 + (ind.get("ma_cross") or 0) * 0.3)
+
+    rsi = _num(ind.get("rsi_14"))
+    if rsi is not None:
+        # 70 이상 과매수(-), 30 이하 과매도(+), 그 사이는 0 근처
+        f["rsi"] = _clip(-(rsi - 50) / 40) if rsi >= 70 or rsi <= 30 else 0.0
+
+    dd = _num(ind.get("drawdown_now"))
+    if dd is not None:
+        f["drawdown"] = _clip(dd / 0.25 + 0.5)  # 고점 근처 +0.5, -37.5% 이하 -1
+
+    senti = [v for v in (sentiment_value(n.get("sentiment")) for n in (news or [])) if v is not None]
+    if senti:
+        f["news"] = sum(senti) / len(senti)
+    return f
+
+
+@dataclass
+class PreScore:
+    score: int
+    confidence: float
+    features: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "score": self.score,
+            "confidence": round(self.confidence, 3),
+            "features": {k: (None if v is None else round(v, 3)) for k, v in self.features.items()},
+        }
+
+
+def prescore(price: Optional[dict], indicators: Optional[dict], news: Optional[List[dict]]) -> PreScore:
+    """
+    결정적 사전 점수.
+    신뢰도 = 데이터 충실도(가중치 기준 커버리지) × 신호 일치도(가중 부호 합 / 가중 절댓값 합)
+    """
+    f = features(price, indicators, news)
+    have = {k: v for k, v in f.items() if v is not None}
+    wsum = sum(WEIGHTS[k] for k in have)
+    if not have or wsum == 0:
+        return PreScore(score=50, confidence=0.0, features=f)
+
+    raw = sum(WEIGHTS[k] * v for k, v in have.items()) / wsum
+    score = int(round(_clip(50 + 50 * raw, 1, 100)))
+
+    mag = sum(WEIGHTS[k] * abs(v) for k, v in have.items())
+    agreement = abs(sum(WEIGHTS[k] * v for k, v in have.items())) / mag if mag else 0.0
+    coverage = wsum / sum(WEIGHTS.values())
+    # 뉴스가 있는데 감성이 비어 있으면 LLM 이 볼 정보가 남아 있으므로 신뢰도를 낮춘다
+    if news and f["news"] is None:
+        coverage *= 0.8
+    return PreScore(score=score, confidence=coverage * agreement, features=f)
+
+
+def fingerprint(price: Optional[dict], indicators: Optional[dict], news: Optional[List[dict]],
+                filings: Optional[List[dict]] = None,
+                enrichment: Optional[dict] = None) -> Tuple[str, Dict[str, Optional[float]]]:
+    """입력 변화 판정용: (뉴스·공시 제목 + 보강 데이터 해시, 수치 특징)"""
+    h = hashlib.sha1()
+    for n in (news or []):
+        h.update(str(n.get("title") or n.get("url") or "").encode("utf-8"))
+    for f in (filings or []):
+        h.update(f"{f.get('type')}|{f.get('date')}".encode("utf-8"))
+    if enrichment:
+        h.update(json.dumps(enrichment, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest(), features(price, indicators, None)
+
+
+@dataclass
+class _LastLLM:
+    digest: str
+    feats: Dict[str, Optional[float]]
+    score: int
+    rationale: Optional[str]
+    at: float
+
+
+class LLMGate:
+    """
+    mode: "auto" | "always"(항상 LLM) | "never"(항상 규칙)
+    confidence: 이 이상이면 규칙 점수 사용
+    max_drift: 직전 LLM 점수 시점 대비 수치 특징 변화 허용치 (최대 절댓값 차)
+    reuse_ttl: 직전 LLM 점수를 재사용할 수 있는 최대 시간(초)
+    """
+
+    def __init__(self, mode: str = "auto", confidence: float = 0.75,
+                 max_drift: float = 0.1, reuse_ttl: float = 6 * 3600, maxsize: int = 4096):
+        self.mode = mode
+        self.confidence = confidence
+        self.max_drift = max_drift
+        self.reuse_ttl = reuse_ttl
+        self._last = TTLCache(maxsize)
+        self.stats = {"llm": 0, "rule": 0, "reuse": 0}
+
+    def _drift(self, a: Dict[str, Optional[float]], b: Dict[str, Optional[float]]) -> float:
+        keys = set(a) | set(b)
+        if any((a.get(k) is None) != (b.get(k) is None) for k in keys):
+            return math.inf
+        return max((abs(a[k] - b[k]) for k in keys if a.get(k) is not None), default=0.0)
+
+    def decide(self, ticker: str, pre: PreScore, fp: Tuple[str, Dict[str, Optional[float]]]
+               ) -> Tuple[str, Optional[_LastLLM]]:
+        """(경로, 재사용할 직전 LLM 결과) 반환"""
+        if self.mode == "always":
+            path, last = "llm", None
+        elif self.mode == "never":
+            path, last = "rule", None
+        else:
+            last = self._last.get(ticker)
+            if last is not _MISS and last.digest == fp[0] and self._drift(last.feats, fp[1]) <= self.max_drift:
+                path = "reuse"
+            else:
+                last = None
+                path = "rule" if pre.confidence >= self.confidence else "llm"
+        self.stats[path] += 1
+        return path, last
+
+    def record(self, ticker: str, fp: Tuple[str, Dict[str, Optional[float]]],
+               score: int, rationale: Optional[str]) -> None:
+        """LLM 으로 점수를 낸 경우 입력 지문과 함께 저장"""
+        self._last.set(ticker, _LastLLM(fp[0], fp[1], score, rationale, time.time()), self.reuse_ttl)
+
+
+def rule_rationale(pre: PreScore) -> str:
+    """규칙 점수용 짧은 근거 문장"""
+    names = {"day": "당일 등락", "momentum": "중기 모멘텀", "trend": "추세(SMA50)",
+             "rsi": "RSI", "drawdown": "고점 대비 위치", "news": "뉴스 감성"}
+    ranked = sorted(((k, v) for k, v in pre.features.items() if v), key=lambda kv: -abs(kv[1]) * WEIGHTS[kv[0]])
+    parts = [f"{names[k]} {'긍정' if v > 0 else '부정'}" for k, v in ranked[:3]]
+    return f"규칙 기반 점수: {', '.join(parts) or '신호 약함'} (신뢰도 {pre.confidence:.2f})"
+
+
+llm_gate = LLMGate(settings.llm_gate_mode, settings.llm_gate_confidence,
+                   settings.llm_gate_max_drift, settings.llm_gate_reuse_s)
@@ -0,0 +1,214 @@
+# app/workflow/price_store.py
+"""
+일봉 가격 히스토리 로컬 컬럼형 저장소
+
+- 티커별 바이너리 파일 1개 (<root>/<TICKER>.bars): 고정 크기 레코드(BAR_DTYPE)를 헤더 없이 이어 붙임
+  → 추가(append)는 파일 끝에 쓰기만 하면 되고, 읽기는 np.memmap 으로 복사 없이 슬라이스
+- 과거 봉은 바뀌지 않으므로 마지막 저장일 이후 봉만 MCP 로 가져와 추가
+- 장중의 오늘 봉은 미완성이므로 저장하지 않고 응답에만 합친다
+- compact(): 날짜 정렬 + 중복 제거 + 오래된 봉 절삭 후 원자적 교체
+- enforce_budget(): 총 용량 초과 시 가장 오래 갱신되지 않은 티커 파일부터 삭제
+- 파일 락(flock)과 파일/memmap I/O 는 asyncio.to_thread 로 실행 (다른 워커가 락을 오래 잡아도 이벤트 루프는 멈추지 않음)
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import datetime as dt
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app.settings import settings
+from app.workflow.indicators import parse_history
+from app.workflow.mcp_clients import get_historical_stock_prices
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+LOGGER = logging.getLogger("ticker-graph")
+
+# 봉 날짜 / "오늘" 판단 기준 (options.py 와 같은 미국 장 시간대)
+MARKET_TZ = ZoneInfo("America/New_York")
+
+BAR_DTYPE = np.dtype([
+    ("date", "<i8"),  # 1970-01-01 기준 일수
+    ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+])
+_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# yfinance period → 대략적인 달력 일수 (누락 구간을 덮는 가장 짧은 기간 선택용)
+_PERIOD_DAYS = (("5d", 7), ("1mo", 31), ("3mo", 92), ("6mo", 183), ("1y", 366),
+                ("2y", 731), ("5y", 1827), ("max", 10 ** 6))
+
+
+def _safe_name(ticker: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+
+
+def _today() -> np.datetime64:
+    """미국 장 기준 오늘 날짜 (서버 로컬 날짜와 다를 수 있음, 예: KST 오전)"""
+    return np.datetime64(dt.datetime.now(MARKET_TZ).date(), "D")
+
+
+def _last_completed_session(today: np.datetime64) -> np.datetime64:
+    """오늘 이전의 마지막 평일 (휴장일은 고려하지 않음 → 최악의 경우 5d 조회 1회)"""
+    return np.busday_offset(today, -1, roll="forward")
+
+
+def period_covering(days: int) -> str:
+    for period, span in _PERIOD_DAYS:
+        if days <= span:
+            return period
+    return "max"
+
+
+def to_records(hist: Dict[str, np.ndarray]) -> np.ndarray:
+    """parse_history() 결과 → BAR_DTYPE 레코드 배열"""
+    rec = np.empty(len(hist["date"]), dtype=BAR_DTYPE)
+    rec["date"] = hist["date"].astype("datetime64[D]").astype(np.int64)
+    for c in _COLUMNS:
+        rec[c] = hist[c]
+    return rec
+
+
+def to_columns(rec: np.ndarray) -> Dict[str, np.ndarray]:
+    """레코드 배열 → parse_history() 와 같은 컬럼 dict (가격 컬럼은 복사 없는 뷰)"""
+    out = {"date": rec["date"].astype("datetime64[D]")}
+    for c in _COLUMNS:
+        out[c] = rec[c]
+    return out
+
+
+class PriceStore:
+    def __init__(self, root: str, max_bytes: int, max_bars: int = 1260):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_bars = max_bars  # 티커당 보관 봉 수 (기본 약 5년)
+
+    def path(self, ticker: str) -> Path:
+        return self.root / f"{_safe_name(ticker)}.bars"
+
+    @contextlib.contextmanager
+    def _locked(self, ticker: str):
+        # 워커 프로세스 간 동시 추가/압축 방지
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.root / f".{_safe_name(ticker)}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def read(self, ticker: str) -> np.ndarray:
+        """저장된 봉 전체를 memmap 으로 (복사 없음, 읽기 전용). 없으면 빈 배열"""
+        p = self.path(ticker)
+        size = p.stat().st_size if p.exists() else 0
+        n = size // BAR_DTYPE.itemsize
+        if n == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.memmap(p, dtype=BAR_DTYPE, mode="r", shape=(n,))
+
+    def last_date(self, ticker: str) -> Optional[np.datetime64]:
+        bars = self.read(ticker)
+        return np.datetime64(int(bars["date"][-1]), "D") if len(bars) else None
+
+    def append(self, ticker: str, rec: np.ndarray) -> int:
+        """마지막 저장일 이후 봉만 파일 끝에 추가. 추가한 봉 수 반환"""
+        if not len(rec):
+            return 0
+        with self._locked(ticker):
+            bars = self.read(ticker)
+            last = int(bars["date"][-1]) if len(bars) else None
+            new = rec if last is None else rec[rec["date"] > last]
+            if len(new):
+                new = np.sort(new, order="date")
+                with open(self.path(ticker), "ab") as f:
+                    f.write(new.tobytes())
+        return int(len(new))
+
+    def needs_compaction(self, bars: np.ndarray) -> bool:
+        if len(bars) > self.max_bars + 256:  # 절삭은 몰아서 (매번 다시 쓰지 않도록)
+            return True
+        return bool(len(bars) > 1 and np.any(np.diff(bars["date"]) <= 0))
+
+    def compact(self, ticker: str) -> int:
+        """날짜 정렬 + 중복 제거(나중 값 우선) + max_bars 초과분 절삭 후 원자적 교체. 남은 봉 수 반환"""
+        with self._locked(ticker):
+            bars = np.array(self.read(ticker))  # memmap 을 떼어 내고 복사
+            if not len(bars):
+                return 0
+            rev = bars[::-1]
+            _, idx = np.unique(rev["date"], return_index=True)
+            cleaned = rev[idx][-self.max_bars:]  # np.unique 는 날짜 오름차순
+            tmp = self.path(ticker).with_suffix(".tmp")
+            cleaned.tofile(tmp)
+            os.replace(tmp, self.path(ticker))
+        return int(len(cleaned))
+
+    def enforce_budget(self) -> int:
+        """총 용량이 max_bytes 를 넘으면 가장 오래 갱신되지 않은 티커 파일부터 삭제"""
+        if not self.root.exists():
+            return 0
+        files = sorted(self.root.glob("*.bars"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        removed = 0
+        while files and total > self.max_bytes:
+            p = files.pop(0)
+            total -= p.stat().st_size
+            p.unlink(missing_ok=True)
+            removed += 1
+        if removed:
+            LOGGER.info("[price-store] budget evicted %d tickers", removed)
+        return removed
+
+
+price_store = PriceStore(settings.price_store_dir, settings.price_store_max_bytes)
+
+
+def _store_completed(ticker: str, rec: np.ndarray, fetch_period: str, new_ticker: bool) -> np.ndarray:
+    """완성된 봉 추가 (+ 필요 시 압축 / 용량 정리) 후 저장분 반환. 블로킹 — to_thread 에서 호출"""
+    added = price_store.append(ticker, rec)
+    if added:
+        LOGGER.info("[price-store] %s +%d bars (period=%s)", ticker, added, fetch_period)
+        if price_store.needs_compaction(price_store.read(ticker)):
+            price_store.compact(ticker)
+        if new_ticker:  # 새 티커가 생길 때만 용량 확인
+            price_store.enforce_budget()
+    return price_store.read(ticker)
+
+
+async def load_history(client, ticker: str, period: str = "6mo",
+                       bars: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    저장소 + 증분 조회로 일봉 히스토리를 반환 (parse_history() 와 같은 형태, 최근 bars 개).
+    - 저장분이 직전 거래일까지 있으면 MCP 호출 없음 → memmap 슬라이스 그대로 반환
+    - 아니면 누락 구간을 덮는 가장 짧은 period 로 조회 후 완성된 봉만 추가
+    """
+    today = _today()
+    last = await asyncio.to_thread(price_store.last_date, ticker)
+    if last is not None and last >= _last_completed_session(today):
+        stored = await asyncio.to_thread(price_store.read, ticker)
+        return to_columns(stored[-bars if bars else 0:])
+
+    fetch_period = period if last is None else period_covering(int((today - last).astype(int)) + 1)
+    raw = await get_historical_stock_prices(client, ticker, period=fetch_period, interval="1d")
+    rec = to_records(parse_history(raw))
+
+    cutoff = today.astype(np.int64)
+    stored = await asyncio.to_thread(_store_completed, ticker, rec[rec["date"] < cutoff], fetch_period,
+                                     last is None)
+    partial = rec[rec["date"] >= cutoff]
+    if len(partial):
+        # 오늘(미완성) 봉은 저장하지 않고 응답에만 합친다 (이 경우만 복사)
+        stored = np.concatenate([np.asarray(stored[-bars + 1 if bars else 0:]), partial[-1:]])
+    return to_columns(stored[-bars if bars else 0:])
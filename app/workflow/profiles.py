@@ -0,0 +1,103 @@
+# app/workflow/profiles.py
+"""
+요청 단위 점수 프로필 (fast / standard / deep)
+
+프로필 하나가 그래프 구성(실행할 수집 노드·보강 데이터셋), 캐시 허용 범위, LLM 모델 등급,
+마감 시간을 함께 정합니다. 대화형 UI(fast)와 야간 일괄 처리(deep)가 한 배포를 같이 씁니다.
+
+- fast:     캐시에 있는 데이터만 사용(만료 6시간까지 허용, MCP 호출 없음) + 소형 모델, 500ms
+- standard: 기본 구성(ENRICH_DEFAULT) + 기본 모델
+- deep:     모든 보강 데이터셋 + 기본 모델, 넉넉한 마감
+
+slo_ms 는 p95 목표이며 프로필별 지연 분포/위반 횟수는 GET /metrics 의 "profiles" 에 노출됩니다.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.settings import settings
+from app.workflow.cache import CachePolicy
+from app.workflow.enrichment import ENRICHERS, parse_enrich
+from app.workflow.metrics import metrics
+
+# 항상 실행 가능한 수집 노드 (yahoo 는 필수: score 노드로 합류하는 경로가 최소 1개 있어야 함)
+SOURCES = ("yahoo", "dart", "history")
+
+
+class DeadlineExceeded(TimeoutError):
+    """프로필 마감 시간 초과"""
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    sources: Tuple[str, ...]                # 실행할 수집 노드
+    enrich: Optional[Tuple[str, ...]]       # 보강 데이터셋 (None 이면 settings.enrich_default)
+    cache: CachePolicy                      # 캐시 허용 범위
+    llm_tier: str                           # LLM 모델 등급 ("default" | "small")
+    deadline_s: float                       # 그래프 전체 마감
+    slo_ms: float                           # p95 지연 목표
+
+    def __post_init__(self):
+        if "yahoo" not in self.sources or not set(self.sources) <= set(SOURCES):
+            raise ValueError(f"invalid sources for profile {self.name}: {self.sources}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sources": list(self.sources),
+            "enrich": list(self.enrich) if self.enrich is not None else parse_enrich(settings.enrich_default),
+            "max_stale_s": self.cache.max_stale_s,
+            "cache_only": self.cache.cache_only,
+            "llm_tier": self.llm_tier,
+            "deadline_ms": round(self.deadline_s * 1000),
+            "slo_ms": self.slo_ms,
+        }
+
+
+PROFILES: Dict[str, Profile] = {
+    p.name: p for p in (
+        Profile("fast", ("yahoo", "history"), (), CachePolicy(max_stale_s=6 * 3600, cache_only=True),
+                "small", deadline_s=0.5, slo_ms=500),
+        Profile("standard", SOURCES, None, CachePolicy(), "default", deadline_s=20.0, slo_ms=8000),
+        Profile("deep", SOURCES, tuple(ENRICHERS), CachePolicy(), "default", deadline_s=60.0, slo_ms=30000),
+    )
+}
+
+
+def resolve_profile(name: Optional[str] = None) -> Profile:
+    """이름 → Profile (None/빈 값이면 settings.default_profile). 모르는 이름이면 ValueError"""
+    key = (name or settings.default_profile).strip().lower()
+    profile = PROFILES.get(key)
+    if profile is None:
+        raise ValueError(f"unknown profile: {name} (available: {list(PROFILES)})")
+    return profile
+
+
+def record_run(profile: Profile, elapsed_s: float, outcome: str = "ok") -> None:
+    """프로필별 지연/결과 집계 (outcome: ok | deadline | cancelled | error)"""
+    prefix = f"profile.{profile.name}"
+    metrics.incr(f"{prefix}.requests")
+    metrics.observe(f"{prefix}.latency_ms", elapsed_s * 1000)
+    if outcome != "ok":
+        metrics.incr(f"{prefix}.{outcome}")
+    if elapsed_s * 1000 > profile.slo_ms:
+        metrics.incr(f"{prefix}.slo_miss")
+
+
+def profile_stats() -> Dict[str, Dict[str, Any]]:
+    """GET /metrics 용: 프로필별 선언 SLO 와 실제 지연 분포"""
+    out = {}
+    for name, p in PROFILES.items():
+        prefix = f"profile.{name}"
+        q = metrics.quantiles(f"{prefix}.latency_ms") or {}
+        out[name] = {
+            **p.to_dict(),
+            "requests": int(metrics.get(f"{prefix}.requests")),
+            **{f"{k}_ms": round(v, 1) for k, v in q.items()},
+            "slo_miss": int(metrics.get(f"{prefix}.slo_miss")),
+            "deadline_exceeded": int(metrics.get(f"{prefix}.deadline")),
+            "cancelled": int(metrics.get(f"{prefix}.cancelled")),
+            "errors": int(metrics.get(f"{prefix}.error")),
+            "slo_met": None if not q else q["p95"] <= p.slo_ms,
+        }
+    return out
@@ -1,65 +1,255 @@
 from __future__ import annotations
 from typing import Any, Dict, List
 import logging
+from dataclasses import dataclass
+from functools import lru_cache
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.settings import settings
+from app.workflow.enrichment import format_enrichment
+from app.workflow.sentiment import sentiment_label
+from app.workflow.tokens import count_tokens, truncate_tokens
 
 LOGGER = logging.getLogger("ticker-graph")
 
-PROMPT_TEMPLATE = """\
+# ── 프롬프트 레이아웃 ─────────────────────────────────────────────────────────
+# 고정 부분(지시/스키마/예시)은 system 메시지에 두고 요청마다 같은 바이트열을 유지합니다.
+# → 모든 요청이 같은 긴 접두부를 공유하므로 공급자 측 프롬프트 캐시에 적중
+# 티커별 데이터는 뒤쪽 user 메시지에만 들어갑니다. (SYSTEM_PROMPT 를 바꾸면 PROMPT_VERSION 도 올릴 것)
+PROMPT_VERSION = "v3"
+
+# OpenAI 는 접두부가 1024 토큰 이상일 때만 캐시하므로 system 메시지는 그보다 길게 유지
+# (채점 기준/요인별 해석/출력 규칙/예시). 현재 약 1,650 토큰 (o200k_base).
+# 토큰 예산(PROMPT_TOKEN_BUDGET)은 티커별 user 메시지에만 적용
+SYSTEM_PROMPT = """\
 당신은 한국어로 금융 뉴스를 요약하고 투자 관점의 점수를 산정하는 애널리스트입니다.
-다음 입력을 바탕으로 1~100 사이의 점수와 짧은 한국어 근거를 생성하세요.
+사용자가 보내는 [컨텍스트](가격, 기술지표, 뉴스, 공시, 선택 시 보강 데이터)를 바탕으로 1~100 사이의 점수와 짧은 한국어 근거를 생성하세요.
+점수는 향후 1~3개월 관점에서 이 종목을 보유하는 것이 얼마나 매력적인지를 나타냅니다.
+
+[채점 기준]
+- 80~100: 실적/뉴스/추세가 모두 뚜렷하게 긍정적
+- 60~79: 긍정 요인이 우세하나 일부 위험 요인 존재
+- 40~59: 긍정·부정 요인이 혼재하거나 정보 부족
+- 20~39: 부정 요인이 우세
+- 1~19: 심각한 악재(소송, 실적 급감, 급락 추세 등)
+- 뉴스 괄호 안의 감성(긍정/중립/부정, -1~1)과 기술지표(수익률, RSI, 이동평균 크로스, 고점 대비 낙폭)를 함께 고려
+- 데이터가 '(데이터 없음)' 이면 해당 요인은 중립으로 취급
+
+[요인별 해석]
+1. 가격: last 는 현재가, change 는 전일 대비 변화입니다. 하루 변화만으로 점수를 크게 움직이지 마세요.
+2. 기술지표
+   - 수익률 5d/20d/60d: 기간이 길수록 추세 판단에 비중을 더 둡니다. 세 기간이 같은 방향이면 추세가 뚜렷한 것입니다.
+   - 변동성(20d, 연율): 60% 이상이면 위험 요인으로 보고 극단 점수(85 이상, 15 이하)를 피하세요.
+   - RSI14: 70 이상은 과매수(추가 상승 여력 제한), 30 이하는 과매도(반등 여지)로 해석합니다. 단독으로 방향을 정하지 마세요.
+   - SMA20/50 크로스: 골든크로스는 추세 전환 신호(+), 데드크로스는 약세 전환 신호(-)입니다.
+   - MDD / 고점대비: 고점 대비 -30% 이하는 심각한 낙폭입니다. 악재 뉴스와 겹치면 부정 요인을 강화하세요.
+3. 뉴스: 최신 기사일수록, 감성 점수의 절댓값이 클수록 비중을 높입니다. 같은 사건을 다룬 여러 기사는 하나로 취급하세요.
+   감성 미상 기사는 제목과 요약으로 직접 판단하되 확신이 없으면 중립으로 둡니다.
+4. 공시: 실적 발표, 대규모 계약, 자사주 매입은 긍정, 유상증자, 소송, 감사의견 문제는 부정 요인입니다.
+5. 보강 데이터(있을 때만)
+   - 재무: net_margin 과 revenue_growth 가 모두 양수면 펀더멘털 긍정, 적자 전환이나 매출 역성장은 부정입니다.
+   - 기관보유: 보유 기관 수가 많을수록 수급 안정성이 높습니다. 이것만으로 점수를 크게 바꾸지 마세요.
+   - 애널리스트: buy_ratio 가 높고 mean_rating 이 낮을수록(1=강력매수, 5=강력매도) 긍정입니다.
+   - 배당/분할: 꾸준한 배당은 하방을 완화합니다. 분할은 중립으로 취급합니다.
+   - 옵션: put_call_oi 가 1.2 이상이면 헤지 수요가 많은 것(경계), skew_25d 가 크게 양수면 하락 위험 프리미엄이 큰 것입니다.
+     atm_iv 가 높고 term_slope 가 음수(단기 IV > 장기 IV)이면 가까운 이벤트 위험이 큰 것입니다.
+
+[판단 원칙]
+- 요인들이 서로 엇갈리면 가장 최근의 구체적 사건(뉴스/공시)을 우선하고, 그다음 중기 추세(20d/60d), 마지막으로 단기 지표 순으로 반영합니다.
+- 정보가 적을수록 점수를 50 쪽으로 당기세요. 가격 외 데이터가 거의 없으면 40~60 을 벗어나지 않습니다.
+- 컨텍스트에 없는 사실(다른 기사, 기억하고 있는 과거 실적, 목표주가 등)을 지어내지 마세요.
+- 숫자를 근거로 들 때는 컨텍스트에 있는 값을 그대로 인용하세요.
+
+[근거(rationale) 작성 규칙]
+- 한국어 문장 1~3개, 200자 이내
+- 점수를 결정한 핵심 요인 1~2개를 먼저 쓰고, 필요하면 주요 위험 요인을 덧붙입니다.
+- 투자 권유 표현(매수하세요, 매도하세요)은 쓰지 말고 상황을 서술하세요.
+
+[출력 형식]
+- JSON 객체 하나만 출력 (코드블록/설명 문장 금지)
+- 스키마: {"score": 정수 1~100, "rationale": "짧은 한국어 문장 1~3개"}
+- score 는 따옴표 없는 정수, rationale 은 문자열이며 다른 키를 추가하지 않습니다.
+
+[예시]
+입력 요약: 실적 서프라이즈 뉴스(긍정 +0.75), 20일 수익률 +12%, 골든크로스
+출력: {"score": 84, "rationale": "실적 서프라이즈와 상승 추세 전환으로 단기 모멘텀이 강합니다."}
+입력 요약: 리콜 관련 뉴스(부정 -0.67), RSI 28, 고점 대비 -35%
+출력: {"score": 27, "rationale": "리콜 악재와 큰 낙폭으로 투자심리가 약합니다. 과매도 반등 여지는 있습니다."}
+입력 요약: 뉴스 없음, 공시 없음, 5d +1%, 20d -2%, 60d +3%, RSI 52
+출력: {"score": 51, "rationale": "뚜렷한 방향성 없이 횡보하고 있으며 판단할 뉴스가 부족합니다."}
+입력 요약: 신제품 호평 뉴스(긍정 +0.55), 20일 수익률 +18%, RSI 78, 변동성 65%
+출력: {"score": 66, "rationale": "신제품 호평과 강한 상승세는 긍정적이나 과매수 구간이고 변동성이 커 추격 위험이 있습니다."}
+입력 요약: 소송 패소 공시, 애널리스트 buy_ratio 0.8, 60일 수익률 -8%, 데드크로스
+출력: {"score": 38, "rationale": "애널리스트 평가는 우호적이지만 소송 패소와 약세 전환 신호가 부담입니다."}
+입력 요약: 재무 net_margin 0.25, revenue_growth 0.15, 꾸준한 배당, 옵션 put_call_oi 0.6
+출력: {"score": 74, "rationale": "높은 수익성과 매출 성장에 배당이 더해져 펀더멘털이 견조하고 옵션 시장의 경계도 낮습니다."}
+"""
 
+USER_TEMPLATE = """\
 [컨텍스트]
 - 종목: {ticker}
 - 가격: last={last}, change={change}
+- 기술지표: {indicator_line}
 
 - 뉴스(최대 5개):
 {news_lines}
 
 - 공시요약(최대 5개):
 {filing_lines}
+{enrichment_block}"""
 
-[요구사항]
-- 숫자만 포함된 "score"(정수)와 "rationale"(짧은 한국어 문장 1~3개)로 JSON 출력
-- 예: {{"score": 87, "rationale": "긍정적 뉴스와 안정적 가격 흐름"}}
-"""
+# 하위 호환: 단일 문자열 프롬프트 (system + user)
+PROMPT_TEMPLATE = SYSTEM_PROMPT.replace("{", "{{").replace("}", "}}") + "\n" + USER_TEMPLATE
 
-def render_prompt(ticker: str,
-                  price: dict | None,
-                  news: list[dict] | None,
-                  filings: list[dict] | None) -> str:
+def _pct(x) -> str:
+    return "n/a" if x is None else f"{x * 100:+.1f}%"
+
+def format_indicators(ind: dict | None) -> str:
+    """indicators.summarize() 결과를 한 줄 요약으로"""
+    if not ind:
+        return "(데이터 없음)"
+    cross = {1: "골든크로스", -1: "데드크로스"}.get(ind.get("ma_cross"), "없음")
+    rsi = ind.get("rsi_14")
+    vol = ind.get("vol_20d")
+    return (
+        f"수익률 5d={_pct(ind.get('ret_5d'))} 20d={_pct(ind.get('ret_20d'))} 60d={_pct(ind.get('ret_60d'))}, "
+        f"변동성(20d,연율)={'n/a' if vol is None else f'{vol * 100:.0f}%'}, "
+        f"RSI14={'n/a' if rsi is None else f'{rsi:.0f}'}, "
+        f"SMA20/50={ind.get('sma_20')}/{ind.get('sma_50')} (크로스: {cross}), "
+        f"MDD={_pct(ind.get('max_drawdown'))}, 고점대비={_pct(ind.get('drawdown_now'))}"
+    )
+
+@dataclass
+class PromptBuild:
+    text: str                # user 메시지 (티커별 데이터)
+    tokens: int              # system(캐시 접두부) + user 메시지 토큰 합
+    news_used: int = 0       # 포함된 뉴스 수
+    summaries_cut: int = 0   # 잘리거나 빠진 뉴스 요약 수
+    system: str = SYSTEM_PROMPT
+
+    @property
+    def messages(self) -> list:
+        return [SystemMessage(content=self.system), HumanMessage(content=self.text)]
+
+    def as_text(self) -> str:
+        return f"{self.system}\n{self.text}"
+
+
+@lru_cache(maxsize=1)
+def system_tokens() -> int:
+    """고정 system 메시지 토큰 수 (최초 1회만 토크나이즈)"""
+    return count_tokens(SYSTEM_PROMPT)
+
+
+@lru_cache(maxsize=1)
+def template_tokens() -> int:
+    """user 템플릿 정적 부분의 토큰 수 (최초 1회만 토크나이즈)"""
+    return count_tokens(USER_TEMPLATE.format(**dict.fromkeys(_TEMPLATE_FIELDS, "")))
+
+
+_TEMPLATE_FIELDS = ("ticker", "last", "change", "indicator_line", "news_lines", "filing_lines",
+                    "enrichment_block")
+
+
+def _news_priority(i: int, n: dict) -> tuple:
+    # 최신(목록 앞쪽) 우선, 같은 위치대면 감성이 뚜렷한 기사 우선
+    senti = n.get("sentiment")
+    strength = abs(senti) if isinstance(senti, (int, float)) else 0.0
+    return (i // 2, -strength)
+
+
+def build_prompt(ticker: str,
+                 price: dict | None,
+                 news: list[dict] | None,
+                 filings: list[dict] | None,
+                 indicators: dict | None = None,
+                 budget: int | None = None,
+                 enrichment: dict | None = None) -> PromptBuild:
+    """
+    토큰 예산 안에서 user 메시지 구성 (고정 system 메시지는 예산에서 제외, tokens 에는 포함).
+    우선순위: 고정 컨텍스트(가격/지표) > 뉴스 제목 > 공시 > 보강 데이터(선택 시) > 뉴스 요약(최신·감성 강도 순, 기사당 상한)
+    """
+    budget = budget or settings.prompt_token_budget
     last = price.get("last") if price else None
-    change = price.get("chg") or price.get("change") if price else None
-
-    news_lines = ""
-    if news:
-        for n in news[:5]:
-            title = n.get("title")
-            senti = n.get("sentiment")
-            summary = n.get("summary")
-            news_lines += f"  - {title} ({senti}): {summary}\n"
-    else:
-        news_lines = "  - (데이터 없음)\n"
-
-    filing_lines = ""
-    if filings:
-        for f in filings[:5]:
-            ftype = f.get("type")
-            fdate = f.get("date")
-            fsum  = f.get("summary")
-            filing_lines += f"  - [{ftype} {fdate}] {fsum}\n"
-    else:
-        filing_lines = "  - (데이터 없음)\n"
-
-    prompt = PROMPT_TEMPLATE.format(
-        ticker=ticker,
-        last=last,
-        change=change,
-        news_lines=news_lines.rstrip(),
-        filing_lines=filing_lines.rstrip()
+    change = price.get("chg") if price else None
+    if change is None and price:
+        change = price.get("change")  # 0.0(보합)은 그대로 두고 키가 없을 때만 대체
+    fields = {
+        "ticker": ticker,
+        "last": last,
+        "change": change,
+        "indicator_line": format_indicators(indicators),
+    }
+    used = template_tokens() + sum(count_tokens(str(v)) for v in fields.values())
+
+    # 1) 뉴스 제목 (넘치면 뒤쪽 기사부터 제외)
+    heads: list[str] = []
+    for n in (news or [])[:5]:
+        head = f"  - {n.get('title')} ({sentiment_label(n.get('sentiment'))})"
+        cost = count_tokens(head) + 1
+        if used + cost > budget:
+            break
+        heads.append(head)
+        used += cost
+
+    # 2) 공시
+    filing_lines: list[str] = []
+    for f in (filings or [])[:5]:
+        line = f"  - [{f.get('type')} {f.get('date')}] {f.get('summary')}"
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        filing_lines.append(line)
+        used += cost
+
+    # 3) 보강 데이터셋 요약 (요청에서 선택한 경우만, 데이터셋당 1줄)
+    extra_lines: list[str] = []
+    for line in format_enrichment(enrichment):
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        extra_lines.append(line)
+        used += cost
+    if extra_lines:
+        used += count_tokens("\n- 보강 데이터:")
+
+    # 4) 남은 예산으로 뉴스 요약 (우선순위 순, 기사당 prompt_summary_tokens 상한)
+    summaries = [""] * len(heads)
+    cut = 0
+    order = sorted(range(len(heads)), key=lambda i: _news_priority(i, news[i]))
+    for i in order:
+        summary = news[i].get("summary")
+        if not summary:
+            continue
+        room = min(settings.prompt_summary_tokens, budget - used - 1)
+        text = truncate_tokens(summary, room)
+        if text != summary:
+            cut += 1
+        if text:
+            summaries[i] = f": {text}"
+            used += count_tokens(summaries[i])
+
+    news_lines = "\n".join(h + s for h, s in zip(heads, summaries)) or "  - (데이터 없음)"
+    prompt = USER_TEMPLATE.format(
+        **fields,
+        news_lines=news_lines,
+        filing_lines="\n".join(filing_lines) or "  - (데이터 없음)",
+        enrichment_block="\n- 보강 데이터:\n" + "\n".join(extra_lines) + "\n" if extra_lines else "",
     )
 
-    # --- 로그/트레이스 남기기 ---
-    preview = prompt if len(prompt) < 500 else prompt[:500] + "…"
-    LOGGER.info("[prompt] ticker=%s, preview=%s", ticker, preview)
+    # --- 로그/트레이스 남기기 (본문 미리보기는 DEBUG) ---
+    LOGGER.info("[prompt] ticker=%s tokens=%d/%d (+system %d) news=%d cut=%d",
+                ticker, used, budget, system_tokens(), len(heads), cut)
+    if LOGGER.isEnabledFor(logging.DEBUG):
+        LOGGER.debug("[prompt] ticker=%s preview=%s", ticker, prompt[:500])
+    return PromptBuild(text=prompt, tokens=system_tokens() + used, news_used=len(heads), summaries_cut=cut)
 
-    return prompt
+
+def render_prompt(ticker: str,
+                  price: dict | None,
+                  news: list[dict] | None,
+                  filings: list[dict] | None,
+                  indicators: dict | None = None,
+                  enrichment: dict | None = None) -> str:
+    return build_prompt(ticker, price, news, filings, indicators, enrichment=enrichment).as_text()
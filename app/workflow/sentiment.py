@@ -0,0 +1,146 @@
+# app/workflow/sentiment.py
+"""
+뉴스 감성 점수 (로컬 사전 기반, 한국어/영어)
+
+- 외부 API/모델 없이 CPU 에서 즉시 계산: 금융 감성 사전 + 부정어 반전
+- score_batch(): 여러 티커의 기사를 한 번에 토큰화 → (기사 id, 가중치) 배열 → np.bincount 로 기사별 합산
+- 기사 단위 캐시: URL(없으면 제목) 해시 → 같은 기사는 두 번 채점하지 않음
+- 점수: -1(부정) ~ 1(긍정), 신호 단어가 없으면 0.0
+"""
+from __future__ import annotations
+import hashlib
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.workflow.cache import TTLCache, _MISS
+
+ARTICLE_TTL_S = 7 * 24 * 3600  # 기사 감성은 바뀌지 않으므로 길게
+
+_EN_POS = """
+beat beats beating surge surges surged soar soars soared jump jumps jumped rally rallies rallied
+gain gains gained rise rises rising rose record growth grow grows grew strong stronger strength
+upgrade upgraded upgrades outperform outperforms bullish profit profits profitable boost boosts
+boosted expand expands expansion optimistic optimism positive exceed exceeds exceeded raise raised
+buy buyback dividend approval approved breakthrough win wins won partnership recover recovery rebound
+""".split()
+_EN_NEG = """
+miss misses missed fall falls fell drop drops dropped plunge plunges plunged slump slumps tumble
+tumbles tumbled decline declines declined loss losses lose loses weak weaker weakness downgrade
+downgraded downgrades underperform bearish lawsuit probe investigation fine fined recall cut cuts
+layoff layoffs warning warns warned concern concerns risk risks fraud bankruptcy default delay
+delayed halt halted negative pessimistic slowdown crash sell-off selloff shortfall resign resigns
+""".split()
+# 한국어는 조사/어미가 붙으므로 어간 접두 일치
+_KO_POS = """
+상승 급등 강세 호조 호실적 최고 신고가 돌파 개선 성장 증가 확대 흑자 수혜 기대 호재 매수 상향
+반등 회복 승인 수주 배당 자사주 최대 순항 선방 긍정 낙관 돌풍
+""".split()
+_KO_NEG = """
+하락 급락 약세 부진 적자 손실 감소 축소 악재 우려 리스크 위험 소송 조사 제재 과징금 리콜 하향
+매도 둔화 경고 지연 중단 파산 부도 폭락 충격 불확실 부정 비관 사임 횡령
+""".split()
+_NEGATORS_EN = {"not", "no", "never", "without", "fails", "failed", "unlikely"}
+_NEGATORS_KO = ("않", "못", "없")  # 뒤따르는 어절 / "안" 은 앞 어절
+
+LEXICON: Dict[str, float] = {**{w: 1.0 for w in _EN_POS}, **{w: -1.0 for w in _EN_NEG}}
+KO_STEMS: Dict[str, float] = {**{w: 1.0 for w in _KO_POS}, **{w: -1.0 for w in _KO_NEG}}
+_KO_MAX = max(map(len, KO_STEMS))
+
+_TOKEN_RE = re.compile(r"[a-z][a-z\-']*|[가-힣]+")
+_ALPHA = 1.0  # 평활 상수: 신호 단어가 1개뿐이면 ±0.5
+
+
+@lru_cache(maxsize=65536)
+def _token_weight(tok: str) -> float:
+    if tok in LEXICON:
+        return LEXICON[tok]
+    if "가" <= tok[0] <= "힣":
+        for n in range(min(_KO_MAX, len(tok)), 1, -1):
+            w = KO_STEMS.get(tok[:n])
+            if w is not None:
+                return w
+    return 0.0
+
+
+def _negated(tok: str, prev: Optional[str], nxt: Optional[str]) -> bool:
+    if "가" <= tok[0] <= "힣":
+        # "상승하지 않았다", "개선되지 못해", "안 좋은" / 같은 어절 안의 "않" 도 처리
+        return (prev == "안" or (nxt is not None and nxt.startswith(_NEGATORS_KO))
+                or "않" in tok[2:] or "없" in tok[2:])
+    return prev in _NEGATORS_EN
+
+
+def article_text(article: Dict[str, Any]) -> str:
+    return f"{article.get('title') or ''} {article.get('summary') or ''}".strip()
+
+
+def article_key(article: Dict[str, Any]) -> str:
+    basis = article.get("url") or article.get("title") or article_text(article)
+    return "senti:" + hashlib.sha1(str(basis).encode("utf-8")).hexdigest()
+
+
+def score_texts(texts: List[str]) -> np.ndarray:
+    """텍스트 배치 → 감성 점수 배열. 토큰 가중치를 모아 기사별로 한 번에 합산"""
+    doc_ids: List[int] = []
+    weights: List[float] = []
+    for i, text in enumerate(texts):
+        toks = _TOKEN_RE.findall(text.lower())
+        for j, tok in enumerate(toks):
+            w = _token_weight(tok)
+            if w:
+                prev = toks[j - 1] if j else None
+                nxt = toks[j + 1] if j + 1 < len(toks) else None
+                doc_ids.append(i)
+                weights.append(-w if _negated(tok, prev, nxt) else w)
+    n = len(texts)
+    if not doc_ids:
+        return np.zeros(n)
+    ids = np.asarray(doc_ids)
+    w = np.asarray(weights)
+    net = np.bincount(ids, weights=w, minlength=n)
+    hits = np.bincount(ids, weights=np.abs(w), minlength=n)
+    return np.round(net / (hits + _ALPHA), 3)
+
+
+class SentimentScorer:
+    def __init__(self, maxsize: int = 20000):
+        self._cache = TTLCache(maxsize)
+        self.stats = {"scored": 0, "cached": 0}
+
+    def score_batch(self, articles: List[Dict[str, Any]]) -> List[float]:
+        """여러 티커의 기사를 한 번에 채점 (캐시 적중분·배치 내 중복은 건너뜀)"""
+        keys = [article_key(a) for a in articles]
+        todo: Dict[str, str] = {}
+        for k, a in zip(keys, articles):
+            if k not in todo and self._cache.get(k) is _MISS:
+                todo[k] = article_text(a)
+        if todo:
+            scores = score_texts(list(todo.values()))
+            for k, s in zip(todo, scores.tolist()):
+                self._cache.set(k, s, ARTICLE_TTL_S)
+            self.stats["scored"] += len(todo)
+        self.stats["cached"] += len(articles) - len(todo)
+        fresh = dict(zip(todo, scores.tolist())) if todo else {}
+        return [fresh[k] if k in fresh else self._cache.get(k) for k in keys]
+
+    def annotate(self, news_lists: Iterable[List[Dict[str, Any]]]) -> None:
+        """뉴스 리스트들의 sentiment 가 비어 있는 기사만 채워 넣음 (제자리 수정)"""
+        pending = [a for news in news_lists for a in (news or []) if a.get("sentiment") is None]
+        if not pending:
+            return
+        for a, s in zip(pending, self.score_batch(pending)):
+            a["sentiment"] = s
+
+
+sentiment_scorer = SentimentScorer()
+
+
+def sentiment_label(s: Any) -> str:
+    """프롬프트 표시용: 숫자 → '긍정 +0.50' / 라벨·None 은 그대로"""
+    if isinstance(s, (int, float)):
+        name = "긍정" if s >= 0.2 else "부정" if s <= -0.2 else "중립"
+        return f"{name} {s:+.2f}"
+    return "감성 미상" if s is None else str(s)
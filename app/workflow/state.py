@@ -7,12 +7,38 @@ from langgraph.graph import add_messages
 from typing_extensions import Annotated
 import operator
 
+
+def merge_dicts(a: Optional[Dict[str, Any]], b: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """병렬 노드가 같은 dict 필드에 각자 키를 쓰는 경우 합치기 (None 을 쓰면 초기화)"""
+    if b is None:
+        return {}
+    return {**(a or {}), **b}
+
+
 class ScoreState(TypedDict, total=False):
     ticker: str
+    # 점수 프로필 이름 (profiles.PROFILES) / 실행할 수집 노드 / 요청 마감 시각(epoch 초)
+    profile: Optional[str]
+    sources: Optional[List[str]]
+    deadline: Optional[float]
     price: Optional[Dict[str, Any]]
     news: Optional[List[Dict[str, Any]]]
     filings: Optional[List[Dict[str, Any]]]
+    # 가격 히스토리 기반 기술 지표 요약 (indicators.summarize)
+    indicators: Optional[Dict[str, Any]]
+    # 선택형 보강 데이터셋 (enrichment.ENRICHERS 이름 목록) / 데이터셋별 요약
+    enrich: Optional[List[str]]
+    enrichment: Annotated[Dict[str, Any], merge_dicts]
     score: Optional[int]
+    # 점수 산출 경로: "llm" | "rule"(규칙 사전 점수) | "reuse"(직전 LLM 점수 재사용)
+    #               | "fallback"(LLM 출력이 복구·재질문 후에도 무효 → 규칙 점수)
+    score_source: Optional[str]
+    # LLM 출력 검증 결과: "ok" | "repaired" | "retried" | "fallback" | "unavailable"(모든 공급자 실패)
+    #                  | "deadline"(마감 전에 LLM 을 부를 시간이 없음) (LLM 경로일 때만)
+    output_status: Optional[str]
+    prescore: Optional[Dict[str, Any]]
+    # LLM 경로일 때 프롬프트 토큰 수 (prompts.build_prompt)
+    prompt_tokens: Optional[int]
     rationale: Optional[str]
     # 병렬 합치기: 리스트 이어붙이기
     logs: Annotated[List[str], operator.add]
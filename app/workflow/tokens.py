@@ -0,0 +1,63 @@
+# app/workflow/tokens.py
+"""
+프롬프트 토큰 계산
+
+- tiktoken 이 있고 인코딩 파일을 받을 수 있으면 모델 토크나이저(gpt-4o → o200k_base)로 정확히 계산
+- 없으면(오프라인 등) 근사치: ASCII 4자당 1토큰, 그 외(한글 등) 1자당 1토큰
+"""
+from __future__ import annotations
+import logging
+import math
+from functools import lru_cache
+from typing import Optional
+
+LOGGER = logging.getLogger("ticker-graph")
+
+MODEL = "gpt-4o"
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(MODEL)
+    except Exception as e:  # 미설치 / 인코딩 다운로드 실패
+        LOGGER.info("[tokens] tiktoken unavailable (%s), using estimate", type(e).__name__)
+        return None
+
+
+def tokenizer_name() -> str:
+    enc = _encoder()
+    return enc.name if enc is not None else "estimate"
+
+
+def _estimate(text: str) -> int:
+    ascii_chars = sum(1 for c in text if c < "\x80")
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    enc = _encoder()
+    return len(enc.encode(text)) if enc is not None else _estimate(text)
+
+
+def truncate_tokens(text: Optional[str], limit: int, ellipsis: str = "…") -> str:
+    """text 를 limit 토큰 이하로 자름 (잘렸으면 끝에 ellipsis)"""
+    if not text or limit <= 0:
+        return ""
+    if count_tokens(text) <= limit:
+        return text
+    enc = _encoder()
+    if enc is not None:
+        return enc.decode(enc.encode(text)[:max(0, limit - 1)]) + ellipsis
+    # 근사: 앞에서부터 누적 토큰이 limit-1 을 넘기 직전까지
+    used, cut = 0.0, 0
+    for i, c in enumerate(text):
+        used += 0.25 if c < "\x80" else 1.0
+        if used > limit - 1:
+            break
+        cut = i + 1
+    return text[:cut] + ellipsis
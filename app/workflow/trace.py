@@ -1,7 +1,9 @@
 # app/workflow/trace.py
 from __future__ import annotations
 import json, time, functools
-from typing import Any, Dict, Callable
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import logging
 LOGGER = logging.getLogger("ticker-graph")
@@ -38,6 +40,7 @@ def state_preview(state: Dict[str, Any]) -> Dict[str, Any]:
         "news_len": len(news),
         "filings_len": len(filings),
         "score": state.get("score"),
+        "score_source": state.get("score_source"),
         "rationale_preview": (state.get("rationale")[:120] + "…") if isinstance(state.get("rationale"), str) and len(state.get("rationale")) > 120 else state.get("rationale"),
         "logs_len": len(logs),
     }
@@ -67,7 +70,9 @@ def traced(node_name: str):
                     "price": out.get("price"),
                     "news": out.get("news"),
                     "filings": out.get("filings"),
+                    "indicators": out.get("indicators"),
                     "score": out.get("score"),
+                    "score_source": out.get("score_source"),
                     "rationale": out.get("rationale"),
                     "logs": out.get("logs"),
                 }
@@ -84,7 +89,7 @@ def traced(node_name: str):
                 resp_preview = {
                     k: shorten(v, 400)
                     for k, v in out.items()
-                    if k in ("price", "news", "filings", "score", "rationale")
+                    if k in ("price", "news", "filings", "indicators", "score", "score_source", "rationale")
                 }
 
                 # trace(노드별 상세) 추가: before/after 포함
@@ -120,28 +125,81 @@ def traced(node_name: str):
     return deco
 
 
-def events_to_mermaid_flow(events: list[dict]) -> str:
+@dataclass
+class NodeSpan:
+    name: str
+    step: int
+    start_ms: float
+    end_ms: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ms is None else round(self.end_ms - self.start_ms, 1)
+
+
+class FlowTrace:
     """
-    astream_events로 수집한 이벤트를 Flowchart로 가볍게 가시화
+    노드 start/end 만 담는 실행 추적 (astream_events 원본 이벤트/페이로드는 보관하지 않음).
+    - 노드가 시작될 때 실제로 실행된 선행 노드에서의 간선만 추가 → 병렬 분기(yahoo‖dart‖history)가 그대로 보임
+    - 같은 superstep 에 실행된 노드가 여럿이면 subgraph 로 묶음
+    - mermaid() 는 실행 중 언제든 호출 가능 (실행 중 노드는 running 스타일)
     """
-    visited = []
-    for ev in events:
-        if ev.get("event") == "on_chain_end" and ev.get("name"):
-            visited.append(ev["name"])
-        if ev.get("event") == "on_node_end" and ev.get("name"):
-            visited.append(ev["name"])
-
-    # 중복 압축
-    seq = []
-    for n in visited:
-        if not seq or seq[-1] != n:
-            seq.append(n)
-
-    lines = ["flowchart LR", "  START((START))", "  END((END))"]
-    prev = "START"
-    for n in seq:
-        nid = n.replace(" ", "_")
-        lines.append(f"  {prev} --> {nid}[[{n}]]")
-        prev = nid
-    lines.append(f"  {prev} --> END")
-    return "\n".join(lines)
\ No newline at end of file
+
+    def __init__(self, edges: Iterable[Tuple[str, str]]):
+        self._preds: Dict[str, Set[str]] = defaultdict(set)
+        self._ends_graph: Set[str] = set()
+        for src, dst in edges:
+            if dst == "__end__":
+                self._ends_graph.add(src)
+            else:
+                self._preds[dst].add(src)
+        self._t0 = time.perf_counter()
+        self._runs: Dict[str, NodeSpan] = {}       # run_id → span
+        self._last: Dict[str, NodeSpan] = {}       # 노드 이름 → 가장 최근 span
+        self._edges: List[str] = []
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def start(self, name: str, step: int, run_id: str) -> Dict[str, Any]:
+        span = NodeSpan(name, step, self._now_ms())
+        preds = [p for p in sorted(self._preds.get(name, ()))
+                 if p in self._last and self._last[p].step < step]
+        if "__start__" in self._preds.get(name, ()) and not preds:
+            self._edges.append(f"  START --> {name}")
+        self._edges.extend(f"  {p} --> {name}" for p in preds)
+        self._runs[run_id] = self._last[name] = span
+        return {"event": "node_start", "node": name, "step": step, "t_ms": round(span.start_ms, 1)}
+
+    def end(self, run_id: str) -> Optional[Dict[str, Any]]:
+        span = self._runs.get(run_id)
+        if span is None:
+            return None
+        span.end_ms = self._now_ms()
+        if span.name in self._ends_graph:
+            self._edges.append(f"  {span.name} --> END")
+        return {"event": "node_end", "node": span.name, "step": span.step, "duration_ms": span.duration_ms}
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        return [{"node": s.name, "step": s.step, "start_ms": round(s.start_ms, 1), "duration_ms": s.duration_ms}
+                for s in self._runs.values()]
+
+    def mermaid(self) -> str:
+        lines = ["flowchart LR", "  START((START))", "  END((END))"]
+        by_step: Dict[int, List[NodeSpan]] = defaultdict(list)
+        for span in self._runs.values():
+            by_step[span.step].append(span)
+        for step in sorted(by_step):
+            spans = by_step[step]
+            indent = "  "
+            if len(spans) > 1:
+                lines.append(f"  subgraph step{step}[\"step {step} · parallel\"]")
+                indent = "    "
+            for s in spans:
+                label = f"{s.name}<br/>{s.duration_ms:g}ms" if s.duration_ms is not None else f"{s.name}<br/>…"
+                lines.append(f"{indent}{s.name}[\"{label}\"]" + ("" if s.end_ms is not None else ":::running"))
+            if len(spans) > 1:
+                lines.append("  end")
+        lines.extend(self._edges)
+        lines.append("  classDef running stroke-dasharray: 4 2")
+        return "\n".join(lines)
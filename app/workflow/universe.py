@@ -0,0 +1,173 @@
+# app/workflow/universe.py
+"""
+점수화된 종목 전체(universe) 인메모리 컬럼형 테이블
+
+- 열 배열: ticker / score / 점수 시각(epoch) / 등락률(%) / 섹터(코드, 이름은 별도 사전)
+- 모든 점수 실행(run_once: /score, /score/batch, /jobs, A2A)이 끝날 때 upsert → 티커당 최신 1행
+  단, 가격 데이터가 있고 LLM/규칙으로 정상 산출된 점수만 반영 (no_data·폴백·마감 초과 결과는 제외)하고,
+  더 깊은 프로필(deep > standard > fast)의 점수는 _KEEP_DEEPER_S 동안 얕은 프로필 결과로 덮어쓰지 않음
+- 점수 내림차순 정렬 인덱스는 갱신 후 첫 조회 때 한 번만 다시 만든다 (argsort)
+- 조회: 필터(섹터/점수 범위/신선도/티커 목록) 마스크 → 정렬 인덱스 순서로 top-k,
+  백분위(전체 대비 점수 ≤ 비율)는 정렬된 점수 배열에서 searchsorted
+
+GET /rank 와 A2A rank_tickers 툴이 이 테이블에서 바로 응답합니다 (그래프 실행 없음).
+테이블은 워커 프로세스마다 따로 있으므로 멀티 워커(app.serve)에서는 그 워커가 실행한 점수만 보입니다.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.workflow.metrics import metrics
+
+_INITIAL_CAPACITY = 256
+_NO_SECTOR = -1
+# 프로필 깊이 (모르는 프로필은 standard 취급)
+_PROFILE_DEPTH = {"fast": 0, "standard": 1, "deep": 2}
+# 더 깊은 프로필 점수 보호 시간(초): fast 는 이 정도 지난 캐시 값으로 점수화하므로 그보다 새 점수는 유지
+_KEEP_DEEPER_S = 6 * 3600
+# 순위에 넣지 않는 결과
+_UNRANKED_SOURCES = ("fallback", "no_data")
+_UNRANKED_STATUS = ("fallback", "deadline", "unavailable", "no_data")
+
+
+class ScoredUniverse:
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self._lock = threading.Lock()
+        self._n = 0
+        self._row: Dict[str, int] = {}          # ticker → 행 번호
+        self._sectors: List[str] = []           # 섹터 코드 → 이름
+        self._sector_code: Dict[str, int] = {}  # 섹터 이름(소문자) → 코드
+        self._alloc(capacity)
+        self._order: Optional[np.ndarray] = None   # 점수 내림차순 행 번호
+        self._sorted: Optional[np.ndarray] = None  # 점수 오름차순 값 (백분위용)
+
+    def _alloc(self, capacity: int) -> None:
+        n = getattr(self, "_n", 0)
+
+        def grow(old: Optional[np.ndarray], dtype, fill) -> np.ndarray:
+            arr = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                arr[:n] = old[:n]
+            return arr
+
+        self.ticker = grow(getattr(self, "ticker", None), object, None)
+        self.score = grow(getattr(self, "score", None), np.float64, np.nan)
+        self.ts = grow(getattr(self, "ts", None), np.float64, 0.0)
+        self.pct = grow(getattr(self, "pct", None), np.float64, np.nan)
+        self.sector = grow(getattr(self, "sector", None), np.int32, _NO_SECTOR)
+        self.depth = grow(getattr(self, "depth", None), np.int8, 0)
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ── 갱신 ────────────────────────────────────────────────────────────────
+    def _sector_id(self, name: Optional[str]) -> int:
+        if not name:
+            return _NO_SECTOR
+        key = name.strip().lower()
+        code = self._sector_code.get(key)
+        if code is None:
+            code = self._sector_code[key] = len(self._sectors)
+            self._sectors.append(name.strip())
+        return code
+
+    def upsert(self, ticker: str, score: float, pct: Optional[float] = None,
+               sector: Optional[str] = None, ts: Optional[float] = None, depth: int = 1) -> bool:
+        """반영했으면 True. 최근(_KEEP_DEEPER_S 이내) 더 깊은 프로필 점수가 있으면 False"""
+        ticker = ticker.upper()
+        now = time.time() if ts is None else ts
+        with self._lock:
+            i = self._row.get(ticker)
+            if i is not None and depth < self.depth[i] and now - self.ts[i] < _KEEP_DEEPER_S:
+                metrics.incr("universe.kept_deeper")
+                return False
+            if i is None:
+                if self._n == len(self.score):
+                    self._alloc(len(self.score) * 2)
+                i = self._row[ticker] = self._n
+                self._n += 1
+                self.ticker[i] = ticker
+            self.score[i] = float(score)
+            self.ts[i] = now
+            self.depth[i] = depth
+            self.pct[i] = np.nan if pct is None else float(pct)
+            if sector or self.sector[i] == _NO_SECTOR:
+                self.sector[i] = self._sector_id(sector)
+            self._order = self._sorted = None
+        metrics.incr("universe.upsert")
+        return True
+
+    def record(self, result: Dict[str, Any]) -> None:
+        """run_once 결과 반영 (가격 데이터 없이/폴백·마감 초과로 나온 점수는 무시)"""
+        price = result.get("price") or {}
+        if result.get("score") is None or price.get("last") is None \
+                or result.get("score_source") in _UNRANKED_SOURCES \
+                or result.get("output_status") in _UNRANKED_STATUS:
+            metrics.incr("universe.skipped")
+            return
+        self.upsert(result["ticker"], result["score"], price.get("pct"), price.get("sector"),
+                    depth=_PROFILE_DEPTH.get(result.get("profile") or "", 1))
+
+    # ── 조회 ────────────────────────────────────────────────────────────────
+    def _index(self):
+        """(내림차순 행 번호, 오름차순 점수) — 갱신 후 첫 조회 때만 재계산"""
+        if self._order is None:
+            scores = self.score[:self._n]
+            self._order = np.argsort(-scores, kind="stable")
+            self._sorted = np.sort(scores)
+        return self._order, self._sorted
+
+    def _percentile(self, sorted_scores: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        return 100.0 * np.searchsorted(sorted_scores, scores, side="right") / max(len(sorted_scores), 1)
+
+    def sectors(self) -> Dict[str, int]:
+        with self._lock:
+            codes = self.sector[:self._n]
+            return {name: int((codes == c).sum()) for c, name in enumerate(self._sectors)}
+
+    def query(self, k: int = 20, sector: Optional[str] = None, min_score: Optional[float] = None,
+              max_score: Optional[float] = None, max_age_s: Optional[float] = None,
+              tickers: Optional[Iterable[str]] = None, ascending: bool = False) -> Dict[str, Any]:
+        """필터 → 점수순 top-k (ascending=True 면 하위 k). 백분위는 필터와 무관하게 전체 기준"""
+        t0 = time.perf_counter()
+        with self._lock:
+            n = self._n
+            order, sorted_scores = self._index()
+            mask = np.ones(n, dtype=bool)
+            if sector:
+                code = self._sector_code.get(sector.strip().lower())
+                mask &= self.sector[:n] == (code if code is not None else -2)
+            if min_score is not None:
+                mask &= self.score[:n] >= min_score
+            if max_score is not None:
+                mask &= self.score[:n] <= max_score
+            if max_age_s is not None:
+                mask &= self.ts[:n] >= time.time() - max_age_s
+            if tickers:
+                rows = [self._row[t.strip().upper()] for t in tickers if t.strip().upper() in self._row]
+                keep = np.zeros(n, dtype=bool)
+                keep[rows] = True
+                mask &= keep
+            ranked = order[mask[order]]
+            if ascending:
+                ranked = ranked[::-1]
+            top = ranked[:max(k, 0)]
+            pcts = self._percentile(sorted_scores, self.score[top])
+            items = [{
+                "rank": r + 1,
+                "ticker": self.ticker[i],
+                "score": float(self.score[i]),
+                "percentile": round(float(p), 1),
+                "pct": None if np.isnan(self.pct[i]) else round(float(self.pct[i]), 4),
+                "sector": self._sectors[self.sector[i]] if self.sector[i] != _NO_SECTOR else None,
+                "scored_at": float(self.ts[i]),
+            } for r, (i, p) in enumerate(zip(top, pcts))]
+            matched = int(mask.sum())
+        metrics.observe("universe.query_ms", (time.perf_counter() - t0) * 1000)
+        return {"total": n, "matched": matched, "items": items}
+
+
+universe = ScoredUniverse()
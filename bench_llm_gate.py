@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+LLM 게이트 벤치마크
+같은 워크로드를 재생하면서 게이트가 LLM 호출을 얼마나 줄이는지 측정합니다.
+
+- --replay FILE : JSONL 한 줄에 {"ticker", "price", "indicators", "news", "filings"} (실제 트래픽 기록)
+- 파일이 없으면 시드 고정 합성 워크로드 (티커 N개 × 라운드 R회, 라운드마다 가격/뉴스가 조금씩 변함)
+
+사용법:
+    python bench_llm_gate.py --tickers 50 --rounds 20
+    python bench_llm_gate.py --replay recorded.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+
+from app.workflow.prescore import LLMGate, prescore, fingerprint
+
+
+def synthetic_workload(n_tickers: int, rounds: int, seed: int = 7):
+    """라운드마다 가격은 소폭 변동, 뉴스는 확률적으로 교체되는 재생용 입력"""
+    rng = random.Random(seed)
+    state = {}
+    for i in range(n_tickers):
+        drift = rng.uniform(-0.2, 0.2)
+        state[f"T{i:03d}"] = {
+            "ret_20d": drift / 2, "ret_60d": drift, "rsi_14": 50 + drift * 100,
+            "above_sma_slow": 1.0 if drift > 0 else 0.0, "ma_cross": 0,
+            "drawdown_now": min(0.0, drift - 0.05), "pct": 0.0,
+            "senti": rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0]), "news_rev": 0,
+        }
+    for _ in range(rounds):
+        for ticker, s in state.items():
+            s["pct"] = rng.gauss(0, 1.0)
+            s["ret_20d"] += s["pct"] / 100
+            s["ret_60d"] += s["pct"] / 100
+            s["rsi_14"] = max(5.0, min(95.0, s["rsi_14"] + s["pct"] * 2))
+            if rng.random() < 0.15:  # 새 뉴스
+                s["news_rev"] += 1
+                s["senti"] = rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0])
+            yield {
+                "ticker": ticker,
+                "price": {"last": 100.0, "pct": s["pct"]},
+                "indicators": {k: s[k] for k in ("ret_20d", "ret_60d", "rsi_14", "above_sma_slow",
+                                                 "ma_cross", "drawdown_now")},
+                "news": [{"title": f"{ticker} news #{s['news_rev']}", "sentiment": s["senti"]}],
+                "filings": [],
+            }
+
+
+def replay_workload(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def run(workload, gate: LLMGate):
+    total = 0
+    for item in workload:
+        pre = prescore(item.get("price"), item.get("indicators"), item.get("news"))
+        fp = fingerprint(item.get("price"), item.get("indicators"), item.get("news"), item.get("filings"))
+        path, _ = gate.decide(item["ticker"], pre, fp)
+        if path == "llm":
+            # LLM 응답 대신 사전 점수를 기록 (호출 횟수만 측정)
+            gate.record(item["ticker"], fp, pre.score, None)
+        total += 1
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM gate benchmark")
+    parser.add_argument("--replay", help="recorded JSONL workload")
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--confidence", type=float, default=0.75)
+    parser.add_argument("--max-drift", type=float, default=0.1)
+    args = parser.parse_args()
+
+    def workload():
+        return replay_workload(args.replay) if args.replay else synthetic_workload(args.tickers, args.rounds)
+
+    print("=" * 60)
+    print("LLM Gate Benchmark")
+    print("=" * 60)
+    baseline = run(workload(), LLMGate(mode="always"))
+    gate = LLMGate(mode="auto", confidence=args.confidence, max_drift=args.max_drift)
+    total = run(workload(), gate)
+
+    llm = gate.stats["llm"]
+    print(f"requests          : {total}")
+    print(f"LLM calls (always): {baseline}")
+    print(f"LLM calls (gated) : {llm}  (rule={gate.stats['rule']}, reuse={gate.stats['reuse']})")
+    print(f"reduction         : {(1 - llm / baseline) * 100 if baseline else 0:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
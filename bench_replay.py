@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+cassette 녹화/재생 벤치마크
+같은 트래픽(MCP 응답 + LLM 응답)으로 그래프 전체를 돌려 코드 버전 간 지연을 비교합니다.
+
+사용법:
+    # 1) 실서비스로 녹화
+    python bench_replay.py record bench.jsonl.gz AAPL MSFT NVDA
+    # 2) 네트워크 없이 재생 (녹화 지연 재현은 --latency)
+    python bench_replay.py replay bench.jsonl.gz [--latency] [--concurrency 4]
+
+가격 저장소는 매 실행마다 임시 디렉터리를 써서 녹화 때와 같은 MCP 호출이 일어나게 합니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def _setup_env(mode: str, path: str, latency: bool) -> None:
+    # app 모듈은 임포트 시점에 settings 를 읽으므로 먼저 환경 변수를 설정
+    os.environ["CASSETTE_MODE"] = mode
+    os.environ["CASSETTE_PATH"] = path
+    os.environ["CASSETTE_REPLAY_LATENCY"] = "true" if latency else "false"
+    os.environ["PRICE_STORE_DIR"] = tempfile.mkdtemp(prefix="bench-prices-")
+    os.environ.setdefault("MCP_POOL_SIZE", "2")
+
+
+async def _run(tickers, concurrency: int):
+    from app.workflow.graph import run_once
+
+    sem = asyncio.Semaphore(concurrency)
+    timings = {}
+
+    async def one(t):
+        async with sem:
+            t0 = time.perf_counter()
+            result = await run_once(t)
+            timings[t] = (time.perf_counter() - t0) * 1000
+            return result
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(one(t) for t in tickers))
+    return results, timings, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cassette record/replay benchmark")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("path")
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--latency", action="store_true", help="replay recorded latencies")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    _setup_env(args.mode, args.path, args.latency)
+    from app.workflow.cassette import cassette
+    from app.workflow.mcp_clients import mcp_pool
+
+    tickers = args.tickers
+    if args.mode == "replay" and not tickers:
+        tickers = sorted({e["req"]["args"]["ticker"] for e in cassette.entries("tool")
+                          if "ticker" in e["req"].get("args", {})})
+    if not tickers:
+        parser.error("no tickers given (record mode needs tickers)")
+
+    async def go():
+        try:
+            return await _run(tickers, args.concurrency)
+        finally:
+            await mcp_pool.close()
+
+    results, timings, wall = asyncio.run(go())
+    cassette.close()
+
+    print("=" * 60)
+    print(f"Cassette {args.mode}: {args.path}")
+    print("=" * 60)
+    for r in results:
+        print(f"{r['ticker']:<10} score={r['score']!s:<4} source={r['score_source']!s:<8} "
+              f"{timings[r['ticker']]:8.1f} ms")
+    lat = sorted(timings.values())
+    p95 = lat[min(len(lat) - 1, int(round(0.95 * (len(lat) - 1))))]
+    print(json.dumps({"tickers": len(lat), "wall_ms": round(wall, 1),
+                      "p50_ms": round(statistics.median(lat), 1), "p95_ms": round(p95, 1)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
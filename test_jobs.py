@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+JobQueue / JobStore 테스트 스크립트
+여러 워커 프로세스가 같은 SQLite 파일을 공유할 때의 취소·완료 경합 확인
+"""
+import asyncio
+import time
+
+import pytest
+
+import app.jobs as jobs
+from app.jobs import (CANCELED, COMPLETED, SUBMITTED, WORKER_ID, WORKING, InMemoryJobStore, Job, JobQueue,
+                      SqliteJobStore)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobStore(3600)
+    return SqliteJobStore(str(tmp_path / "jobs.sqlite3"), 3600)
+
+
+def _fake_run_once(monkeypatch):
+    async def fake_run_once(ticker, **kwargs):
+        return {"ticker": ticker, "score": 70}
+    monkeypatch.setattr(jobs, "run_once", fake_run_once)
+
+
+def test_claim_is_exclusive(store):
+    job = Job(ticker="AAPL")
+    store.save(job)
+    claimed = store.claim(job.id, "w1", 60)
+    assert claimed is not None and (claimed.state, claimed.owner) == (WORKING, "w1")
+    assert store.claim(job.id, "w2", 60) is None
+    assert store.get(job.id).owner == "w1"
+
+
+def test_claim_across_sqlite_stores(tmp_path):
+    """같은 파일을 쓰는 두 프로세스(저장소)가 동시에 가져가도 한 곳만 성공"""
+    path = str(tmp_path / "jobs.sqlite3")
+    a, b = SqliteJobStore(path, 3600), SqliteJobStore(path, 3600)
+    job = Job(ticker="AAPL")
+    a.save(job)
+    results = [a.claim(job.id, "w1", 60), b.claim(job.id, "w2", 60)]
+    assert sum(r is not None for r in results) == 1
+    assert a.get(job.id).owner == "w1"
+
+
+def test_expired_lease_can_be_claimed(store):
+    job = Job(ticker="AAPL")
+    store.save(job)
+    store.claim(job.id, "dead", 0.01)
+    time.sleep(0.02)
+    claimed = store.claim(job.id, "w2", 60)
+    assert claimed is not None and claimed.owner == "w2"
+
+
+def test_renew_fails_after_cancel(store):
+    job = Job(ticker="AAPL")
+    store.save(job)
+    claimed = store.claim(job.id, "w1", 60)
+    assert store.renew(claimed, 60)
+
+    JobQueue(store).cancel(job.id)  # 이 프로세스에서 실행 중이 아님 → 저장소에 canceled
+    assert store.get(job.id).state == CANCELED
+    assert not store.renew(claimed, 60)
+    assert not store.finish(claimed, COMPLETED)
+    assert store.get(job.id).state == CANCELED
+
+
+def test_recover_loop_picks_up_expired_lease(tmp_path, monkeypatch):
+    """소유 프로세스가 죽어 임대가 만료된 작업만 다른 프로세스가 복구해 실행"""
+    _fake_run_once(monkeypatch)
+    path = str(tmp_path / "jobs.sqlite3")
+    dead = SqliteJobStore(path, 3600)
+    expired, live = Job(ticker="AAPL"), Job(ticker="MSFT")
+    for job, lease_s in ((expired, 0.01), (live, 60)):
+        dead.save(job)
+        dead.claim(job.id, "dead-worker", lease_s)
+
+    async def main():
+        queue = JobQueue(SqliteJobStore(path, 3600), workers=1, lease_s=0.2)
+        await queue.start()
+        try:
+            for _ in range(50):
+                if queue.get(expired.id).state == COMPLETED:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+        return queue.get(expired.id), queue.get(live.id)
+
+    recovered, untouched = asyncio.run(main())
+    assert recovered.state == COMPLETED and recovered.owner == WORKER_ID
+    assert recovered.result["score"] == 70
+    assert (untouched.state, untouched.owner) == (WORKING, "dead-worker")
+
+
+def test_stale_submitted_job_is_recovered(tmp_path, monkeypatch):
+    """submit 한 프로세스가 큐에 넣기 전에 죽어 오래 남은 submitted 작업도 복구"""
+    _fake_run_once(monkeypatch)
+    path = str(tmp_path / "jobs.sqlite3")
+    orphan = Job(ticker="NVDA", created_at=time.time() - 10)
+    SqliteJobStore(path, 3600).save(orphan)
+    assert orphan.state == SUBMITTED
+
+    async def main():
+        queue = JobQueue(SqliteJobStore(path, 3600), workers=1, lease_s=0.2)
+        await queue.start()
+        try:
+            for _ in range(50):
+                if queue.get(orphan.id).state == COMPLETED:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await queue.stop()
+        return queue.get(orphan.id)
+
+    assert asyncio.run(main()).state == COMPLETED
+
+
+def test_cancel_then_complete_across_stores(tmp_path, monkeypatch):
+    """다른 워커가 취소한 뒤 실행이 끝나도 completed 로 덮어쓰지 않고 콜백도 보내지 않음"""
+    notified = []
+
+    async def main():
+        started, finish = asyncio.Event(), asyncio.Event()
+
+        async def fake_run_once(ticker, **kwargs):
+            started.set()
+            await finish.wait()
+            return {"ticker": ticker, "score": 70}
+
+        async def fake_notify(job, attempts=3):
+            notified.append(job.id)
+
+        monkeypatch.setattr(jobs, "run_once", fake_run_once)
+        monkeypatch.setattr(jobs, "_notify", fake_notify)
+
+        path = str(tmp_path / "jobs.sqlite3")
+        owner = JobQueue(SqliteJobStore(path, 3600), workers=1, lease_s=60)
+        other = JobQueue(SqliteJobStore(path, 3600), workers=1, lease_s=60)
+        try:
+            job = await owner.submit("AAPL", callback_url="http://example.invalid/hook")
+            await asyncio.wait_for(started.wait(), 5)
+
+            # 다른 워커(실행 태스크 없음)에서 취소 → 저장소에 canceled
+            other.cancel(job.id)
+            assert other.get(job.id).state == CANCELED
+
+            # 임대 연장 전에 실행이 끝남
+            finish.set()
+            await asyncio.wait_for(owner._queue.join(), 5)
+            assert owner.get(job.id).state == CANCELED
+            assert other.get(job.id).result is None
+            assert notified == []
+        finally:
+            await owner.stop()
+            await other.stop()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
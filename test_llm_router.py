@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+LLMRouter 테스트 스크립트
+FakeChatModel 로 페일오버 / 헤지 / 마감 / EWMA 순위 / 토큰 사용량 차감 확인 (네트워크 없음)
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.workflow.llm_router import Backend, FakeChatModel, LLMRouter, LLMUnavailableError
+from app.workflow.metrics import llm_usage_meter, metrics, record_llm_usage
+
+MESSAGES = ["점수를 매겨 주세요"]
+
+
+class _Tracked(FakeChatModel):
+    """호출 시작/취소 여부를 기록하는 FakeChatModel"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.started = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.started += 1
+        try:
+            return await super().ainvoke(messages, **kwargs)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def _router(*models, **kwargs) -> LLMRouter:
+    kwargs.setdefault("explore_rate", 0.0)
+    return LLMRouter([Backend(f"b{i}", m, timeout_s=5.0) for i, m in enumerate(models)], **kwargs)
+
+
+def test_failover_to_secondary():
+    primary, secondary = _Tracked(latency_s=0.0, fail_rate=1.0), _Tracked(latency_s=0.0)
+    router = _router(primary, secondary)
+    failovers = metrics.get("llm.failover")
+
+    resp = asyncio.run(router.ainvoke(MESSAGES))
+    assert resp.response_metadata["router_backend"] == "b1"
+    assert (primary.started, secondary.started) == (1, 1)
+    assert router.backends[0].errors == 1 and router.backends[1].errors == 0
+    assert metrics.get("llm.failover") == failovers + 1
+
+
+def test_all_backends_fail():
+    router = _router(FakeChatModel(latency_s=0.0, fail_rate=1.0), FakeChatModel(latency_s=0.0, fail_rate=1.0))
+    with pytest.raises(LLMUnavailableError, match="b0: .*b1: "):
+        asyncio.run(router.ainvoke(MESSAGES))
+
+
+def test_hedge_fires_and_cancels_loser():
+    slow, fast = _Tracked(latency_s=2.0), _Tracked(latency_s=0.01)
+    router = _router(slow, fast, hedge_after_s=0.05)
+    hedges = metrics.get("llm.hedge")
+
+    async def main():
+        t0 = time.monotonic()
+        resp = await router.ainvoke(MESSAGES)
+        elapsed = time.monotonic() - t0
+        await asyncio.sleep(0)  # 취소된 요청이 CancelledError 를 처리할 틈
+        return resp, elapsed
+
+    resp, elapsed = asyncio.run(main())
+    assert resp.response_metadata["router_backend"] == "b1"
+    assert elapsed < 1.0
+    assert metrics.get("llm.hedge") == hedges + 1
+    assert slow.cancelled == 1 and fast.cancelled == 0
+    # 헤지에서 진 요청은 오류로 집계하지 않음
+    assert router.backends[0].errors == 0 and router.backends[0].calls == 0
+
+
+def test_deadline_respected():
+    slow, other = _Tracked(latency_s=2.0), _Tracked(latency_s=2.0)
+    router = _router(slow, other)
+
+    t0 = time.monotonic()
+    with pytest.raises(LLMUnavailableError, match="deadline exceeded"):
+        asyncio.run(router.ainvoke(MESSAGES, timeout_s=0.1))
+    assert time.monotonic() - t0 < 1.0
+    # 시간이 없으므로 다음 백엔드로 페일오버하지 않고, 마감에 잘린 것은 백엔드 오류가 아님
+    assert other.started == 0
+    assert router.backends[0].errors == 0
+
+
+def test_rank_prefers_faster_backend():
+    slow, fast = FakeChatModel(latency_s=0.08), FakeChatModel(latency_s=0.0)
+    router = _router(slow, fast)
+
+    async def main():
+        # 처음에는 관측값이 없는 백엔드를 설정 순서대로 시도
+        assert [b.name for b in router.rank()] == ["b0", "b1"]
+        for _ in range(2):
+            await router.ainvoke(MESSAGES)
+        return [b.name for b in router.rank()]
+
+    assert asyncio.run(main()) == ["b1", "b0"]
+    assert router.backends[0].ewma_latency > router.backends[1].ewma_latency
+
+
+def test_rank_demotes_erroring_backend():
+    router = _router(FakeChatModel(latency_s=0.0), FakeChatModel(latency_s=0.0), cooldown_after=2)
+    flaky = router.backends[0]
+    for _ in range(2):
+        router._observe(flaky, None, ok=False)
+    router._observe(router.backends[1], 0.01, ok=True)
+    assert flaky.cooldown_until > time.monotonic()
+    assert [b.name for b in router.rank()] == ["b1", "b0"]
+
+
+def test_usage_meter_charged():
+    router = _router(FakeChatModel(latency_s=0.0))
+
+    async def main():
+        meter = {"tokens": 0}
+        token = llm_usage_meter.set(meter)
+        try:
+            resp = await router.ainvoke(MESSAGES)
+            record_llm_usage(resp)
+        finally:
+            llm_usage_meter.reset(token)
+        return resp, meter
+
+    resp, meter = asyncio.run(main())
+    usage = resp.usage_metadata
+    assert meter["tokens"] == usage["input_tokens"] + usage["output_tokens"] > 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
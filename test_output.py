@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+LLM 점수 출력 검증 테스트 스크립트
+parse_score() 의 로컬 복구 규칙과 node_score 의 재질문 → 규칙 점수 폴백 확인
+"""
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import app.workflow.nodes as nodes
+from app.workflow.output import RETRY_INSTRUCTION, parse_score
+
+
+@pytest.mark.parametrize("text, expected, status", [
+    # 엄격 JSON
+    ('{"score": 72, "rationale": "실적 개선"}', {"score": 72, "rationale": "실적 개선"}, "ok"),
+    ('{"score": 72.0, "rationale": "실적 개선"}', {"score": 72, "rationale": "실적 개선"}, "ok"),
+    # 코드블록
+    ('```json\n{"score": 65, "rationale": "보합"}\n```', {"score": 65, "rationale": "보합"}, "repaired"),
+    ('결과입니다:\n```\n{"score": 40, "rationale": "약세"}\n```\n끝', {"score": 40, "rationale": "약세"}, "repaired"),
+    # 후행 쉼표 / 따옴표 없는 키 / 작은따옴표
+    ('{"score": 55, "rationale": "중립",}', {"score": 55, "rationale": "중립"}, "repaired"),
+    ("{score: 58, rationale: '중립'}", {"score": 58, "rationale": "중립"}, "repaired"),
+    # 닫는 중괄호 누락
+    ('{"score": 61, "rationale": "완만한 상승"', {"score": 61, "rationale": "완만한 상승"}, "repaired"),
+    # JSON 이 아니어도 키만 있으면 추출
+    ('score: 77\nrationale: "모멘텀 양호"', {"score": 77, "rationale": "모멘텀 양호"}, "repaired"),
+    # 범위 밖 점수
+    ('{"score": 0, "rationale": "x"}', None, "invalid"),
+    ('{"score": 101, "rationale": "x"}', None, "invalid"),
+    ('{"score": -5, "rationale": "x"}', None, "invalid"),
+    ('{"score": true, "rationale": "x"}', None, "invalid"),
+    # 근거 누락 / 빈 근거
+    ('{"score": 70}', None, "invalid"),
+    ('{"score": 70, "rationale": "   "}', None, "invalid"),
+    # 빈 응답 / 자유 문장
+    ("", None, "invalid"),
+    ("점수는 70점 정도로 보입니다.", None, "invalid"),
+])
+def test_parse_score(text, expected, status):
+    assert parse_score(text) == (expected, status)
+
+
+def test_parse_score_truncates_rationale():
+    data, status = parse_score('{"score": 50, "rationale": "%s"}' % ("가" * 800))
+    assert status == "ok" and len(data["rationale"]) == 500
+
+
+class _ScriptedRouter:
+    """정해진 응답을 순서대로 돌려주는 라우터 (받은 메시지 기록)"""
+
+    def __init__(self, *replies: str):
+        self.replies = list(replies)
+        self.calls = []
+
+    async def ainvoke(self, messages, timeout_s=None):
+        self.calls.append(messages)
+        return AIMessage(content=self.replies.pop(0))
+
+
+def _score(monkeypatch, router):
+    monkeypatch.setattr(nodes, "get_router", lambda tier="default": router)
+    monkeypatch.setattr(nodes.llm_gate, "decide", lambda ticker, pre, fp: ("llm", None))
+    monkeypatch.setattr(nodes.llm_gate, "record", lambda *args: None)
+    state = {"ticker": "TEST", "price": {"ticker": "TEST", "last": 100.0, "chg": 1.0, "pct": 1.0},
+             "news": [], "filings": [], "indicators": None, "messages": []}
+    return asyncio.run(nodes.node_score(state))
+
+
+def test_node_score_retry_then_fallback(monkeypatch):
+    """복구 불가 응답 → 1회 재질문 → 그래도 무효면 규칙 점수 + fallback 표시"""
+    router = _ScriptedRouter("점수를 매길 수 없습니다", "여전히 형식이 아닙니다")
+    out = _score(monkeypatch, router)
+    assert len(router.calls) == 2
+    assert router.calls[1][-1].content == RETRY_INSTRUCTION
+    assert out["output_status"] == "fallback" and out["score_source"] == "fallback"
+    assert out["score"] == out["prescore"]["score"]
+
+
+def test_node_score_retry_succeeds(monkeypatch):
+    router = _ScriptedRouter("모르겠습니다", '{"score": 64, "rationale": "재질문 응답"}')
+    out = _score(monkeypatch, router)
+    assert len(router.calls) == 2
+    assert (out["score"], out["score_source"], out["output_status"]) == (64, "llm", "retried")
+
+
+def test_node_score_repaired_without_retry(monkeypatch):
+    router = _ScriptedRouter('```json\n{"score": 81, "rationale": "복구됨",}\n```')
+    out = _score(monkeypatch, router)
+    assert len(router.calls) == 1
+    assert (out["score"], out["output_status"]) == (81, "repaired")
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
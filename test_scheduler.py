@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+FairScheduler 테스트 스크립트
+대기 중 취소된 요청이 슬롯을 잃게 만들지 않는지 확인
+"""
+import asyncio
+
+from app.tenants import FairScheduler
+
+
+def _scheduler(concurrency: int = 1) -> FairScheduler:
+    return FairScheduler(concurrency, {"interactive": 4.0, "batch": 1.0}, queue_limit=8)
+
+
+async def _hold(sched: FairScheduler, release: asyncio.Event, tenant: str = "a", cls: str = "interactive"):
+    async with sched.slot(tenant, cls):
+        await release.wait()
+
+
+def test_cancel_while_queued_same_tick():
+    """슬롯 반납과 대기자 취소가 같은 틱에 일어나도 반납한 실행은 성공하고 슬롯이 새지 않음"""
+    async def main():
+        sched = _scheduler()
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(sched, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(sched, asyncio.Event(), "b"))
+        await asyncio.sleep(0)
+        assert sched.stats()["interactive"]["waiting"] == 1
+
+        release.set()
+        waiter.cancel()
+        await holder  # InvalidStateError 가 나면 실패
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        assert sched.running == 0
+        assert sched.stats()["interactive"]["waiting"] == 0
+
+        # 다음 요청은 바로 슬롯을 받음
+        release2 = asyncio.Event()
+        release2.set()
+        await asyncio.wait_for(_hold(sched, release2, "c"), 1.0)
+        assert sched.running == 0
+
+    asyncio.run(main())
+
+
+def test_cancel_while_queued_passes_slot_on():
+    """취소된 대기자는 건너뛰고 그 뒤 대기자가 슬롯을 받음"""
+    async def main():
+        sched = _scheduler()
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(sched, release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(_hold(sched, asyncio.Event(), "b"))
+        done = asyncio.Event()
+        done.set()
+        after = asyncio.create_task(_hold(sched, done, "c", "batch"))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        release.set()
+        await holder
+        await asyncio.wait_for(after, 1.0)
+        assert cancelled.cancelled()
+        assert sched.running == 0
+        assert all(sched.stats()[c]["waiting"] == 0 for c in ("interactive", "batch"))
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_cancel_while_queued_same_tick()
+    test_cancel_while_queued_passes_slot_on()
+    print("✓ scheduler tests passed")